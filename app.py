@@ -8,7 +8,6 @@ Arquitectura:
 """
 from flask import Flask
 from flask_sqlalchemy import SQLAlchemy
-from flask_jwt_extended import JWTManager
 from flask_mail import Mail
 from flask_migrate import Migrate
 from flask_cors import CORS
@@ -16,12 +15,14 @@ from dotenv import load_dotenv
 import os
 import logging
 from logging.handlers import RotatingFileHandler
+from services.token_cache import CachingJWTManager
+from services.db_routing import RoutingSession
 
 load_dotenv()
 
 # Extensiones inicializadas sin app (patron factory)
-db = SQLAlchemy()
-jwt = JWTManager()
+db = SQLAlchemy(session_options={'class_': RoutingSession})  # SELECTs de solo lectura pueden ir a la replica
+jwt = CachingJWTManager()  # JWTManager con cache de tokens verificados
 mail = Mail()
 migrate = Migrate()
 cors = CORS()
@@ -75,7 +76,24 @@ def create_app():
     app.config['SECRET_KEY'] = os.getenv('SECRET_KEY', 'dev-secret-key-change-in-production')
     app.config['SQLALCHEMY_DATABASE_URI'] = os.getenv('DATABASE_URL', 'sqlite:///carbon_console.db')
     app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+
+    # Pool de conexiones: por defecto una conexion por thread de uWSGI (threads = 2)
+    app.config['DB_POOL_SIZE'] = int(os.getenv('DB_POOL_SIZE', 2))
+    app.config['DB_MAX_OVERFLOW'] = int(os.getenv('DB_MAX_OVERFLOW', 2))
+    app.config['DB_POOL_TIMEOUT'] = int(os.getenv('DB_POOL_TIMEOUT', 10))
+    app.config['DB_POOL_RECYCLE'] = int(os.getenv('DB_POOL_RECYCLE', 1800))
+    app.config['DB_POOL_PRE_PING'] = os.getenv('DB_POOL_PRE_PING', 'True').lower() == 'true'
+    app.config['DB_STATEMENT_TIMEOUT_MS'] = int(os.getenv('DB_STATEMENT_TIMEOUT_MS', 30000))
+    app.config['SQLITE_JOURNAL_MODE'] = os.getenv('SQLITE_JOURNAL_MODE', 'WAL')
+    app.config['SQLITE_SYNCHRONOUS'] = os.getenv('SQLITE_SYNCHRONOUS', 'NORMAL')
+
+    # Replica de lectura (opcional)
+    app.config['REPLICA_DATABASE_URL'] = os.getenv('REPLICA_DATABASE_URL')
+    app.config['READ_YOUR_WRITES_WINDOW'] = float(os.getenv('READ_YOUR_WRITES_WINDOW', 5))
+    app.config['REPLICA_RETRY_AFTER'] = float(os.getenv('REPLICA_RETRY_AFTER', 30))
+    app.config['DB_ROUTING_REDIS_URL'] = os.getenv('DB_ROUTING_REDIS_URL')
     app.config['JWT_SECRET_KEY'] = os.getenv('JWT_SECRET_KEY', 'jwt-secret-change-in-production')
+    app.config['JWT_DECODE_CACHE_SIZE'] = int(os.getenv('JWT_DECODE_CACHE_SIZE', 1024))
 
     # Email configuration
     app.config['MAIL_SERVER'] = os.getenv('MAIL_SERVER', 'localhost')
@@ -85,30 +103,181 @@ def create_app():
     app.config['MAIL_PASSWORD'] = os.getenv('MAIL_PASSWORD')
     app.config['MAIL_DEFAULT_SENDER'] = os.getenv('MAIL_DEFAULT_SENDER', 'noreply@carbonconsole.com')
 
+    # Transporte de emails de confirmacion: stream (Redis Stream + flask email worker) o celery
+    app.config['EMAIL_TRANSPORT'] = os.getenv('EMAIL_TRANSPORT', 'stream')
+    app.config['EMAIL_STREAM_REDIS_URL'] = os.getenv('EMAIL_STREAM_REDIS_URL', os.getenv('REDIS_URL', 'redis://localhost:6379/0'))
+    app.config['EMAIL_STREAM'] = os.getenv('EMAIL_STREAM', 'email:confirmations')
+    app.config['EMAIL_STREAM_MAXLEN'] = int(os.getenv('EMAIL_STREAM_MAXLEN', 100000))
+    app.config['EMAIL_CLAIM_IDLE_MS'] = int(os.getenv('EMAIL_CLAIM_IDLE_MS', 60000))
+    app.config['EMAIL_MAX_DELIVERIES'] = int(os.getenv('EMAIL_MAX_DELIVERIES', 5))
+
     # Celery configuration
     app.config['CELERY_BROKER_URL'] = os.getenv('CELERY_BROKER_URL', 'redis://localhost:6379/0')
-    app.config['CELERY_RESULT_BACKEND'] = os.getenv('CELERY_RESULT_BACKEND', 'redis://localhost:6379/0')
+    app.config['CELERY_RESULT_BACKEND'] = os.getenv('CELERY_RESULT_BACKEND', '')  # vacio = sin backend (fire-and-forget)
+    app.config['CELERY_PREFETCH_MULTIPLIER'] = int(os.getenv('CELERY_PREFETCH_MULTIPLIER', 16))
+    app.config['CELERY_STATS_INTERVAL'] = int(os.getenv('CELERY_STATS_INTERVAL', 60))
+    app.config['CELERY_TASK_ALWAYS_EAGER'] = os.getenv('CELERY_TASK_ALWAYS_EAGER', 'False').lower() == 'true'
+
+    # Operation cache (LRU en proceso + Redis opcional)
+    app.config['OPERATION_CACHE_SIZE'] = int(os.getenv('OPERATION_CACHE_SIZE', 2048))
+    app.config['OPERATION_CACHE_REDIS_URL'] = os.getenv('OPERATION_CACHE_REDIS_URL')
+    app.config['OPERATION_CACHE_TTL'] = int(os.getenv('OPERATION_CACHE_TTL', 86400))
+
+    # Cache de respuestas de lectura por generacion de operaciones (contador en Redis o en instance/)
+    app.config['RESPONSE_CACHE_ENABLED'] = os.getenv('RESPONSE_CACHE_ENABLED', 'True').lower() == 'true'
+    app.config['RESPONSE_CACHE_SIZE'] = int(os.getenv('RESPONSE_CACHE_SIZE', 32))
+    app.config['RESPONSE_CACHE_TTL'] = int(os.getenv('RESPONSE_CACHE_TTL', 300))
+    app.config['RESPONSE_CACHE_REDIS_URL'] = os.getenv('RESPONSE_CACHE_REDIS_URL')
+    app.config['RESPONSE_CACHE_GENERATION_FILE'] = os.getenv('RESPONSE_CACHE_GENERATION_FILE', 'operations.generation')
+    app.config['RESPONSE_CACHE_LOCK_MS'] = int(os.getenv('RESPONSE_CACHE_LOCK_MS', 5000))
+
+    # Rate limiting por cliente (token bucket) y tope de concurrencia de la API publica por worker
+    app.config['RATE_LIMIT_ENABLED'] = os.getenv('RATE_LIMIT_ENABLED', 'True').lower() == 'true'
+    app.config['RATE_LIMIT_RATE'] = float(os.getenv('RATE_LIMIT_RATE', 5))
+    app.config['RATE_LIMIT_BURST'] = int(os.getenv('RATE_LIMIT_BURST', 20))
+    app.config['RATE_LIMIT_REDIS_URL'] = os.getenv('RATE_LIMIT_REDIS_URL')
+    app.config['RATE_LIMIT_LOCAL_KEYS'] = int(os.getenv('RATE_LIMIT_LOCAL_KEYS', 10000))
+    app.config['PUBLIC_API_MAX_CONCURRENCY'] = int(os.getenv('PUBLIC_API_MAX_CONCURRENCY', 1))
+
+    # Ingesta asincrona de operaciones publicas: sync | async | prefer (Prefer: respond-async)
+    app.config['INGEST_MODE'] = os.getenv('INGEST_MODE', 'sync')
+    app.config['INGEST_REDIS_URL'] = os.getenv('INGEST_REDIS_URL')  # vacio = log local en instance/
+    app.config['INGEST_STREAM'] = os.getenv('INGEST_STREAM', 'ingest:operations')
+    app.config['INGEST_LOG_DIR'] = os.getenv('INGEST_LOG_DIR', 'ingest')
+    app.config['INGEST_STATUS_TTL'] = int(os.getenv('INGEST_STATUS_TTL', 86400))
+    app.config['INGEST_CLAIM_IDLE_MS'] = int(os.getenv('INGEST_CLAIM_IDLE_MS', 60000))
+
+    # Feed de cambios GET /api/operations/changes (filas por pagina)
+    app.config['CHANGES_PAGE_SIZE'] = int(os.getenv('CHANGES_PAGE_SIZE', 1000))
+    app.config['CHANGES_MAX_PAGE_SIZE'] = int(os.getenv('CHANGES_MAX_PAGE_SIZE', 10000))
+
+    # Idempotency-Key en la creacion de operaciones (segundos que se guarda la respuesta)
+    app.config['IDEMPOTENCY_KEY_TTL'] = int(os.getenv('IDEMPOTENCY_KEY_TTL', 86400))
+
+    # Particionado y archivado de operaciones
+    app.config['ARCHIVE_DIR'] = os.getenv('ARCHIVE_DIR', 'archive')
+    app.config['ARCHIVE_RETENTION_MONTHS'] = int(os.getenv('ARCHIVE_RETENTION_MONTHS', 12))
+
+    # Compresion de respuestas JSON/HTML (zstd y br solo si estan instalados)
+    app.config['COMPRESS_ENABLED'] = os.getenv('COMPRESS_ENABLED', 'True').lower() == 'true'
+    app.config['COMPRESS_MIN_SIZE'] = int(os.getenv('COMPRESS_MIN_SIZE', 1400))
+    app.config['COMPRESS_ALGORITHMS'] = os.getenv('COMPRESS_ALGORITHMS', 'zstd,br,gzip')
+
+    # Instrumentacion de queries: slow-query log, detector de N+1 y X-Query-Count (en debug)
+    app.config['QUERY_LOG_ENABLED'] = os.getenv('QUERY_LOG_ENABLED', 'False').lower() == 'true'
+    app.config['SLOW_QUERY_MS'] = float(os.getenv('SLOW_QUERY_MS', 200))
+    app.config['QUERY_N_PLUS_ONE_THRESHOLD'] = int(os.getenv('QUERY_N_PLUS_ONE_THRESHOLD', 5))
+    app.config['QUERY_LOG_HEADERS'] = os.getenv('QUERY_LOG_HEADERS', 'False').lower() == 'true'
+
+    # Profiling bajo demanda: GET /api/debug/profile y header X-Profile (solo usuarios internos)
+    app.config['PROFILER_ENABLED'] = os.getenv('PROFILER_ENABLED', 'False').lower() == 'true'
+    app.config['PROFILER_INTERVAL_MS'] = float(os.getenv('PROFILER_INTERVAL_MS', 5))
+    app.config['PROFILER_MAX_SECONDS'] = float(os.getenv('PROFILER_MAX_SECONDS', 60))
+    app.config['PROFILER_TOP'] = int(os.getenv('PROFILER_TOP', 40))
+    app.config['PROFILER_DIR'] = os.getenv('PROFILER_DIR', 'profiles')  # relativo a instance/
+
+    # Preload en el master de uWSGI (lazy-apps = false) y warmup antes de aceptar trafico (ver wsgi.py)
+    app.config['PRELOAD_APP'] = os.getenv('PRELOAD_APP', 'False').lower() == 'true'
+    app.config['WARMUP_ENABLED'] = os.getenv('WARMUP_ENABLED', 'True').lower() == 'true'
+    app.config['WARMUP_OPERATIONS'] = int(os.getenv('WARMUP_OPERATIONS', 256))
+
+    # /readyz: chequeos de dependencias refrescados en background (los probes leen el ultimo resultado)
+    app.config['HEALTH_CHECK_INTERVAL'] = float(os.getenv('HEALTH_CHECK_INTERVAL', 5))
+    app.config['HEALTH_CHECK_TIMEOUT'] = float(os.getenv('HEALTH_CHECK_TIMEOUT', 2))
+    app.config['HEALTH_CRITICAL_CHECKS'] = os.getenv('HEALTH_CRITICAL_CHECKS', 'database')
+
+    # Feed en vivo del backoffice (SSE): Redis pub/sub entre procesos o broadcaster en proceso
+    app.config['LIVE_FEED_ENABLED'] = os.getenv('LIVE_FEED_ENABLED', 'True').lower() == 'true'
+    app.config['LIVE_FEED_REDIS_URL'] = os.getenv('LIVE_FEED_REDIS_URL')  # vacio = solo el proceso local
+    app.config['LIVE_FEED_CHANNEL'] = os.getenv('LIVE_FEED_CHANNEL', 'operations:created')
+    app.config['LIVE_FEED_URL'] = os.getenv('LIVE_FEED_URL')  # vacio = /bo/operations/stream del mismo origen, si el proceso sirve streams
+    app.config['LIVE_FEED_HEARTBEAT'] = float(os.getenv('LIVE_FEED_HEARTBEAT', 15))
+    app.config['LIVE_FEED_MAX_SECONDS'] = float(os.getenv('LIVE_FEED_MAX_SECONDS', 300))
+    app.config['LIVE_FEED_MAX_STREAMS'] = int(os.getenv('LIVE_FEED_MAX_STREAMS', 1000))
+    app.config['LIVE_FEED_SYNC_STREAMS'] = int(os.getenv('LIVE_FEED_SYNC_STREAMS', 0))  # 0: los workers sync no sirven streams
+    app.config['LIVE_FEED_TOKEN_MAX_AGE'] = int(os.getenv('LIVE_FEED_TOKEN_MAX_AGE', 60))  # s; el listado pide otro al reconectar
+
+    # Modo ASGI (asgi.py, uvicorn): vistas async con su propio engine/pool y executor para CPU
+    app.config['ASYNC_DATABASE_URL'] = os.getenv('ASYNC_DATABASE_URL')  # vacio = DATABASE_URL con aiosqlite/asyncpg
+    app.config['ASYNC_DB_POOL_SIZE'] = int(os.getenv('ASYNC_DB_POOL_SIZE', 8))
+    app.config['ASYNC_DB_MAX_OVERFLOW'] = int(os.getenv('ASYNC_DB_MAX_OVERFLOW', 4))
+    app.config['ASGI_CPU_WORKERS'] = int(os.getenv('ASGI_CPU_WORKERS', 2))
+    app.config['ASGI_WSGI_THREADS'] = int(os.getenv('ASGI_WSGI_THREADS', 4))  # vistas sync: hasta DB_POOL_SIZE + DB_MAX_OVERFLOW
+
+    # Serializacion JSON: 'orjson' (si esta instalado) o 'default' (json de la stdlib)
+    app.config['JSON_PROVIDER'] = os.getenv('JSON_PROVIDER', 'orjson')
 
     # Setup logging
     setup_logging(app)
 
+    from services.json_provider import init_json_provider
+    init_json_provider(app)
+
+    from services.compression import init_compression
+    init_compression(app)
+
+    from services.db_engine import build_engine_options, init_engine_instrumentation
+    from services.db_routing import init_db_routing
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = build_engine_options(app.config)
+
     # Initialize extensions
     db.init_app(app)
+    with app.app_context():
+        for engine in db.engines.values():
+            init_engine_instrumentation(app, engine)
+    init_db_routing(app)
+
+    from services.db_routing import replica_engine
+    from services.query_log import init_query_log
+    with app.app_context():
+        init_query_log(app, list(db.engines.values()) + [replica_engine(app)])
+
+    from services.profiler import init_profiler
+    init_profiler(app)
     jwt.init_app(app)
     mail.init_app(app)
     migrate.init_app(app, db)
     cors.init_app(app, resources={r"/*": {"origins": "*"}})
 
+    from services.celery_app import init_celery
+    init_celery(app)
+
+    from services.operation_cache import operation_cache
+    operation_cache.init_app(app)
+
+    from services.response_cache import init_response_cache
+    init_response_cache(app)
+
+    from services.rate_limit import rate_limiter
+    rate_limiter.init_app(app)
+
+    from services.ingestion import init_ingestion
+    init_ingestion(app)
+
+    from services.email_stream import init_email_stream
+    init_email_stream(app)
+
+    from services.live_feed import init_live_feed
+    init_live_feed(app)
+
+    from services.health import init_health
+    init_health(app)
+
     # Blueprints importados dentro de create_app para evitar imports circulares
     from routes.internal_api import internal_api
     from routes.public_api import public_api
     from routes.receipts import receipts
     from routes.backoffice import backoffice
+    from routes.health import health
 
     app.register_blueprint(internal_api, url_prefix='/api')      # API para usuarios internos (backoffice)
     app.register_blueprint(public_api, url_prefix='/public')     # API para usuarios externos
     app.register_blueprint(receipts)                              # Generacion de PDFs
     app.register_blueprint(backoffice, url_prefix='/bo')         # UI HTML del backoffice
+    app.register_blueprint(health)                                # /healthz y /readyz (load balancer)
+
+    import cli
+    cli.init_app(app)
 
     app.logger.info("Vemo application created successfully")
     return app
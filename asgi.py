@@ -0,0 +1,7 @@
+from app import create_app
+from services.asgi_app import create_asgi_app
+from services.prefork import prepare_app
+
+flask_app = create_app()
+prepare_app(flask_app)  # warmup del worker (uvicorn no hace preload: PRELOAD_APP=False)
+app = create_asgi_app(flask_app)  # uvicorn asgi:app --workers 4
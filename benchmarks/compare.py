@@ -0,0 +1,81 @@
+"""
+Compara dos resultados de benchmark: JSON de load_test.py o el generado por
+pytest-benchmark (--benchmark-json) para benchmarks/micro.
+
+Uso:
+    python benchmarks/compare.py benchmarks/results/base.json benchmarks/results/new.json --threshold 10
+
+Sale con codigo 1 si alguna metrica empeora mas que --threshold por ciento.
+"""
+import argparse
+import json
+import sys
+
+# Metricas a comparar y si "mas alto es mejor"
+LOAD_METRICS = {'rps': True, 'p50_ms': False, 'p95_ms': False, 'p99_ms': False}
+MICRO_METRICS = {'mean_us': False, 'median_us': False, 'bytes_per_row': False}
+
+
+def flatten(report):
+    """Map '<case>.<metric>' -> (value, higher_is_better)"""
+    if report.get('kind') == 'load':
+        cases, wanted = report['scenarios'], LOAD_METRICS
+    else:
+        # Formato de pytest-benchmark: lista de {name, stats} con tiempos en segundos
+        # extra_info lleva metricas propias de algunos benchmarks (p.ej. bytes_per_row)
+        cases = {
+            bench['name']: dict(bench.get('extra_info', {}),
+                                mean_us=bench['stats']['mean'] * 1e6, median_us=bench['stats']['median'] * 1e6)
+            for bench in report['benchmarks']
+        }
+        wanted = MICRO_METRICS
+    values = {}
+    for case, data in cases.items():
+        for metric, higher_is_better in wanted.items():
+            if metric in data:
+                values[f"{case}.{metric}"] = (data[metric], higher_is_better)
+    return values
+
+
+def compare(base, new, threshold):
+    base_values, new_values = flatten(base), flatten(new)
+    regressions = []
+    print(f"{'metric':48s} {'base':>12s} {'new':>12s} {'change':>9s}")
+    for key in sorted(base_values.keys() & new_values.keys()):
+        (old, higher_is_better), (current, _) = base_values[key], new_values[key]
+        change = (current - old) / old * 100 if old else 0.0
+        worse = -change if higher_is_better else change
+        flag = ''
+        if worse > threshold:
+            flag = '  REGRESSION'
+            regressions.append(key)
+        print(f"{key:48s} {old:>12.2f} {current:>12.2f} {change:>+8.1f}%{flag}")
+    return regressions
+
+
+def _commit(report):
+    return report.get('commit') or report.get('commit_info', {}).get('id', 'unknown')[:7]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('base')
+    parser.add_argument('new')
+    parser.add_argument('--threshold', type=float, default=10.0, help='Allowed regression in percent')
+    args = parser.parse_args(argv)
+
+    with open(args.base) as f:
+        base = json.load(f)
+    with open(args.new) as f:
+        new = json.load(f)
+
+    regressions = compare(base, new, args.threshold)
+    if regressions:
+        print(f"\n{len(regressions)} metrics regressed more than {args.threshold}% "
+              f"({_commit(base)} -> {_commit(new)})")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,291 @@
+"""
+Benchmark de carga de la API HTTP.
+
+Levanta la aplicacion en un servidor local (SQLite temporal o DATABASE_URL
+de un Postgres local), con Redis y SMTP reemplazados por stubs, y ejecuta
+cada escenario con la concurrencia indicada. Con --url se mide un servidor
+ya levantado (p.ej. uwsgi --ini uwsgi.ini) en lugar del servidor local.
+
+Reporta requests/s y latencias p50/p95/p99 por escenario y guarda el
+resultado en benchmarks/results/ como JSON para comparar entre commits
+(ver benchmarks/compare.py).
+
+El servidor local corre sin rate limiting ni tope de concurrencia para medir
+throughput; --admission-control los deja activos. El escenario
+list_under_abuse (no incluido por defecto) mide el listado interno mientras
+--concurrency threads inundan POST /public/operations/.
+
+Uso:
+    python benchmarks/load_test.py --concurrency 8 --requests 500
+    python benchmarks/load_test.py --url http://localhost:8000 --scenarios list,receipt
+    python benchmarks/load_test.py --admission-control --scenarios list_under_abuse
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import requests
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+INTERNAL_USER = ('bench_admin@bench.local', 'bench123')
+PUBLIC_USER = ('bench_user@bench.local', 'bench123')
+SCENARIOS = ['login', 'create_internal', 'create_public', 'create_public_async', 'list', 'receipt']
+ABUSE_SCENARIO = 'list_under_abuse'
+OPERATION_TYPES = ['electricity', 'transportation', 'heating', 'manufacturing']
+
+
+def percentile(ordered, p):
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(p * len(ordered)))]
+
+
+def start_local_server(database_url, seed_operations, admission_control=False):
+    """Build the app against a scratch database, seed it and serve it from a background thread"""
+    os.environ['DATABASE_URL'] = database_url
+    os.environ.setdefault('LOG_LEVEL', 'WARNING')
+    os.environ.setdefault('INGEST_MODE', 'prefer')  # create_public_async envia Prefer: respond-async
+    os.environ.setdefault('INGEST_LOG_DIR', tempfile.mkdtemp())
+    if not admission_control:
+        os.environ.setdefault('RATE_LIMIT_ENABLED', 'False')
+        os.environ.setdefault('PUBLIC_API_MAX_CONCURRENCY', '0')
+
+    from werkzeug.serving import make_server
+    from app import create_app, db
+    from models import Operation, User
+    from services.email_service import EmailService
+
+    # Stubs: sin Redis ni SMTP, el email de confirmacion no hace I/O
+    EmailService.send_operation_confirmation = staticmethod(lambda operation_data: True)
+
+    app = create_app()
+    app.config['MAIL_SUPPRESS_SEND'] = True
+
+    with app.app_context():
+        db.create_all()
+        for email, password, is_internal in [(*INTERNAL_USER, True), (*PUBLIC_USER, False)]:
+            if not User.query.filter_by(email=email).first():
+                user = User(email=email, is_internal=is_internal)
+                user.set_password(password)
+                db.session.add(user)
+        db.session.commit()
+
+        existing = Operation.query.count()
+        if existing < seed_operations:
+            db.session.execute(Operation.__table__.insert(), [
+                {
+                    'operation_id': str(uuid.UUID(int=i + 1)),
+                    'type': OPERATION_TYPES[i % len(OPERATION_TYPES)],
+                    'amount': float(i % 500 + 1),
+                    'carbon_score': float(i % 500 + 1),
+                    'user_email': PUBLIC_USER[0],
+                    'created_at': datetime.utcnow(),
+                }
+                for i in range(existing, seed_operations)
+            ])
+            db.session.commit()
+
+    logging.getLogger('werkzeug').setLevel(logging.WARNING)
+    server = make_server('127.0.0.1', 0, app, threaded=True)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server, f"http://127.0.0.1:{server.server_port}"
+
+
+def login(session, base_url, prefix, credentials):
+    response = session.post(f"{base_url}/{prefix}/auth/login/",
+                            json={'email': credentials[0], 'password': credentials[1]})
+    response.raise_for_status()
+    return response.json()['access_token']
+
+
+def build_requests(base_url, scenario, internal_token, public_token, receipt_id):
+    """Return a callable performing one request of the scenario with a thread-local session"""
+    local = threading.local()
+
+    def session():
+        if not hasattr(local, 'session'):
+            local.session = requests.Session()
+        return local.session
+
+    internal = {'Authorization': f'Bearer {internal_token}'}
+    public = {'Authorization': f'Bearer {public_token}'}
+    body = {'type': 'electricity', 'amount': 42.0, 'user_email': PUBLIC_USER[0]}
+
+    if scenario == 'login':
+        return lambda: session().post(f"{base_url}/api/auth/login/",
+                                      json={'email': INTERNAL_USER[0], 'password': INTERNAL_USER[1]})
+    if scenario == 'create_internal':
+        return lambda: session().post(f"{base_url}/api/operations/", json=body, headers=internal)
+    if scenario == 'create_public':
+        return lambda: session().post(f"{base_url}/public/operations/", json=body, headers=public)
+    if scenario == 'create_public_async':
+        return lambda: session().post(f"{base_url}/public/operations/", json=body,
+                                      headers={**public, 'Prefer': 'respond-async'})
+    if scenario == 'list':
+        return lambda: session().get(f"{base_url}/api/operations/", headers=internal)
+    if scenario == 'receipt':
+        return lambda: session().get(f"{base_url}/operations/{receipt_id}/receipt/", headers=internal)
+    raise ValueError(f"Unknown scenario: {scenario}")
+
+
+def run_scenario(call, total_requests, concurrency, warmup):
+    for _ in range(warmup):
+        call()
+
+    latencies = []
+    errors = 0
+    lock = threading.Lock()
+
+    def one(_):
+        nonlocal errors
+        start = time.perf_counter()
+        try:
+            ok = call().status_code < 400
+        except requests.RequestException:
+            ok = False
+        elapsed = time.perf_counter() - start
+        with lock:
+            latencies.append(elapsed)
+            if not ok:
+                errors += 1
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(one, range(total_requests)))
+    duration = time.perf_counter() - started
+
+    ordered = sorted(latencies)
+    return {
+        'requests': total_requests,
+        'errors': errors,
+        'duration_s': round(duration, 3),
+        'rps': round(total_requests / duration, 2) if duration else 0.0,
+        'p50_ms': round(percentile(ordered, 0.50) * 1000, 2),
+        'p95_ms': round(percentile(ordered, 0.95) * 1000, 2),
+        'p99_ms': round(percentile(ordered, 0.99) * 1000, 2),
+        'max_ms': round(ordered[-1] * 1000, 2) if ordered else 0.0,
+    }
+
+
+def run_under_abuse(base_url, internal_token, public_token, receipt_id, args):
+    """Measure the internal listing while `concurrency` threads flood the public create endpoint"""
+    flood = build_requests(base_url, 'create_public', internal_token, public_token, receipt_id)
+    statuses = {}
+    lock = threading.Lock()
+    stop = threading.Event()
+
+    def abuse():
+        while not stop.is_set():
+            try:
+                status = str(flood().status_code)
+            except requests.RequestException:
+                status = 'error'
+            with lock:
+                statuses[status] = statuses.get(status, 0) + 1
+
+    flooders = [threading.Thread(target=abuse, daemon=True) for _ in range(args.concurrency)]
+    for thread in flooders:
+        thread.start()
+    try:
+        call = build_requests(base_url, 'list', internal_token, public_token, receipt_id)
+        result = run_scenario(call, args.requests, max(1, args.concurrency // 4), args.warmup)
+    finally:
+        stop.set()
+        for thread in flooders:
+            thread.join()
+    result['abuse_statuses'] = statuses
+    return result
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url', help='Benchmark an already running server instead of a local one')
+    parser.add_argument('--database-url', help='Database for the local server (default: temporary SQLite file)')
+    parser.add_argument('--scenarios', default=','.join(SCENARIOS))
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--requests', type=int, default=300, help='Requests per scenario')
+    parser.add_argument('--warmup', type=int, default=10, help='Unmeasured requests per scenario')
+    parser.add_argument('--seed-operations', type=int, default=1000, help='Rows preloaded for the list scenario')
+    parser.add_argument('--admission-control', action='store_true',
+                        help='Keep rate limiting and the public API concurrency cap on the local server')
+    parser.add_argument('--output', help='Result file (default: benchmarks/results/load-<timestamp>-<commit>.json)')
+    args = parser.parse_args(argv)
+
+    server = None
+    if args.url:
+        base_url = args.url.rstrip('/')
+        database = 'external'
+    else:
+        database = args.database_url or f"sqlite:///{tempfile.mkdtemp()}/bench.db"
+        server, base_url = start_local_server(database, args.seed_operations, args.admission_control)
+
+    try:
+        with requests.Session() as session:
+            internal_token = login(session, base_url, 'api', INTERNAL_USER)
+            public_token = login(session, base_url, 'public', PUBLIC_USER)
+            receipt_id = session.post(
+                f"{base_url}/api/operations/",
+                json={'type': 'heating', 'amount': 10.0},
+                headers={'Authorization': f'Bearer {internal_token}'}
+            ).json()['operation_id']
+
+        results = {}
+        for scenario in args.scenarios.split(','):
+            if scenario == ABUSE_SCENARIO:
+                results[scenario] = run_under_abuse(base_url, internal_token, public_token, receipt_id, args)
+            else:
+                call = build_requests(base_url, scenario, internal_token, public_token, receipt_id)
+                results[scenario] = run_scenario(call, args.requests, args.concurrency, args.warmup)
+            r = results[scenario]
+            print(f"{scenario:16s} {r['rps']:>9.1f} req/s  p50 {r['p50_ms']:>8.2f}ms  "
+                  f"p95 {r['p95_ms']:>8.2f}ms  p99 {r['p99_ms']:>8.2f}ms  errors {r['errors']}")
+            if 'abuse_statuses' in r:
+                print(f"{'':16s} public flood statuses: {r['abuse_statuses']}")
+    finally:
+        if server is not None:
+            server.shutdown()
+
+    report = {
+        'kind': 'load',
+        'commit': git_commit(),
+        'timestamp': datetime.utcnow().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'target': args.url or 'local-werkzeug',
+        'database': database.split('://')[0],
+        'concurrency': args.concurrency,
+        'requests_per_scenario': args.requests,
+        'scenarios': results,
+    }
+    output = args.output or os.path.join(
+        ROOT, 'benchmarks', 'results',
+        f"load-{datetime.utcnow().strftime('%Y%m%dT%H%M%S')}-{report['commit']}.json"
+    )
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {output}")
+    return report
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,104 @@
+"""
+Micro-benchmarks (pytest-benchmark) de los hot paths de servicios y serializacion.
+
+Uso:
+    pytest benchmarks/micro/bench_hot_paths.py --benchmark-json=benchmarks/results/micro.json
+
+Los archivos bench_*.py no entran en la corrida normal de `pytest`; hay que
+pasarlos explicitamente.
+"""
+import random
+
+import pytest
+from flask import jsonify
+
+from benchmarks.micro.conftest import DATASET_SIZES, OPERATION_TYPES, SEED, make_operations
+
+
+def test_calculate_carbon_score(benchmark):
+    from services.carbon_calculator import CarbonCalculatorService
+
+    calculator = CarbonCalculatorService()
+    calculator.use_external_api = False
+    rng = random.Random(SEED)
+    inputs = [(rng.choice(OPERATION_TYPES), rng.uniform(1, 1000)) for _ in range(1000)]
+
+    benchmark(lambda: [calculator.calculate_carbon_score(t, a) for t, a in inputs])
+
+
+@pytest.mark.parametrize('size', DATASET_SIZES)
+def test_operation_to_dict(benchmark, app, size):
+    operations = make_operations(size)
+    benchmark(lambda: [op.to_dict() for op in operations])
+
+
+def test_user_to_dict(benchmark, app):
+    from datetime import datetime
+    from models import User
+
+    users = [User(id=i, email=f"user{i}@example.com", is_internal=bool(i % 2), created_at=datetime(2026, 1, 1))
+             for i in range(1000)]
+    benchmark(lambda: [user.to_dict() for user in users])
+
+
+@pytest.mark.parametrize('size', DATASET_SIZES)
+def test_jsonify_operation_list(benchmark, app, size):
+    payload = [op.to_dict() for op in make_operations(size)]
+    with app.test_request_context():
+        benchmark(lambda: jsonify(payload).get_data())
+
+
+@pytest.mark.parametrize('size', DATASET_SIZES)
+def test_list_response_orm_stdlib(benchmark, app, stored_operations, size):
+    """Previous listing path: ORM objects + to_dict() + stdlib json provider"""
+    from flask.json.provider import DefaultJSONProvider
+    from app import db
+    from models import Operation
+
+    provider = DefaultJSONProvider(app)
+
+    def run():
+        operations = Operation.query.order_by(Operation.created_at.desc()).limit(size).all()
+        body = provider.response([op.to_dict() for op in operations]).get_data()
+        db.session.expunge_all()
+        return body
+
+    benchmark(run)
+
+
+@pytest.mark.parametrize('size', DATASET_SIZES)
+def test_list_response_columns_orjson(benchmark, app, stored_operations, size):
+    """Current listing path: column tuples + serialize_rows() + app provider (orjson by default)"""
+    from app import db
+    from models import Operation
+    from services.json_provider import serialize_rows
+
+    stmt = Operation.serialized_select().order_by(Operation.created_at.desc()).limit(size)
+
+    def run():
+        rows = db.session.execute(stmt).all()
+        return app.json.response(serialize_rows(Operation.SERIALIZED_COLUMNS, rows)).get_data()
+
+    benchmark(run)
+
+
+def test_set_password(benchmark, app):
+    from models import User
+
+    user = User(email='bench@example.com')
+    benchmark.pedantic(user.set_password, args=('bench-password',), rounds=5, iterations=1)
+
+
+def test_check_password(benchmark, app):
+    from models import User
+
+    user = User(email='bench@example.com')
+    user.set_password('bench-password')
+    benchmark.pedantic(user.check_password, args=('bench-password',), rounds=5, iterations=1)
+
+
+def test_render_receipt(benchmark, app):
+    from services.receipt_renderer import render_operation_receipt
+
+    operation = make_operations(1)[0]
+    benchmark(lambda: render_operation_receipt(operation).getvalue())
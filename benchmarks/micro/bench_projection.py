@@ -0,0 +1,71 @@
+"""
+ORM vs proyeccion de columnas para listados de 100k operaciones.
+
+Mide tiempo (pytest-benchmark) y memoria por fila (tracemalloc, en
+extra_info['bytes_per_row'] del JSON; compare.py tambien la compara).
+
+Uso:
+    pytest benchmarks/micro/bench_projection.py --benchmark-json=benchmarks/results/projection.json
+"""
+import tracemalloc
+from datetime import datetime
+
+import pytest
+
+from benchmarks.micro.conftest import SEED
+
+ROWS = 100000
+
+
+@pytest.fixture(scope='module')
+def hundred_k_operations(app):
+    """Top the benchmark database up to ROWS operations with the synthetic generator"""
+    from app import db
+    from models import Operation
+    from services.data_generator import generate_operations
+
+    db.create_all()
+    missing = ROWS - Operation.query.count()
+    if missing > 0:
+        generate_operations(missing, seed=SEED, end=datetime(2026, 1, 1))
+    return ROWS
+
+
+def _bytes_per_row(load):
+    tracemalloc.start()
+    try:
+        rows = load()
+        current, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return round(current / len(rows))
+
+
+def test_list_orm_instances(benchmark, app, hundred_k_operations):
+    from app import db
+    from models import Operation
+
+    def load():
+        return Operation.query.order_by(Operation.created_at.desc()).limit(ROWS).all()
+
+    def run():
+        rows = load()
+        db.session.expunge_all()
+        return rows
+
+    benchmark.extra_info['bytes_per_row'] = _bytes_per_row(load)
+    db.session.expunge_all()
+    benchmark.pedantic(run, rounds=3, iterations=1)
+
+
+def test_list_column_projection(benchmark, app, hundred_k_operations):
+    from models import Operation
+    from services.operation_cache import OperationSnapshot
+
+    stmt = Operation.serialized_select().order_by(Operation.created_at.desc()).limit(ROWS)
+
+    def load():
+        return OperationSnapshot.fetch_all(stmt)
+
+    benchmark.extra_info['bytes_per_row'] = _bytes_per_row(load)
+    benchmark.pedantic(load, rounds=3, iterations=1)
@@ -0,0 +1,54 @@
+import os
+import random
+import sys
+from datetime import datetime, timedelta
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+# Semilla y tamaños fijos: los resultados solo son comparables entre commits si el dataset no cambia
+SEED = 1234
+DATASET_SIZES = (100, 1000, 10000)
+OPERATION_TYPES = ['electricity', 'transportation', 'heating', 'manufacturing', 'other']
+
+
+@pytest.fixture(scope='session')
+def app():
+    os.environ['DATABASE_URL'] = 'sqlite:///:memory:'
+    os.environ['LOG_LEVEL'] = 'WARNING'
+    from app import create_app
+    app = create_app()
+    with app.app_context():
+        yield app
+
+
+@pytest.fixture(scope='session')
+def stored_operations(app):
+    """Persist make_operations(max(DATASET_SIZES)) once for query + serialization benchmarks"""
+    from app import db
+
+    db.create_all()
+    db.session.add_all(make_operations(max(DATASET_SIZES)))
+    db.session.commit()
+    db.session.expunge_all()
+    return max(DATASET_SIZES)
+
+
+def make_operations(count):
+    """Deterministic transient Operation instances (not attached to a session)"""
+    from models import Operation
+
+    rng = random.Random(SEED)
+    base = datetime(2026, 1, 1)
+    return [
+        Operation(
+            operation_id=f"{rng.getrandbits(128):032x}",
+            type=rng.choice(OPERATION_TYPES),
+            amount=round(rng.uniform(1, 1000), 2),
+            carbon_score=round(rng.uniform(1, 3000), 2),
+            user_email=f"user{rng.randrange(1000)}@example.com",
+            created_at=base + timedelta(seconds=rng.randrange(86400 * 365))
+        )
+        for _ in range(count)
+    ]
@@ -0,0 +1,217 @@
+"""
+Benchmark de arranque de uWSGI: memoria por worker y primeros requests.
+
+Levanta `uwsgi --ini uwsgi.ini` en cada modo pedido (cold: --lazy-apps sin
+warmup, como antes; lazy: --lazy-apps con warmup en cada worker; preload: la
+configuracion de uwsgi.ini) contra la misma base SQLite temporal y, para cada
+uno:
+
+- espera a que todos los workers tengan la app cargada (stats server);
+- manda una tanda de requests concurrentes (uno por thread de cada worker)
+  al recibo PDF de una operacion y otra a GET /api/operations/changes?limit=50,
+  y reporta la latencia de esas primeras tandas (lo que paga el primer usuario
+  de cada worker); una segunda tanda de recibos da la referencia en caliente;
+- mide RSS, PSS y USS de cada worker (/proc/<pid>/smaps_rollup, solo Linux).
+  PSS reparte las paginas compartidas entre los procesos que las usan: es la
+  metrica que baja cuando los workers comparten la app copy-on-write.
+
+El token JWT se firma localmente (mismo JWT_SECRET_KEY) para no calentar un
+worker con el login antes de medir.
+
+Uso:
+    python benchmarks/startup.py
+    python benchmarks/startup.py --modes preload --operations 100000
+"""
+import argparse
+import json
+import os
+import platform
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import requests
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks.load_test import INTERNAL_USER, git_commit, percentile  # noqa: E402
+
+MODES = {
+    'cold': {'args': ['--lazy-apps'], 'PRELOAD_APP': 'False', 'WARMUP_ENABLED': 'False'},
+    'lazy': {'args': ['--lazy-apps'], 'PRELOAD_APP': 'False', 'WARMUP_ENABLED': 'True'},
+    'preload': {'args': [], 'PRELOAD_APP': 'True', 'WARMUP_ENABLED': 'True'},  # lazy-apps = false de uwsgi.ini
+}
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def prepare_database(database_url, operations):
+    """Create the schema, the benchmark user and `operations` synthetic rows; return (token, operation_id)"""
+    os.environ['DATABASE_URL'] = database_url
+    os.environ.setdefault('LOG_LEVEL', 'WARNING')
+    from flask_jwt_extended import create_access_token
+    from app import create_app, db
+    from models import Operation, User
+    from services.data_generator import generate_operations
+
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        user = User(email=INTERNAL_USER[0], is_internal=True)
+        user.set_password(INTERNAL_USER[1])
+        db.session.add(user)
+        db.session.commit()
+        generate_operations(operations)
+        operation_id = db.session.execute(db.select(Operation.operation_id).limit(1)).scalar()
+        token = create_access_token(identity=INTERNAL_USER[0], additional_claims={'is_internal': True})
+    return token, operation_id
+
+
+def stats(port):
+    with socket.create_connection(('127.0.0.1', port), timeout=2) as s:
+        chunks = []
+        while True:
+            chunk = s.recv(65536)
+            if not chunk:
+                break
+            chunks.append(chunk)
+    return json.loads(b''.join(chunks))
+
+
+def wait_ready(process, stats_port, timeout=60):
+    """Worker pids once every worker reports a loaded app"""
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"uwsgi exited with code {process.returncode}")
+        try:
+            workers = stats(stats_port)['workers']
+            if workers and all(w['pid'] and w['apps'] for w in workers):
+                return [w['pid'] for w in workers]
+        except (OSError, ValueError, KeyError):
+            pass
+        time.sleep(0.1)
+    raise RuntimeError('uwsgi workers did not become ready')
+
+
+def memory(pid):
+    fields = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) >= 2 and parts[1].isdigit():
+                fields[parts[0].rstrip(':')] = int(parts[1])
+    return {
+        'rss_kb': fields.get('Rss', 0),
+        'pss_kb': fields.get('Pss', 0),
+        'uss_kb': fields.get('Private_Clean', 0) + fields.get('Private_Dirty', 0),
+    }
+
+
+def first_wave(url, token, concurrency):
+    """Latencies (ms) of `concurrency` simultaneous first requests"""
+    headers = {'Authorization': f'Bearer {token}'}
+
+    def call(_):
+        start = time.perf_counter()
+        response = requests.get(url, headers=headers, timeout=60)
+        response.raise_for_status()
+        return (time.perf_counter() - start) * 1000
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        latencies = sorted(pool.map(call, range(concurrency)))
+    return {
+        'p50_ms': round(percentile(latencies, 0.50), 2),
+        'max_ms': round(latencies[-1], 2),
+    }
+
+
+def run_mode(mode, database_url, token, operation_id, processes, threads):
+    http_port, stats_port = free_port(), free_port()
+    options = MODES[mode]
+    env = dict(os.environ, DATABASE_URL=database_url, PRELOAD_APP=options['PRELOAD_APP'],
+               WARMUP_ENABLED=options['WARMUP_ENABLED'], LOG_FILE=os.path.join(tempfile.mkdtemp(), 'uwsgi-bench.log'))
+    command = [
+        'uwsgi', '--ini', os.path.join(ROOT, 'uwsgi.ini'),
+        '--http', f"127.0.0.1:{http_port}", '--stats', f"127.0.0.1:{stats_port}",
+        '--processes', str(processes), '--threads', str(threads),
+        '--env', f"PRELOAD_APP={options['PRELOAD_APP']}", '--logto', os.devnull, '--chdir', ROOT,
+    ] + options['args']
+    process = subprocess.Popen(command, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        start = time.perf_counter()
+        pids = wait_ready(process, stats_port)
+        ready_s = time.perf_counter() - start
+        time.sleep(0.5)
+
+        base_url = f"http://127.0.0.1:{http_port}"
+        concurrency = processes * threads
+        result = {
+            'ready_s': round(ready_s, 2),
+            'first_receipt': first_wave(f"{base_url}/operations/{operation_id}/receipt/", token, concurrency),
+            'first_changes': first_wave(f"{base_url}/api/operations/changes?limit=50", token, concurrency),
+            'warm_receipt': first_wave(f"{base_url}/operations/{operation_id}/receipt/", token, concurrency),
+        }
+        workers = [memory(pid) for pid in pids]
+        for key in ('rss_kb', 'pss_kb', 'uss_kb'):
+            result[f"worker_{key}"] = round(sum(w[key] for w in workers) / len(workers))
+        result['total_pss_kb'] = sum(w['pss_kb'] for w in workers) + memory(process.pid)['pss_kb']
+        return result
+    finally:
+        process.terminate()
+        process.wait(timeout=30)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--modes', default=','.join(MODES))
+    parser.add_argument('--processes', type=int, default=4)
+    parser.add_argument('--threads', type=int, default=2)
+    parser.add_argument('--operations', type=int, default=20000, help='Synthetic rows in the scratch database')
+    parser.add_argument('--output', help='Result file (default: benchmarks/results/startup-<timestamp>-<commit>.json)')
+    args = parser.parse_args(argv)
+
+    database_url = f"sqlite:///{tempfile.mkdtemp()}/startup.db"
+    token, operation_id = prepare_database(database_url, args.operations)
+
+    results = {}
+    for mode in args.modes.split(','):
+        r = results[mode] = run_mode(mode, database_url, token, operation_id, args.processes, args.threads)
+        print(f"{mode:8s} ready {r['ready_s']:>5.2f}s  worker RSS {r['worker_rss_kb'] / 1024:>6.1f}MB  "
+              f"PSS {r['worker_pss_kb'] / 1024:>6.1f}MB  USS {r['worker_uss_kb'] / 1024:>6.1f}MB  "
+              f"first receipt p50 {r['first_receipt']['p50_ms']:>7.2f}ms  "
+              f"first changes p50 {r['first_changes']['p50_ms']:>7.2f}ms  "
+              f"warm receipt p50 {r['warm_receipt']['p50_ms']:>7.2f}ms")
+
+    report = {
+        'kind': 'startup',
+        'commit': git_commit(),
+        'timestamp': datetime.utcnow().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'processes': args.processes,
+        'threads': args.threads,
+        'operations': args.operations,
+        'modes': results,
+    }
+    output = args.output or os.path.join(
+        ROOT, 'benchmarks', 'results',
+        f"startup-{datetime.utcnow().strftime('%Y%m%dT%H%M%S')}-{report['commit']}.json"
+    )
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {output}")
+    return report
+
+
+if __name__ == '__main__':
+    main()
@@ -1,6 +1,7 @@
 import os
 import click
-from flask.cli import with_appcontext
+from datetime import datetime
+from flask.cli import AppGroup, with_appcontext
 from flask import current_app
 from app import db
 
@@ -11,5 +12,131 @@ def init_db():
     db.create_all()
     click.echo('Initialized the database.')
 
+operations_cli = AppGroup('operations', help='Partition and archive management for operations.')
+
+@operations_cli.command('create-partitions')
+@click.option('--months-ahead', default=3, show_default=True, help='Months to pre-create after the current one.')
+def create_partitions(months_ahead):
+    """Create upcoming monthly partitions (Postgres only)."""
+    from services.partitioning import ensure_partitions, is_partitioned
+
+    if not is_partitioned():
+        click.echo('The operations table is not partitioned (SQLite or migration not applied); nothing to do.')
+        return
+    created = ensure_partitions(months_ahead)
+    click.echo(f"Created {len(created)} partitions: {', '.join(created) or '-'}")
+
+@operations_cli.command('archive')
+@click.option('--before', help='Archive months strictly before this month (YYYY-MM). '
+                               'Defaults to ARCHIVE_RETENTION_MONTHS ago.')
+@click.option('--format', 'fmt', type=click.Choice(['ndjson', 'parquet']), default='ndjson', show_default=True)
+@click.option('--archive-dir', help='Destination directory (defaults to ARCHIVE_DIR).')
+def archive(before, fmt, archive_dir):
+    """Move old months of operations to compressed files readable by the export endpoint."""
+    from services.partitioning import add_months, archive_operations, month_start
+
+    if before:
+        cutoff = datetime.strptime(before, '%Y-%m').date()
+    else:
+        cutoff = add_months(month_start(datetime.utcnow()), -current_app.config['ARCHIVE_RETENTION_MONTHS'])
+
+    archived = archive_operations(cutoff, archive_dir or current_app.config['ARCHIVE_DIR'], fmt)
+    for entry in archived:
+        click.echo(f"{entry['month']}: {entry['rows']} rows -> {entry['path']}")
+    click.echo(f"Archived {len(archived)} months before {cutoff.isoformat()[:7]}.")
+
+@operations_cli.command('purge-idempotency-keys')
+def purge_idempotency_keys():
+    """Delete expired Idempotency-Key responses."""
+    from services.idempotency import purge_expired_keys
+
+    click.echo(f"Deleted {purge_expired_keys()} expired idempotency keys.")
+
+@operations_cli.command('generate')
+@click.option('--rows', default=1000000, show_default=True, help='Number of operations to insert.')
+@click.option('--seed', default=42, show_default=True, help='Random seed (same seed + range = same data).')
+@click.option('--chunk-size', default=50000, show_default=True, help='Rows per COPY/executemany batch.')
+@click.option('--days', default=365, show_default=True, help='Length of the created_at range.')
+@click.option('--end', help='Last day of the range (YYYY-MM-DD). Defaults to today; pin it for reproducible data.')
+@click.option('--users', default=5000, show_default=True, help='Distinct user_email values.')
+@click.option('--truncate', is_flag=True, help='Delete existing operations first.')
+def generate(rows, seed, chunk_size, days, end, users, truncate):
+    """Bulk-insert synthetic operations for load and query-plan benchmarks."""
+    from models import Operation
+    from services.data_generator import generate_operations
+
+    if truncate:
+        Operation.query.delete()
+        db.session.commit()
+
+    def progress(inserted, elapsed):
+        click.echo(f"  {inserted:>10,} rows  {inserted / elapsed:>10,.0f} rows/s")
+
+    stats = generate_operations(
+        rows, seed=seed, chunk_size=chunk_size, days=days,
+        end=datetime.strptime(end, '%Y-%m-%d') if end else None,
+        users=users, progress=progress
+    )
+    click.echo(f"Inserted {stats['rows']:,} operations ({stats['start']} .. {stats['end']}) "
+               f"in {stats['seconds']}s: {stats['rows_per_second']:,} rows/s")
+
+ingest_cli = AppGroup('ingest', help='Asynchronous ingestion of public operations.')
+
+@ingest_cli.command('worker')
+@click.option('--threads', default=1, show_default=True, help='Consumers in this process (Redis backend only).')
+@click.option('--batch-size', default=500, show_default=True, help='Max operations per INSERT.')
+@click.option('--block-ms', default=1000, show_default=True, help='How long to wait for new messages.')
+@click.option('--drain', is_flag=True, help='Exit when the queue is empty.')
+def ingest_worker(threads, batch_size, block_ms, drain):
+    """Drain the ingest queue into the database in batches."""
+    import threading
+    from services.ingestion import LocalLogQueue, ingest_queue, run_worker
+
+    app = current_app._get_current_object()
+    if isinstance(ingest_queue(), LocalLogQueue) and threads > 1:
+        click.echo('The local log backend supports a single consumer; using --threads 1.')
+        threads = 1
+
+    stop = threading.Event()
+    totals = []
+
+    def consume():
+        totals.append(run_worker(app, batch_size=batch_size, block_ms=block_ms, stop=stop, drain=drain))
+
+    workers = [threading.Thread(target=consume, name=f'ingest-{i}') for i in range(threads)]
+    for worker in workers:
+        worker.start()
+    try:
+        for worker in workers:
+            while worker.is_alive():
+                worker.join(0.5)
+    except KeyboardInterrupt:
+        stop.set()
+        for worker in workers:
+            worker.join()
+
+    inserted = sum(total['inserted'] for total in totals)
+    click.echo(f"Ingest worker stopped: {inserted} operations inserted.")
+
+email_cli = AppGroup('email', help='Confirmation email delivery.')
+
+@email_cli.command('worker')
+@click.option('--batch-size', default=100, show_default=True, help='Emails per XREADGROUP / SMTP connection.')
+@click.option('--block-ms', default=5000, show_default=True, help='How long to wait for new messages.')
+@click.option('--drain', is_flag=True, help='Exit when the stream is empty.')
+def email_worker(batch_size, block_ms, drain):
+    """Send confirmation emails from the Redis Stream (run one per process to scale out)."""
+    from services.email_stream import run_email_worker
+
+    try:
+        totals = run_email_worker(current_app._get_current_object(), batch_size=batch_size,
+                                  block_ms=block_ms, drain=drain)
+    except KeyboardInterrupt:
+        return
+    click.echo(f"Email worker stopped: {totals['sent']} of {totals['received']} emails sent.")
+
 def init_app(app):
     app.cli.add_command(init_db)
+    app.cli.add_command(operations_cli)
+    app.cli.add_command(ingest_cli)
+    app.cli.add_command(email_cli)
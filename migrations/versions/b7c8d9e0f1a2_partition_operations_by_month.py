@@ -0,0 +1,110 @@
+"""Partition operations by created_at month
+
+Revision ID: b7c8d9e0f1a2
+Revises: a1b2c3d4e5f6
+Create Date: 2026-10-18 10:00:00.000000
+
+Postgres: operations pasa a ser una tabla particionada por RANGE(created_at),
+con una particion por mes que tenga datos, los proximos 3 meses y una
+particion DEFAULT. Postgres exige que la PK y los UNIQUE incluyan la clave de
+particion, asi que quedan como (id, created_at) y (operation_id, created_at);
+operation_id sigue siendo un UUID4 generado por la aplicacion.
+
+SQLite (fallback local): sin particiones, solo se agrega el indice sobre
+created_at. `flask operations archive` borra por rango en lugar de DROP.
+"""
+from alembic import op
+import sqlalchemy as sa
+from datetime import date, datetime
+
+
+# revision identifiers, used by Alembic.
+revision = 'b7c8d9e0f1a2'
+down_revision = 'a1b2c3d4e5f6'
+branch_labels = None
+depends_on = None
+
+MONTHS_AHEAD = 3
+
+
+def _add_months(value, months):
+    index = value.year * 12 + value.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def upgrade():
+    bind = op.get_bind()
+
+    if bind.dialect.name != 'postgresql':
+        with op.batch_alter_table('operations') as batch_op:
+            batch_op.alter_column('created_at', existing_type=sa.DateTime(), nullable=False,
+                                  server_default=sa.func.current_timestamp())
+            batch_op.create_index('ix_operations_created_at', ['created_at'])
+        return
+
+    op.execute("UPDATE operations SET created_at = now() WHERE created_at IS NULL")
+    op.execute("ALTER TABLE operations RENAME TO operations_legacy")
+    op.execute("ALTER TABLE operations_legacy RENAME CONSTRAINT operations_pkey TO operations_legacy_pkey")
+    op.execute("ALTER TABLE operations_legacy RENAME CONSTRAINT operations_operation_id_key "
+               "TO operations_legacy_operation_id_key")
+    op.execute("ALTER SEQUENCE operations_id_seq OWNED BY NONE")
+    op.execute("""
+        CREATE TABLE operations (
+            id INTEGER NOT NULL DEFAULT nextval('operations_id_seq'),
+            operation_id VARCHAR(36) NOT NULL,
+            type VARCHAR(100) NOT NULL,
+            amount FLOAT NOT NULL,
+            carbon_score FLOAT NOT NULL,
+            user_email VARCHAR(120),
+            created_at TIMESTAMP WITHOUT TIME ZONE NOT NULL DEFAULT now(),
+            PRIMARY KEY (id, created_at),
+            UNIQUE (operation_id, created_at)
+        ) PARTITION BY RANGE (created_at)
+    """)
+
+    oldest = bind.execute(sa.text("SELECT min(created_at) FROM operations_legacy")).scalar()
+    current = date(datetime.utcnow().year, datetime.utcnow().month, 1)
+    month = date(oldest.year, oldest.month, 1) if oldest else current
+    last = _add_months(current, MONTHS_AHEAD)
+    while month <= last:
+        op.execute(
+            f"CREATE TABLE operations_p{month.year:04d}_{month.month:02d} PARTITION OF operations "
+            f"FOR VALUES FROM ('{month.isoformat()}') TO ('{_add_months(month, 1).isoformat()}')"
+        )
+        month = _add_months(month, 1)
+    op.execute("CREATE TABLE operations_pdefault PARTITION OF operations DEFAULT")
+
+    op.execute("CREATE INDEX ix_operations_created_at ON operations (created_at)")
+    op.execute("INSERT INTO operations SELECT * FROM operations_legacy")
+    op.execute("DROP TABLE operations_legacy")
+    op.execute("ALTER SEQUENCE operations_id_seq OWNED BY operations.id")
+
+
+def downgrade():
+    bind = op.get_bind()
+
+    if bind.dialect.name != 'postgresql':
+        with op.batch_alter_table('operations') as batch_op:
+            batch_op.drop_index('ix_operations_created_at')
+            batch_op.alter_column('created_at', existing_type=sa.DateTime(), nullable=True,
+                                  server_default=None)
+        return
+
+    op.execute("ALTER TABLE operations RENAME TO operations_partitioned")
+    op.execute("ALTER TABLE operations_partitioned RENAME CONSTRAINT operations_pkey TO operations_partitioned_pkey")
+    op.execute("DROP INDEX ix_operations_created_at")
+    op.execute("ALTER SEQUENCE operations_id_seq OWNED BY NONE")
+    op.execute("""
+        CREATE TABLE operations (
+            id INTEGER NOT NULL DEFAULT nextval('operations_id_seq') PRIMARY KEY,
+            operation_id VARCHAR(36) NOT NULL UNIQUE,
+            type VARCHAR(100) NOT NULL,
+            amount FLOAT NOT NULL,
+            carbon_score FLOAT NOT NULL,
+            user_email VARCHAR(120),
+            created_at TIMESTAMP WITHOUT TIME ZONE
+        )
+    """)
+    op.execute("INSERT INTO operations SELECT * FROM operations_partitioned")
+    op.execute("DROP TABLE operations_partitioned")
+    op.execute("ALTER SEQUENCE operations_id_seq OWNED BY operations.id")
@@ -0,0 +1,81 @@
+"""Add seq/txid to operations for the change feed
+
+Revision ID: d9e0f1a2b3c4
+Revises: c8d9e0f1a2b3
+Create Date: 2026-10-19 09:00:00.000000
+
+GET /api/operations/changes pagina por (txid, seq) con el indice
+ix_operations_changes (ver services/change_feed.py).
+
+Postgres: seq sale de la secuencia operations_seq y txid de
+pg_current_xact_id(); las filas existentes quedan con txid = 0 y seq en orden
+de (created_at, id). SQLite: contador en la tabla operations_seq y trigger que
+asigna seq a los INSERT que no la traen; txid queda en 0.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd9e0f1a2b3c4'
+down_revision = 'c8d9e0f1a2b3'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    bind = op.get_bind()
+
+    if bind.dialect.name == 'postgresql':
+        op.execute("CREATE SEQUENCE operations_seq")
+        op.add_column('operations', sa.Column('seq', sa.BigInteger(), nullable=True))
+        op.add_column('operations', sa.Column('txid', sa.BigInteger(), nullable=False, server_default='0'))
+        op.execute("""
+            UPDATE operations o SET seq = numbered.rn
+            FROM (SELECT id, created_at, row_number() OVER (ORDER BY created_at, id) AS rn FROM operations) numbered
+            WHERE o.id = numbered.id AND o.created_at = numbered.created_at
+        """)
+        op.execute("SELECT setval('operations_seq', coalesce((SELECT max(seq) FROM operations), 0) + 1, false)")
+        op.execute("ALTER TABLE operations ALTER COLUMN seq SET DEFAULT nextval('operations_seq')")
+        op.execute("ALTER TABLE operations ALTER COLUMN txid SET DEFAULT pg_current_xact_id()::text::bigint")
+        op.execute("ALTER SEQUENCE operations_seq OWNED BY operations.seq")
+        op.create_index('ix_operations_changes', 'operations', ['txid', 'seq'])
+        return
+
+    with op.batch_alter_table('operations') as batch_op:
+        batch_op.add_column(sa.Column('seq', sa.BigInteger(), nullable=True))
+        batch_op.add_column(sa.Column('txid', sa.BigInteger(), nullable=False, server_default='0'))
+        batch_op.create_index('ix_operations_changes', ['txid', 'seq'])
+
+    op.execute("""
+        UPDATE operations SET seq = numbered.rn
+        FROM (SELECT id, row_number() OVER (ORDER BY created_at, id) AS rn FROM operations) AS numbered
+        WHERE operations.id = numbered.id
+    """)
+    op.execute("CREATE TABLE operations_seq (value INTEGER NOT NULL)")
+    op.execute("INSERT INTO operations_seq (value) SELECT coalesce(max(seq), 0) FROM operations")
+    op.execute("""
+        CREATE TRIGGER operations_assign_seq AFTER INSERT ON operations
+        WHEN NEW.seq IS NULL
+        BEGIN
+            UPDATE operations_seq SET value = value + 1;
+            UPDATE operations SET seq = (SELECT value FROM operations_seq) WHERE id = NEW.id;
+        END
+    """)
+
+
+def downgrade():
+    bind = op.get_bind()
+
+    if bind.dialect.name == 'postgresql':
+        op.drop_index('ix_operations_changes', table_name='operations')
+        op.drop_column('operations', 'txid')
+        op.drop_column('operations', 'seq')  # arrastra operations_seq (OWNED BY)
+        return
+
+    op.execute("DROP TRIGGER IF EXISTS operations_assign_seq")
+    op.execute("DROP TABLE IF EXISTS operations_seq")
+    with op.batch_alter_table('operations') as batch_op:
+        batch_op.drop_index('ix_operations_changes')
+        batch_op.drop_column('txid')
+        batch_op.drop_column('seq')
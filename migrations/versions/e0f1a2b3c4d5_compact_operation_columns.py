@@ -0,0 +1,99 @@
+"""Store operation_id as UUID/16 bytes and amounts as fixed-point integers
+
+Revision ID: e0f1a2b3c4d5
+Revises: d9e0f1a2b3c4
+Create Date: 2026-10-19 11:00:00.000000
+
+operation_id: VARCHAR(36) -> UUID nativo (Postgres) o BLOB de 16 bytes (SQLite).
+amount / carbon_score: FLOAT -> BIGINT con 6 y 4 decimales (FixedPoint en
+models.py). La API sigue viendo strings y floats (services/db_types.py).
+
+SQLite no tiene ALTER COLUMN: los valores se convierten primero en Python (el
+tipado flexible los acepta en las columnas viejas) y despues batch recrea la
+tabla con los tipos nuevos; el CAST de la copia deja los valores como estan.
+Al recrear la tabla se pierde el trigger de seq, que se vuelve a crear.
+"""
+import uuid
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e0f1a2b3c4d5'
+down_revision = 'd9e0f1a2b3c4'
+branch_labels = None
+depends_on = None
+
+AMOUNT_FACTOR = 10 ** 6
+SCORE_FACTOR = 10 ** 4
+BATCH_SIZE = 10000
+
+SEQ_TRIGGER = """
+    CREATE TRIGGER operations_assign_seq AFTER INSERT ON operations
+    WHEN NEW.seq IS NULL
+    BEGIN
+        UPDATE operations_seq SET value = value + 1;
+        UPDATE operations SET seq = (SELECT value FROM operations_seq) WHERE id = NEW.id;
+    END
+"""
+
+
+def _convert_sqlite_rows(convert):
+    bind = op.get_bind()
+    rows = bind.execute(sa.text("SELECT id, operation_id, amount, carbon_score FROM operations")).fetchall()
+    for start in range(0, len(rows), BATCH_SIZE):
+        bind.execute(
+            sa.text("UPDATE operations SET operation_id = :operation_id, amount = :amount, "
+                    "carbon_score = :carbon_score WHERE id = :id"),
+            [convert(row) for row in rows[start:start + BATCH_SIZE]]
+        )
+
+
+def _alter_sqlite(operation_id_type, number_type):
+    op.execute("DROP TRIGGER IF EXISTS operations_assign_seq")
+    with op.batch_alter_table('operations') as batch_op:
+        batch_op.alter_column('operation_id', type_=operation_id_type, existing_nullable=False)
+        batch_op.alter_column('amount', type_=number_type, existing_nullable=False)
+        batch_op.alter_column('carbon_score', type_=number_type, existing_nullable=False)
+
+
+def upgrade():
+    bind = op.get_bind()
+
+    if bind.dialect.name == 'postgresql':
+        op.execute("ALTER TABLE operations ALTER COLUMN operation_id TYPE uuid USING operation_id::uuid")
+        op.execute(f"ALTER TABLE operations ALTER COLUMN amount TYPE bigint USING round(amount * {AMOUNT_FACTOR})::bigint")
+        op.execute(f"ALTER TABLE operations ALTER COLUMN carbon_score TYPE bigint "
+                   f"USING round(carbon_score * {SCORE_FACTOR})::bigint")
+        return
+
+    _convert_sqlite_rows(lambda row: {
+        'id': row.id,
+        'operation_id': uuid.UUID(row.operation_id).bytes,
+        'amount': round(row.amount * AMOUNT_FACTOR),
+        'carbon_score': round(row.carbon_score * SCORE_FACTOR),
+    })
+    _alter_sqlite(sa.LargeBinary(16), sa.BigInteger())
+    op.execute(SEQ_TRIGGER)
+
+
+def downgrade():
+    bind = op.get_bind()
+
+    if bind.dialect.name == 'postgresql':
+        op.execute("ALTER TABLE operations ALTER COLUMN operation_id TYPE varchar(36) USING operation_id::text")
+        op.execute(f"ALTER TABLE operations ALTER COLUMN amount TYPE double precision "
+                   f"USING amount::double precision / {AMOUNT_FACTOR}")
+        op.execute(f"ALTER TABLE operations ALTER COLUMN carbon_score TYPE double precision "
+                   f"USING carbon_score::double precision / {SCORE_FACTOR}")
+        return
+
+    _convert_sqlite_rows(lambda row: {
+        'id': row.id,
+        'operation_id': str(uuid.UUID(bytes=row.operation_id)),
+        'amount': row.amount / AMOUNT_FACTOR,
+        'carbon_score': row.carbon_score / SCORE_FACTOR,
+    })
+    _alter_sqlite(sa.String(36), sa.Float())
+    op.execute(SEQ_TRIGGER)
@@ -0,0 +1,28 @@
+"""Store response headers with idempotency keys
+
+Revision ID: f1a2b3c4d5e6
+Revises: e0f1a2b3c4d5
+Create Date: 2026-10-19 18:00:00.000000
+
+Un reintento del 202 de la ingesta asincrona tiene que devolver el mismo
+header Location que la respuesta original.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f1a2b3c4d5e6'
+down_revision = 'e0f1a2b3c4d5'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('idempotency_keys', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('response_headers', sa.Text(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('idempotency_keys', schema=None) as batch_op:
+        batch_op.drop_column('response_headers')
@@ -1,5 +1,7 @@
 from app import db
 from datetime import datetime
+from sqlalchemy import DDL, event
+from services.db_types import GUID, FixedPoint
 from werkzeug.security import generate_password_hash, check_password_hash
 import uuid
 
@@ -41,12 +43,23 @@ class Operation(db.Model):
     __tablename__ = 'operations'
 
     id = db.Column(db.Integer, primary_key=True)
-    operation_id = db.Column(db.String(36), unique=True, nullable=False, default=lambda: str(uuid.uuid4()))
+    # UUID nativo / 16 bytes y decimales como enteros (services/db_types.py); en Python, str y float
+    operation_id = db.Column(GUID(), unique=True, nullable=False, default=lambda: str(uuid.uuid4()))
     type = db.Column(db.String(100), nullable=False)  # electricity, transportation, heating, manufacturing
-    amount = db.Column(db.Float, nullable=False)
-    carbon_score = db.Column(db.Float, nullable=False)  # Calculado por CarbonCalculatorService
+    amount = db.Column(FixedPoint(6), nullable=False)
+    carbon_score = db.Column(FixedPoint(4), nullable=False)  # Calculado por CarbonCalculatorService
     user_email = db.Column(db.String(120), nullable=True)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    # Clave de particion mensual en Postgres (ver services/partitioning.py)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False, index=True)
+    # Feed de cambios (services/change_feed.py): posicion (txid, seq), ambas asignadas por la base
+    seq = db.Column(db.BigInteger, nullable=True)  # secuencia operations_seq
+    txid = db.Column(db.BigInteger, nullable=False, server_default='0')  # transaccion que inserto (Postgres)
+
+    __table_args__ = (db.Index('ix_operations_changes', 'txid', 'seq'),)
+
+    # Claves de to_dict(), en orden; los listados las seleccionan como tuplas
+    # (services/json_provider.serialize_rows) en vez de hidratar objetos
+    SERIALIZED_COLUMNS = ('operation_id', 'type', 'amount', 'carbon_score', 'user_email', 'created_at')
 
     def __init__(self, **kwargs):
         super(Operation, self).__init__(**kwargs)
@@ -62,3 +75,54 @@ class Operation(db.Model):
             'user_email': self.user_email,
             'created_at': self.created_at.isoformat()
         }
+
+    @classmethod
+    def serialized_select(cls):
+        """select() of SERIALIZED_COLUMNS, yielding plain tuples"""
+        return db.select(*[getattr(cls, name) for name in cls.SERIALIZED_COLUMNS])
+
+# Defaults de seq/txid por motor (las migraciones hacen lo mismo que create_all):
+# - Postgres: secuencia operations_seq y txid = transaccion actual
+# - SQLite: contador en la tabla operations_seq, asignado por trigger si el INSERT no trae seq
+for statement in (
+    "CREATE SEQUENCE IF NOT EXISTS operations_seq",
+    "ALTER TABLE operations ALTER COLUMN seq SET DEFAULT nextval('operations_seq')",
+    "ALTER TABLE operations ALTER COLUMN txid SET DEFAULT pg_current_xact_id()::text::bigint",
+    "ALTER SEQUENCE operations_seq OWNED BY operations.seq",
+):
+    event.listen(Operation.__table__, 'after_create', DDL(statement).execute_if(dialect='postgresql'))
+
+SQLITE_SEQ_DDL = (
+    "CREATE TABLE IF NOT EXISTS operations_seq (value INTEGER NOT NULL)",
+    "INSERT INTO operations_seq (value) SELECT 0 WHERE NOT EXISTS (SELECT 1 FROM operations_seq)",
+    """
+    CREATE TRIGGER IF NOT EXISTS operations_assign_seq AFTER INSERT ON operations
+    WHEN NEW.seq IS NULL
+    BEGIN
+        UPDATE operations_seq SET value = value + 1;
+        UPDATE operations SET seq = (SELECT value FROM operations_seq) WHERE id = NEW.id;
+    END
+    """,
+)
+for statement in SQLITE_SEQ_DDL:
+    event.listen(Operation.__table__, 'after_create', DDL(statement).execute_if(dialect='sqlite'))
+event.listen(Operation.__table__, 'after_drop', DDL("DROP TABLE IF EXISTS operations_seq").execute_if(dialect='sqlite'))
+
+class IdempotencyKey(db.Model):
+    """
+    Respuesta guardada para un header Idempotency-Key (ver services/idempotency.py).
+    scope = identidad JWT + endpoint, asi la misma clave en otro cliente o endpoint no choca.
+    Se inserta en la misma transaccion que la operacion; expira a los IDEMPOTENCY_KEY_TTL segundos.
+    """
+    __tablename__ = 'idempotency_keys'
+    __table_args__ = (db.UniqueConstraint('scope', 'key', name='uq_idempotency_keys_scope_key'),)
+
+    id = db.Column(db.Integer, primary_key=True)
+    scope = db.Column(db.String(200), nullable=False)
+    key = db.Column(db.String(255), nullable=False)
+    request_hash = db.Column(db.String(64), nullable=False)  # sha256 del body
+    status_code = db.Column(db.Integer, nullable=True)  # NULL mientras el request original no termina
+    response_body = db.Column(db.Text, nullable=True)
+    response_headers = db.Column(db.Text, nullable=True)  # JSON, p.ej. Location de un 202
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
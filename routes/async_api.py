@@ -0,0 +1,279 @@
+"""
+Vistas async del modo ASGI (ver services/asgi_app.py).
+
+Cada una implementa el mismo endpoint, con las mismas respuestas, que su
+vista Flask de internal_api, public_api, receipts o backoffice:
+- I/O (base, Redis) con await: engine async y redis.asyncio.
+- CPU (hash del password en el login, render del PDF, serializacion del
+  listado) en el executor de services/async_io.py.
+- El feed en vivo del backoffice como async generator: un viewer es una
+  corutina esperando su cola, no uno de los ASGI_WSGI_THREADS.
+- Lo que no esta portado vuelve a la vista sync con ServeWithWSGI antes de
+  tocar nada: Idempotency-Key (la clave se reserva en la misma transaccion
+  sync que la operacion) y la ingesta asincrona de la API publica.
+"""
+from flask import current_app, jsonify, request, send_file
+from flask_jwt_extended import create_access_token, get_jwt, get_jwt_identity, verify_jwt_in_request
+from sqlalchemy import select
+
+from models import Operation, User
+from services.asgi_app import ServeWithWSGI, async_view
+from services.async_io import async_session, run_in_executor
+from services.carbon_calculator import CarbonCalculatorService
+from services.email_service import EmailService
+from services.http_cache import not_modified_response, operations_etag_async, tag_response
+from services.idempotency import HEADER as IDEMPOTENCY_HEADER
+from services.ingestion import use_async_ingest
+from services.json_provider import serialize_rows
+from routes.backoffice import check_stream_token
+from services.live_feed import StreamLimitReached, open_stream_async, publish_operations_async
+from services.operation_cache import operation_cache
+from services.rate_limit import admit_async
+from services.receipt_renderer import render_operation_receipt
+from services.response_cache import (bump_operations_generation_async, cached_body_async,
+                                     operations_generation_async)
+import logging
+
+carbon_calculator = CarbonCalculatorService()
+email_service = EmailService()
+logger = logging.getLogger(__name__)
+
+
+async def _login(is_internal: bool):
+    data = request.get_json()
+    if not data or 'email' not in data or 'password' not in data:
+        return jsonify({'error': 'Missing email or password'}), 400
+
+    async with async_session() as session:
+        user = (await session.scalars(
+            select(User).filter_by(email=data['email'], is_internal=is_internal).limit(1)
+        )).first()
+    # Hash del password (pbkdf2/scrypt): CPU, fuera del event loop
+    if not user or not await run_in_executor(user.check_password, data['password']):
+        logger.warning(f"Invalid credentials for {'internal' if is_internal else 'public'} user: {data['email']}")
+        return jsonify({'error': 'Invalid credentials'}), 401
+
+    access_token = create_access_token(identity=user.email, additional_claims={'is_internal': is_internal})
+    logger.info(f"{'Internal' if is_internal else 'Public'} user logged in successfully: {user.email}")
+    return jsonify({'access_token': access_token, 'user': user.to_dict()}), 200
+
+
+@async_view('internal_api.internal_login')
+async def internal_login():
+    """Login for internal users"""
+    try:
+        return await _login(is_internal=True)
+    except Exception as e:
+        logger.error(f"Error in internal login: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+
+@async_view('public_api.public_login')
+async def public_login():
+    """Login for public users"""
+    limited = await admit_async('public_api')
+    if limited is not None:
+        return limited
+    try:
+        return await _login(is_internal=False)
+    except Exception as e:
+        logger.error(f"Error in public login: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+
+def _invalid_operation(data):
+    if not data or 'type' not in data or 'amount' not in data:
+        return jsonify({'error': 'Missing required fields: type, amount'}), 400
+    if data['amount'] <= 0:
+        logger.warning(f"Invalid amount provided: {data['amount']}")
+        return jsonify({'error': 'Amount must be greater than 0'}), 400
+    if not Operation.amount.type.fits(data['amount']):
+        logger.warning(f"Amount out of range: {data['amount']}")
+        return jsonify({'error': 'Amount is out of range'}), 400
+    if not Operation.amount.type.has_scale(data['amount']):
+        logger.warning(f"Amount with too many decimals: {data['amount']}")
+        return jsonify({'error': f"Amount must have at most {Operation.amount.type.scale} decimals"}), 400
+    return None
+
+
+async def _carbon_score(operation_type, amount):
+    if carbon_calculator.use_external_api:
+        return await run_in_executor(carbon_calculator.calculate_carbon_score, operation_type, amount)
+    return carbon_calculator.calculate_carbon_score(operation_type, amount)
+
+
+def _invalid_score(carbon_score):
+    if not Operation.carbon_score.type.fits(carbon_score):
+        logger.warning(f"Carbon score out of range: {carbon_score}")
+        return jsonify({'error': 'Carbon score is out of range'}), 400
+    return None
+
+
+async def _create_operation(operation_type, amount, carbon_score, user_email) -> Operation:
+    """Insert and announce a scored operation (what the sync views do after validating)"""
+    operation = Operation(type=operation_type, amount=amount, carbon_score=carbon_score, user_email=user_email)
+    async with async_session() as session:
+        session.add(operation)
+        await session.commit()
+    # La vista sync relee la fila tras el commit; aca sin otra query, mismos valores
+    operation.amount = Operation.amount.type.round_trip(operation.amount)
+    operation.carbon_score = Operation.carbon_score.type.round_trip(operation.carbon_score)
+    await bump_operations_generation_async()
+    await operation_cache.put_async(operation)
+    await publish_operations_async([operation.to_dict()])
+    return operation
+
+
+@async_view('internal_api.create_operation')
+async def create_operation():
+    """Create a new operation (internal API)"""
+    if IDEMPOTENCY_HEADER in request.headers:
+        raise ServeWithWSGI()
+    verify_jwt_in_request()
+    try:
+        if not get_jwt().get('is_internal', False):
+            logger.warning("Non-internal user attempted to access internal endpoint")
+            return jsonify({'error': 'Access denied. Internal access required.'}), 403
+
+        data = request.get_json()
+        invalid = _invalid_operation(data)
+        if invalid is not None:
+            return invalid
+
+        carbon_score = await _carbon_score(data['type'], data['amount'])
+        invalid = _invalid_score(carbon_score)
+        if invalid is not None:
+            return invalid
+
+        operation = await _create_operation(data['type'], data['amount'], carbon_score, data.get('user_email'))
+        logger.info(f"Internal operation created successfully with ID: {operation.operation_id}")
+        return jsonify(operation.to_dict()), 201
+
+    except Exception as e:
+        logger.error(f"Error creating internal operation: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+
+async def _queue_confirmation(operation_data: dict):
+    if current_app.config['EMAIL_TRANSPORT'] != 'stream':
+        # Celery/kombu es sync: publicar desde un thread
+        return await run_in_executor(email_service.send_operation_confirmation, operation_data)
+    from services.email_stream import email_stream
+    try:
+        await email_stream().publish_async(operation_data)
+        return True
+    except Exception as e:
+        logger.error(f"Failed to queue email confirmation for operation {operation_data['operation_id']}: {str(e)}")
+        return False
+
+
+@async_view('public_api.create_public_operation')
+async def create_public_operation():
+    """Create a new operation from public API"""
+    if IDEMPOTENCY_HEADER in request.headers or use_async_ingest():
+        raise ServeWithWSGI()
+    limited = await admit_async('public_api')
+    if limited is not None:
+        return limited
+    verify_jwt_in_request()
+    try:
+        if get_jwt().get('is_internal', False):
+            logger.warning("Internal user attempted to access public endpoint")
+            return jsonify({'error': 'This endpoint is for public users only'}), 403
+
+        data = request.get_json()
+        invalid = _invalid_operation(data)
+        if invalid is not None:
+            return invalid
+        if not data.get('user_email'):
+            logger.warning("user_email is required for public operations")
+            return jsonify({'error': 'user_email is required for public operations'}), 400
+
+        carbon_score = await _carbon_score(data['type'], data['amount'])
+        invalid = _invalid_score(carbon_score)
+        if invalid is not None:
+            return invalid
+
+        operation = await _create_operation(data['type'], data['amount'], carbon_score, data['user_email'])
+        logger.info(f"Public operation created successfully with ID: {operation.operation_id}")
+        await _queue_confirmation(operation.to_dict())
+        return jsonify(operation.to_dict()), 201
+
+    except Exception as e:
+        logger.error(f"Error creating public operation: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+
+@async_view('internal_api.get_operations')
+async def get_operations():
+    """Get all operations (internal API)"""
+    verify_jwt_in_request()
+    try:
+        if not get_jwt().get('is_internal', False):
+            logger.warning("Non-internal user attempted to access internal operations endpoint")
+            return jsonify({'error': 'Access denied. Internal access required.'}), 403
+
+        generation = await operations_generation_async()
+        etag = await operations_etag_async(generation)
+        not_modified = not_modified_response(etag)
+        if not_modified is not None:
+            return not_modified
+
+        logger.info(f"Retrieving all operations for internal user: {get_jwt_identity()}")
+
+        async def render():
+            async with async_session() as session:
+                rows = (await session.execute(
+                    Operation.serialized_select().order_by(Operation.created_at.desc())
+                )).all()
+            return await run_in_executor(
+                lambda: jsonify(serialize_rows(Operation.SERIALIZED_COLUMNS, rows)).get_data()
+            )
+
+        body = await cached_body_async(generation, render)
+        return tag_response(current_app.response_class(body, mimetype='application/json'), etag), 200
+
+    except Exception as e:
+        logger.error(f"Error retrieving operations: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+
+@async_view('receipts.download_receipt')
+async def download_receipt(operation_id):
+    """Generate and download PDF receipt for an operation"""
+    verify_jwt_in_request()
+    try:
+        operation = await operation_cache.get_async(operation_id)
+        if not operation:
+            return jsonify({'error': 'Operation not found'}), 404
+
+        buffer = await run_in_executor(render_operation_receipt, operation)
+        return send_file(
+            buffer,
+            as_attachment=True,
+            download_name=f"receipt_{operation_id}.pdf",
+            mimetype='application/pdf'
+        )
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@async_view('backoffice.operations_stream')
+async def operations_stream():
+    """Server-Sent Events with the operations created from now on"""
+    if not current_app.config['LIVE_FEED_ENABLED']:
+        return jsonify({'error': 'Not found'}), 404
+    invalid = check_stream_token()
+    if invalid is not None:
+        return invalid
+
+    try:
+        events = open_stream_async()
+    except StreamLimitReached:
+        return jsonify({'error': 'Too many live streams on this worker'}), 503, {'Retry-After': '30'}
+
+    return current_app.response_class(events, mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-store',
+        'X-Accel-Buffering': 'no',  # sin buffering en proxies (nginx)
+    })
@@ -4,23 +4,59 @@ Backoffice HTML - Interfaz web para usuarios internos.
 Usa sesiones de Flask para almacenar el JWT (los navegadores no pueden
 enviar headers Authorization facilmente en cada request).
 """
-from flask import Blueprint, render_template, request, redirect, url_for, session, send_file
+from flask import Blueprint, Response, current_app, jsonify, render_template, request, redirect, url_for, session, send_file
 from flask_jwt_extended import create_access_token, decode_token
+from itsdangerous import BadSignature, URLSafeTimedSerializer
 from app import db
 from models import Operation, User
-from reportlab.lib.pagesizes import letter
-from reportlab.pdfgen import canvas
-from datetime import datetime
+from services.db_routing import read_only
+from services.live_feed import StreamLimitReached, open_stream, serves_streams
+from services.operation_cache import OperationSnapshot, operation_cache
+from services.receipt_renderer import BACKOFFICE_LABELS, render_operation_receipt
 from functools import wraps
-import io
 import logging
 
 backoffice = Blueprint('backoffice', __name__)
 logger = logging.getLogger(__name__)
 
 
+def _stream_serializer():
+    return URLSafeTimedSerializer(current_app.secret_key, salt='live-feed')
+
+
+def _stream_url():
+    """
+    URL of the live feed with a short-lived signed token, usable from another origin
+    (uwsgi-stream.ini). None when nothing can hold the stream without a thread per viewer.
+    """
+    if not current_app.config['LIVE_FEED_ENABLED']:
+        return None
+    base = current_app.config['LIVE_FEED_URL']
+    if not base:
+        if not serves_streams():
+            return None
+        base = url_for('backoffice.operations_stream')
+    # Va en la query string (EventSource no manda headers): dura LIVE_FEED_TOKEN_MAX_AGE y
+    # el listado pide uno nuevo en cada reconexion via /bo/operations/stream-url
+    token = _stream_serializer().dumps(session['user_email'])
+    return f"{base}?token={token}"
+
+
+def check_stream_token():
+    """Error response for a missing, forged or expired stream token, or None if it is valid"""
+    try:
+        _stream_serializer().loads(request.args.get('token', ''), max_age=current_app.config['LIVE_FEED_TOKEN_MAX_AGE'])
+    except BadSignature:
+        return jsonify({'error': 'Invalid or expired stream token'}), 401
+    return None
+
+
 def login_required(f):
-    """Decorador que valida JWT almacenado en sesion. Solo permite usuarios internos."""
+    """
+    Decorador que valida JWT almacenado en sesion. Solo permite usuarios internos.
+    decode_token pasa por el cache de tokens verificados (services.token_cache),
+    asi que el costo por request es un lookup en diccionario.
+    """
     @wraps(f)
     def decorated_function(*args, **kwargs):
         token = session.get('jwt_token')
@@ -78,17 +114,53 @@ def logout():
 
 @backoffice.route('/operations/')
 @login_required
+@read_only
 def operations_list():
     """List all operations"""
-    operations = Operation.query.order_by(Operation.created_at.desc()).all()
-    return render_template('operations_list.html', operations=operations)
+    # Solo las columnas de la tabla, como tuplas; el detalle sigue usando el ORM
+    operations = OperationSnapshot.fetch_all(Operation.serialized_select().order_by(Operation.created_at.desc()))
+    return render_template('operations_list.html', operations=operations, stream_url=_stream_url())
+
+
+@backoffice.route('/operations/stream-url')
+@login_required
+def operations_stream_url():
+    """Fresh live feed URL for the list page to reconnect with"""
+    stream_url = _stream_url()
+    if stream_url is None:
+        return jsonify({'error': 'Not found'}), 404
+    return jsonify({'url': stream_url}), 200, {'Cache-Control': 'no-store'}
+
+
+@backoffice.route('/operations/stream')
+def operations_stream():
+    """
+    Server-Sent Events with the operations created from now on.
+    Auth: signed token from the list page (the stream may live on another origin).
+    """
+    if not current_app.config['LIVE_FEED_ENABLED']:
+        return jsonify({'error': 'Not found'}), 404
+    invalid = check_stream_token()
+    if invalid is not None:
+        return invalid
+
+    try:
+        events = open_stream()
+    except StreamLimitReached:
+        return jsonify({'error': 'Too many live streams on this worker'}), 503, {'Retry-After': '30'}
+
+    return Response(events, mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-store',
+        'X-Accel-Buffering': 'no',  # sin buffering en proxies (nginx)
+    })
 
 
 @backoffice.route('/operations/<operation_id>/')
 @login_required
+@read_only
 def operation_detail(operation_id):
     """View operation details"""
-    operation = Operation.query.filter_by(operation_id=operation_id).first()
+    operation = operation_cache.get(operation_id)
     if not operation:
         return redirect(url_for('backoffice.operations_list'))
     return render_template('operation_detail.html', operation=operation)
@@ -96,52 +168,15 @@ def operation_detail(operation_id):
 
 @backoffice.route('/operations/<operation_id>/pdf')
 @login_required
+@read_only
 def download_pdf(operation_id):
     """Download PDF receipt for operation"""
-    operation = Operation.query.filter_by(operation_id=operation_id).first()
+    operation = operation_cache.get(operation_id)
 
     if not operation:
         return redirect(url_for('backoffice.operations_list'))
 
-    buffer = io.BytesIO()
-    p = canvas.Canvas(buffer, pagesize=letter)
-    width, height = letter
-
-    p.setFont("Helvetica-Bold", 20)
-    p.drawString(50, height - 50, "Carbon Snapshot Console")
-
-    p.setFont("Helvetica", 14)
-    p.drawString(50, height - 80, "Comprobante de Operacion")
-
-    p.setFont("Helvetica", 12)
-    p.drawString(50, height - 110, f"Fecha: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-
-    y_position = height - 150
-    p.setFont("Helvetica-Bold", 12)
-    p.drawString(50, y_position, "Detalles de la Operacion:")
-
-    y_position -= 30
-    p.setFont("Helvetica", 11)
-
-    details = [
-        f"ID de Operacion: {operation.operation_id}",
-        f"Tipo: {operation.type}",
-        f"Cantidad: {operation.amount}",
-        f"Puntuacion de Carbono: {operation.carbon_score}",
-        f"Email del Usuario: {operation.user_email or 'N/A'}",
-        f"Fecha de Creacion: {operation.created_at.strftime('%Y-%m-%d %H:%M:%S')}"
-    ]
-
-    for detail in details:
-        p.drawString(50, y_position, detail)
-        y_position -= 20
-
-    p.setFont("Helvetica", 10)
-    p.drawString(50, 50, "Este documento fue generado automaticamente por Carbon Snapshot Console")
-
-    p.showPage()
-    p.save()
-    buffer.seek(0)
+    buffer = render_operation_receipt(operation, labels=BACKOFFICE_LABELS)
 
     return send_file(
         buffer,
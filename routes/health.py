@@ -0,0 +1,16 @@
+from flask import Blueprint, current_app, jsonify
+
+health = Blueprint('health', __name__)
+
+@health.route('/healthz', methods=['GET'])
+def healthz():
+    """Liveness: the worker is up and serving requests (no dependency checks)"""
+    return jsonify({'status': 'ok'}), 200
+
+@health.route('/readyz', methods=['GET'])
+def readyz():
+    """Readiness: cached database/Redis/broker checks with per-dependency latency"""
+    payload, status = current_app.extensions['health'].readiness()
+    response = jsonify(payload)
+    response.headers['Cache-Control'] = 'no-store'
+    return response, status
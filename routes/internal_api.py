@@ -1,9 +1,19 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, Response, current_app, request, jsonify, send_file, stream_with_context, url_for
 from flask_jwt_extended import jwt_required, get_jwt_identity, get_jwt
 from app import db
 from models import Operation, User
 from services.carbon_calculator import CarbonCalculatorService
+from services.metrics import metrics
+from services.db_routing import read_only, replica_reads
+from services.operation_cache import operation_cache
+from services.idempotency import idempotent, remember_response
+from services.json_provider import serialize_rows
+from services.http_cache import not_modified_response, operations_etag, tag_response
+from services.response_cache import bump_operations_generation, cached_body, operations_generation
+from services.live_feed import publish_operations
+from services.profiler import RESULT_FILES
 import logging
+import os
 
 internal_api = Blueprint('internal_api', __name__)
 carbon_calculator = CarbonCalculatorService()
@@ -11,6 +21,7 @@ logger = logging.getLogger(__name__)
 
 @internal_api.route('/operations/', methods=['POST'])
 @jwt_required()
+@idempotent
 def create_operation():
     """Create a new operation (internal API)"""
     try:
@@ -34,23 +45,43 @@ def create_operation():
             logger.warning(f"Invalid amount provided: {data['amount']}")
             return jsonify({'error': 'Amount must be greater than 0'}), 400
 
+        if not Operation.amount.type.fits(data['amount']):
+            logger.warning(f"Amount out of range: {data['amount']}")
+            return jsonify({'error': 'Amount is out of range'}), 400
+
+        if not Operation.amount.type.has_scale(data['amount']):
+            logger.warning(f"Amount with too many decimals: {data['amount']}")
+            return jsonify({'error': f"Amount must have at most {Operation.amount.type.scale} decimals"}), 400
+
         # Calculate carbon score
         carbon_score = carbon_calculator.calculate_carbon_score(
             data['type'],
             data['amount']
         )
         logger.debug(f"Calculated carbon score: {carbon_score} for type: {data['type']}, amount: {data['amount']}")
+        if not Operation.carbon_score.type.fits(carbon_score):
+            logger.warning(f"Carbon score out of range: {carbon_score}")
+            return jsonify({'error': 'Carbon score is out of range'}), 400
+        # Lo que se guarda (score redondeado a la escala de la columna): el body de esta respuesta
+        # y el que guarda remember_response para los reintentos tienen que coincidir
+        carbon_score = Operation.carbon_score.type.round_trip(carbon_score)
 
         # Create operation
         operation = Operation(
             type=data['type'],
-            amount=data['amount'],
+            amount=Operation.amount.type.round_trip(data['amount']),
             carbon_score=carbon_score,
             user_email=data.get('user_email')
         )
 
         db.session.add(operation)
+        db.session.flush()
+        # Misma transaccion que la operacion: un reintento con la misma clave no la duplica
+        remember_response(operation.to_dict(), 201)
         db.session.commit()
+        bump_operations_generation()
+        operation_cache.put(operation)
+        publish_operations([operation.to_dict()])
         logger.info(f"Internal operation created successfully with ID: {operation.operation_id}")
 
         return jsonify(operation.to_dict()), 201
@@ -62,6 +93,7 @@ def create_operation():
 
 @internal_api.route('/operations/', methods=['GET'])
 @jwt_required()
+@read_only
 def get_operations():
     """Get all operations (internal API)"""
     try:
@@ -71,18 +103,187 @@ def get_operations():
             logger.warning("Non-internal user attempted to access internal operations endpoint")
             return jsonify({'error': 'Access denied. Internal access required.'}), 403
 
+        # Sin cambios desde el ultimo poll: 304 sin ejecutar el listado
+        generation = operations_generation()
+        etag = operations_etag(generation)
+        not_modified = not_modified_response(etag)
+        if not_modified is not None:
+            return not_modified
+
         user_email = get_jwt_identity()
         logger.info(f"Retrieving all operations for internal user: {user_email}")
 
-        operations = Operation.query.order_by(Operation.created_at.desc()).all()
-        logger.debug(f"Retrieved {len(operations)} operations")
+        def render():
+            # Tuplas de columnas: sin hidratar objetos ORM ni pasar por to_dict()
+            rows = db.session.execute(Operation.serialized_select().order_by(Operation.created_at.desc())).all()
+            logger.debug(f"Retrieved {len(rows)} operations")
+            return jsonify(serialize_rows(Operation.SERIALIZED_COLUMNS, rows)).get_data()
 
-        return jsonify([op.to_dict() for op in operations]), 200
+        # Entre escrituras el body sale del cache en memoria (clave: params + generacion)
+        body = cached_body(generation, render)
+        return tag_response(current_app.response_class(body, mimetype='application/json'), etag), 200
 
     except Exception as e:
         logger.error(f"Error retrieving operations: {str(e)}")
         return jsonify({'error': str(e)}), 500
 
+@internal_api.route('/operations/changes', methods=['GET'])
+@jwt_required()
+@read_only
+def get_operation_changes():
+    """
+    Operations created after the `since` resume token, in bounded pages (internal API).
+    Keep calling with the returned `next` token; has_more=false means caught up.
+    """
+    from services.change_feed import fetch_changes
+
+    claims = get_jwt()
+    if not claims.get('is_internal', False):
+        logger.warning("Non-internal user attempted to access operations change feed")
+        return jsonify({'error': 'Access denied. Internal access required.'}), 403
+
+    try:
+        limit = int(request.args.get('limit', current_app.config['CHANGES_PAGE_SIZE']))
+    except ValueError:
+        return jsonify({'error': 'limit must be an integer'}), 400
+    if not 1 <= limit <= current_app.config['CHANGES_MAX_PAGE_SIZE']:
+        return jsonify({'error': f"limit must be between 1 and {current_app.config['CHANGES_MAX_PAGE_SIZE']}"}), 400
+
+    try:
+        page = fetch_changes(request.args.get('since'), limit)
+    except ValueError:
+        return jsonify({'error': 'Invalid since token'}), 400
+
+    metrics.increment('change_feed.rows', len(page['changes']))
+    return jsonify(page), 200
+
+@internal_api.route('/operations/export', methods=['GET'])
+@jwt_required()
+def export_operations():
+    """
+    Stream every operation as NDJSON (internal API).
+    Archived months (see `flask operations archive`) come first, then live rows,
+    both ordered by created_at. Use include_archived=false to skip the archive.
+    """
+    from services.partitioning import EXPORT_COLUMNS, iter_archived_operations
+
+    claims = get_jwt()
+    if not claims.get('is_internal', False):
+        logger.warning("Non-internal user attempted to access operations export endpoint")
+        return jsonify({'error': 'Access denied. Internal access required.'}), 403
+
+    include_archived = request.args.get('include_archived', 'true').lower() == 'true'
+    archive_dir = current_app.config['ARCHIVE_DIR']
+    logger.info(f"Exporting operations for internal user: {get_jwt_identity()} (include_archived={include_archived})")
+
+    def generate():
+        dumps = current_app.json.dumps
+        if include_archived:
+            for row in iter_archived_operations(archive_dir):
+                yield dumps(row) + '\n'
+
+        stmt = Operation.serialized_select().order_by(Operation.created_at).execution_options(yield_per=1000)
+        with replica_reads():
+            for batch in db.session.execute(stmt).partitions():
+                for data in serialize_rows(EXPORT_COLUMNS, batch):
+                    yield dumps(data) + '\n'
+
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+@internal_api.route('/metrics/', methods=['GET'])
+@jwt_required()
+def get_metrics():
+    """Process-local metrics snapshot (internal API)"""
+    claims = get_jwt()
+    if not claims.get('is_internal', False):
+        logger.warning("Non-internal user attempted to access metrics endpoint")
+        return jsonify({'error': 'Access denied. Internal access required.'}), 403
+
+    snapshot = metrics.snapshot()
+    snapshot['operation_cache'] = operation_cache.stats()
+    return jsonify(snapshot), 200
+
+def _profile_requests():
+    """ProfileRequests of this app, or a 404/403 response if profiling is off or the caller isn't internal"""
+    requests = current_app.extensions.get('profiler')
+    if requests is None:
+        return None, (jsonify({'error': 'Not found'}), 404)
+
+    claims = get_jwt()
+    if not claims.get('is_internal', False):
+        logger.warning("Non-internal user attempted to access profiler endpoint")
+        return None, (jsonify({'error': 'Access denied. Internal access required.'}), 403)
+    requests.ensure_started()
+    return requests, None
+
+@internal_api.route('/debug/profile', methods=['GET'])
+@jwt_required()
+def list_profiled_workers():
+    """Workers on this host that can be profiled (internal API)"""
+    requests, error = _profile_requests()
+    if error is not None:
+        return error
+    return jsonify({'pid': os.getpid(), 'workers': requests.workers()}), 200
+
+@internal_api.route('/debug/profile', methods=['POST'])
+@jwt_required()
+def request_profile():
+    """
+    Queue a sampling run of worker `pid` (default: this one) for `seconds` (internal API).
+    The worker samples in its own watcher thread; fetch the result from the Location URL.
+    """
+    requests, error = _profile_requests()
+    if error is not None:
+        return error
+
+    try:
+        pid = int(request.args.get('pid', os.getpid()))
+        seconds = float(request.args.get('seconds', 10))
+    except ValueError:
+        return jsonify({'error': 'pid must be an integer and seconds a number'}), 400
+    if not 0 < seconds <= current_app.config['PROFILER_MAX_SECONDS']:
+        return jsonify({'error': f"seconds must be between 0 and {current_app.config['PROFILER_MAX_SECONDS']}"}), 400
+    if pid not in {worker['pid'] for worker in requests.workers()}:
+        return jsonify({'error': f"No live worker with pid {pid}"}), 404
+
+    profile_id = requests.submit(pid, seconds)
+    if profile_id is None:
+        return jsonify({'error': f"A profile is already pending for worker {pid}"}), 409
+
+    logger.info(f"Profile {profile_id} of worker {pid} for {seconds}s requested by {get_jwt_identity()}")
+    result_url = url_for('internal_api.get_profile', profile_id=profile_id)
+    body = {'profile_id': profile_id, 'pid': pid, 'seconds': seconds, 'result': result_url}
+    return jsonify(body), 202, {'Location': result_url}
+
+@internal_api.route('/debug/profile/<profile_id>', methods=['GET'])
+@jwt_required()
+def get_profile(profile_id):
+    """
+    Result of a queued sampling run (internal API): 202 while it runs.
+    format=collapsed (default, flamegraph.pl/speedscope) or format=speedscope.
+    """
+    requests, error = _profile_requests()
+    if error is not None:
+        return error
+
+    output = request.args.get('format', 'collapsed')
+    if output not in ('collapsed', 'speedscope'):
+        return jsonify({'error': 'format must be collapsed or speedscope'}), 400
+
+    state, detail = requests.result(profile_id, output)
+    if state == 'unknown':
+        return jsonify({'error': 'Profile not found'}), 404
+    if state == 'pending':
+        return jsonify({'profile_id': profile_id, 'status': 'pending'}), 202
+    if state == 'failed':
+        return jsonify({'error': detail}), 409
+
+    mimetype = 'application/json' if output == 'speedscope' else 'text/plain'
+    response = send_file(detail, mimetype=mimetype, as_attachment=True,
+                         download_name=f"worker-{profile_id}.{RESULT_FILES[output]}")
+    response.headers['Cache-Control'] = 'no-store'
+    return response
+
 @internal_api.route('/auth/login/', methods=['POST'])
 def internal_login():
     """Login for internal users"""
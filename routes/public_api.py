@@ -5,16 +5,26 @@ Diferencias con API interna:
 - user_email es obligatorio en operaciones
 - Se envia email de confirmacion automaticamente via Celery
 - Solo permite crear operaciones, no listarlas
+- Modo de ingesta asincrono opcional: 202 + cola (services/ingestion.py)
+- Rate limiting por cliente y tope de concurrencia (services/rate_limit.py)
 """
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, url_for
 from flask_jwt_extended import jwt_required, get_jwt_identity, create_access_token, get_jwt
 from app import db
 from models import Operation, User
 from services.carbon_calculator import CarbonCalculatorService
 from services.email_service import EmailService
+from services.operation_cache import operation_cache
+from services.idempotency import idempotent, remember_response
+from services.ingestion import enqueue_operation, operation_status, use_async_ingest
+from services.rate_limit import limit_blueprint
+from services.response_cache import bump_operations_generation
+from services.live_feed import publish_operations
 import logging
 
 public_api = Blueprint('public_api', __name__)
+# Token bucket por cliente + tope de requests concurrentes, antes de tocar la BD
+limit_blueprint(public_api, 'PUBLIC_API_MAX_CONCURRENCY')
 carbon_calculator = CarbonCalculatorService()
 email_service = EmailService()
 logger = logging.getLogger(__name__)
@@ -56,6 +66,7 @@ def public_login():
 
 @public_api.route('/operations/', methods=['POST'])
 @jwt_required()
+@idempotent
 def create_public_operation():
     """Create a new operation from public API"""
     try:
@@ -79,29 +90,59 @@ def create_public_operation():
             logger.warning(f"Invalid amount provided: {data['amount']}")
             return jsonify({'error': 'Amount must be greater than 0'}), 400
 
+        if not Operation.amount.type.fits(data['amount']):
+            logger.warning(f"Amount out of range: {data['amount']}")
+            return jsonify({'error': 'Amount is out of range'}), 400
+
+        if not Operation.amount.type.has_scale(data['amount']):
+            logger.warning(f"Amount with too many decimals: {data['amount']}")
+            return jsonify({'error': f"Amount must have at most {Operation.amount.type.scale} decimals"}), 400
+
         # user_email is required for public operations
         operation_user_email = data.get('user_email')
         if not operation_user_email:
             logger.warning("user_email is required for public operations")
             return jsonify({'error': 'user_email is required for public operations'}), 400
 
+        if use_async_ingest():
+            # 202: score, insert y email los hace `flask ingest worker` en lotes
+            record = enqueue_operation(data['type'], data['amount'], operation_user_email, user_email)
+            body = {'operation_id': record['operation_id'], 'status': 'queued'}
+            headers = {'Location': url_for('public_api.get_operation_status', operation_id=record['operation_id'])}
+            remember_response(body, 202, headers)
+            db.session.commit()
+            logger.info(f"Public operation queued with ID: {record['operation_id']}")
+            return jsonify(body), 202, headers
+
         # Calculate carbon score
         carbon_score = carbon_calculator.calculate_carbon_score(
             data['type'],
             data['amount']
         )
         logger.debug(f"Calculated carbon score: {carbon_score} for type: {data['type']}, amount: {data['amount']}")
+        if not Operation.carbon_score.type.fits(carbon_score):
+            logger.warning(f"Carbon score out of range: {carbon_score}")
+            return jsonify({'error': 'Carbon score is out of range'}), 400
+        # Lo que se guarda (score redondeado a la escala de la columna): el body de esta respuesta
+        # y el que guarda remember_response para los reintentos tienen que coincidir
+        carbon_score = Operation.carbon_score.type.round_trip(carbon_score)
 
         # Create operation
         operation = Operation(
             type=data['type'],
-            amount=data['amount'],
+            amount=Operation.amount.type.round_trip(data['amount']),
             carbon_score=carbon_score,
             user_email=operation_user_email
         )
 
         db.session.add(operation)
+        db.session.flush()
+        # Misma transaccion que la operacion: un reintento con la misma clave no la duplica
+        remember_response(operation.to_dict(), 201)
         db.session.commit()
+        bump_operations_generation()
+        operation_cache.put(operation)
+        publish_operations([operation.to_dict()])
         logger.info(f"Public operation created successfully with ID: {operation.operation_id}")
 
         # Send confirmation email
@@ -114,3 +155,12 @@ def create_public_operation():
         logger.error(f"Error creating public operation: {str(e)}")
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
+
+@public_api.route('/operations/<operation_id>/status', methods=['GET'])
+@jwt_required()
+def get_operation_status(operation_id):
+    """Status of an operation accepted with 202 (queued, completed or failed)"""
+    status = operation_status(operation_id, get_jwt_identity())
+    if status is None:
+        return jsonify({'error': 'Operation not found'}), 404
+    return jsonify(status), 200
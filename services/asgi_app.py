@@ -0,0 +1,222 @@
+"""
+Modo ASGI: endpoints I/O-bound como corutinas y el resto de la app via WSGI.
+
+Con uWSGI cada request ocupa un thread (4 procesos x 2 threads = 8 en vuelo)
+tambien mientras espera a la base o a Redis. Con `uvicorn asgi:app` cada
+worker es un event loop:
+
+- Las vistas registradas con @async_view (routes/async_api.py: creacion y
+  listado de operaciones, logins y recibo PDF) corren como corutinas dentro
+  del contexto de request de Flask: mismo JWT, mismo JSON, mismos hooks
+  after_request (compresion, ETag, query log). Su I/O va por el engine async
+  y redis.asyncio, y el trabajo de CPU al executor (services/async_io.py),
+  incluidos los hooks de respuestas de mas de COMPRESS_MIN_SIZE bytes.
+- Cualquier otra ruta, o una vista async que prefiere el camino sync
+  (raise ServeWithWSGI: Idempotency-Key, ingesta asincrona), la atiende la
+  app Flask de siempre en ASGI_WSGI_THREADS threads por worker.
+
+Una vista async puede devolver un body async generator (el feed en vivo del
+backoffice): se manda por partes y se corta cuando el cliente se desconecta.
+
+El routing es el url_map de Flask: la vista async y la sync son el mismo
+endpoint con las mismas URLs, asi que los clientes no distinguen el modo.
+Los hooks before_request no corren en las vistas async (cada una hace su
+control de acceso); con X-Profile el request va por WSGI.
+"""
+import asyncio
+import logging
+import time
+import warnings
+from typing import Awaitable, Callable, Dict
+
+from flask import request
+from werkzeug.exceptions import HTTPException
+from werkzeug.routing import RequestRedirect
+
+from services.async_io import close_async_io, init_async_io, run_in_executor
+from services.metrics import metrics
+from services.profiler import ensure_profile_watcher
+
+with warnings.catch_warnings():
+    # Deprecado a favor de a2wsgi, pero es el adaptador que trae starlette
+    warnings.simplefilter('ignore', DeprecationWarning)
+    from starlette.middleware.wsgi import WSGIMiddleware, build_environ
+
+logger = logging.getLogger(__name__)
+
+AsyncView = Callable[..., Awaitable]
+
+_views: Dict[str, AsyncView] = {}
+
+
+class ServeWithWSGI(Exception):
+    """Raised by an async view (before any I/O with side effects) to hand the request to the WSGI view"""
+
+
+def async_view(endpoint: str):
+    """Register an async implementation of the Flask view `endpoint` for the ASGI mode"""
+    def decorator(f):
+        _views[endpoint] = f
+        return f
+    return decorator
+
+
+class AsgiApp:
+    """ASGI application over a Flask app: async views on the event loop, everything else via WSGI"""
+
+    def __init__(self, app):
+        import routes.async_api  # noqa: F401  (registra las vistas async)
+
+        init_async_io(app)
+        app.extensions['asgi'] = self
+        self.app = app
+        self.views = dict(_views)
+        self.wsgi = WSGIMiddleware(app)
+        self.wsgi_threads = app.config['ASGI_WSGI_THREADS']
+        self.url_adapter = app.url_map.bind('localhost')
+        self.profiler_enabled = app.config['PROFILER_ENABLED']
+        self.offload_size = app.config['COMPRESS_MIN_SIZE']
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            return await self._lifespan(receive, send)
+        if scope['type'] != 'http':
+            raise ValueError(f"Unsupported ASGI scope type: {scope['type']}")
+
+        endpoint, view = self._match(scope)
+        if view is None:
+            return await self.wsgi(scope, receive, send)
+
+        body = await _read_body(receive)
+        start = time.perf_counter()
+        try:
+            response = await self._dispatch(view, scope, body)
+        except ServeWithWSGI:
+            metrics.increment('asgi.wsgi_fallbacks')
+            return await self.wsgi(scope, _replay(body), send)
+        metrics.observe(f'asgi.{endpoint}', time.perf_counter() - start)
+        await _send_response(response, send, receive, head=scope['method'] == 'HEAD')
+
+    def _match(self, scope):
+        if self.profiler_enabled and _header(scope, b'x-profile') == b'1':
+            return None, None
+        try:
+            endpoint, _ = self.url_adapter.match(scope['path'], scope['method'])
+        except (HTTPException, RequestRedirect):
+            # 404, 405 y redirects de barra final: que los responda Flask
+            return None, None
+        return endpoint, self.views.get(endpoint)
+
+    async def _dispatch(self, view: AsyncView, scope, body: bytes):
+        """Run `view` in a Flask request context; same error handling and after_request hooks as WSGI"""
+        app = self.app
+        environ = build_environ(scope, body)
+        environ['CONTENT_LENGTH'] = str(len(body))  # el body ya esta completo (tambien si vino chunked)
+        with app.request_context(environ):
+            try:
+                try:
+                    rv = await view(**request.view_args)
+                except ServeWithWSGI:
+                    raise
+                except Exception as e:
+                    rv = app.handle_user_exception(e)
+                response = app.make_response(rv)
+                if (response.content_length or 0) >= self.offload_size:
+                    # after_request comprime (CPU): un listado grande bloquearia el event loop
+                    return await run_in_executor(app.finalize_request, response)
+                return app.finalize_request(response)
+            except ServeWithWSGI:
+                raise
+            except Exception as e:
+                return app.handle_exception(e)
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                import anyio.to_thread
+                # Threads del camino WSGI (por event loop, es decir por worker)
+                anyio.to_thread.current_default_thread_limiter().total_tokens = self.wsgi_threads
+                ensure_profile_watcher(self.app)
+                logger.info(f"ASGI worker ready ({len(self.views)} async views, {self.wsgi_threads} WSGI threads)")
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                await close_async_io(self.app)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+
+def _header(scope, name: bytes):
+    for key, value in scope['headers']:
+        if key == name:
+            return value
+    return None
+
+
+async def _read_body(receive) -> bytes:
+    chunks = []
+    while True:
+        message = await receive()
+        if message['type'] != 'http.request':
+            break
+        chunks.append(message.get('body', b''))
+        if not message.get('more_body'):
+            break
+    return b''.join(chunks)
+
+
+def _replay(body: bytes):
+    """receive() that hands an already read body to the WSGI adapter"""
+    messages = [{'type': 'http.request', 'body': body, 'more_body': False}]
+
+    async def receive():
+        return messages.pop() if messages else {'type': 'http.disconnect'}
+    return receive
+
+
+async def _send_response(response, send, receive, head: bool = False):
+    try:
+        streamed = hasattr(response.response, '__aiter__')
+        body = b'' if head or streamed else b''.join(response.iter_encoded())
+        headers = [(key.lower().encode('latin-1'), value.encode('latin-1'))
+                   for key, value in response.headers.to_wsgi_list()]
+        await send({'type': 'http.response.start', 'status': response.status_code, 'headers': headers})
+        if streamed and not head:
+            await _send_stream(response.response, send, receive)
+        else:
+            await send({'type': 'http.response.body', 'body': body})
+    finally:
+        if hasattr(response.response, 'aclose'):
+            await response.response.aclose()
+        response.close()
+
+
+async def _send_stream(chunks, send, receive):
+    """Send an async generator body chunk by chunk until it ends or the client disconnects"""
+    async def watch():
+        while (await receive())['type'] != 'http.disconnect':
+            pass
+
+    watcher = asyncio.ensure_future(watch())
+    try:
+        while True:
+            chunk = asyncio.ensure_future(chunks.__anext__())
+            await asyncio.wait({chunk, watcher}, return_when=asyncio.FIRST_COMPLETED)
+            if not chunk.done():
+                # Cliente desconectado: el generador se cancela donde espera (y se desuscribe)
+                chunk.cancel()
+                await asyncio.wait({chunk})
+                return
+            try:
+                data = chunk.result()
+            except StopAsyncIteration:
+                break
+            await send({'type': 'http.response.body', 'body': data.encode(), 'more_body': True})
+        await send({'type': 'http.response.body', 'body': b''})
+    finally:
+        watcher.cancel()
+
+
+def create_asgi_app(app) -> AsgiApp:
+    """ASGI entry point for `app` (see asgi.py)"""
+    return AsgiApp(app)
@@ -0,0 +1,115 @@
+"""
+I/O asincrono para las vistas nativas del modo ASGI (asgi.py).
+
+- Engine async de SQLAlchemy sobre la misma base que la app: DATABASE_URL
+  con el driver async equivalente (aiosqlite para SQLite, asyncpg para
+  Postgres) o ASYNC_DATABASE_URL. Tiene su propio pool (ASYNC_DB_POOL_SIZE):
+  en el event loop una conexion se ocupa por query en vuelo, no por thread.
+- Executor para el trabajo de CPU (hash de passwords, render de PDFs,
+  serializacion de listados): ASGI_CPU_WORKERS threads, asi el event loop
+  sigue aceptando requests mientras tanto. La funcion corre con el contexto
+  del caller (contexto de app/request de Flask).
+
+Los clientes Redis async estan en services/redis_client.py. El engine se crea
+en el primer uso, dentro del event loop del worker, y todo se cierra en el
+shutdown del servidor (close_async_io).
+"""
+import asyncio
+import contextvars
+import functools
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable
+
+from flask import current_app
+from sqlalchemy.engine import make_url
+
+from services.redis_client import close_async_redis_clients
+
+logger = logging.getLogger(__name__)
+
+ASYNC_DRIVERS = {'sqlite': 'sqlite+aiosqlite', 'postgresql': 'postgresql+asyncpg'}
+
+
+class _AsyncState:
+    def __init__(self, url, options, cpu_workers):
+        self.url = url
+        self.options = options
+        self.cpu_workers = cpu_workers
+        self.engine = None
+        self.sessionmaker = None
+        self.executor = None
+
+
+def async_database_url(url) -> str:
+    """Same database as `url` (str or URL) through its async driver"""
+    url = make_url(url)
+    driver = ASYNC_DRIVERS.get(url.get_backend_name())
+    if driver is None:
+        raise ValueError(f"No async driver for {url.get_backend_name()} databases; set ASYNC_DATABASE_URL")
+    return url.set(drivername=driver).render_as_string(hide_password=False)
+
+
+def init_async_io(app):
+    """Resolve the async database URL and executor size of `app` (nothing is opened yet)"""
+    from app import db
+    from services.db_engine import build_async_engine_options
+
+    if not app.config['ASYNC_DATABASE_URL']:
+        # La URL del engine de Flask-SQLAlchemy: rutas de SQLite ya resueltas contra instance/
+        with app.app_context():
+            app.config['ASYNC_DATABASE_URL'] = async_database_url(db.engine.url)
+    app.extensions['async_io'] = _AsyncState(
+        app.config['ASYNC_DATABASE_URL'],
+        build_async_engine_options(app.config),
+        app.config['ASGI_CPU_WORKERS'],
+    )
+
+
+def _state(app=None) -> _AsyncState:
+    return (app or current_app).extensions['async_io']
+
+
+def async_engine(app=None):
+    """The async engine of `app`, created on first use (inside the worker's event loop)"""
+    state = _state(app)
+    if state.engine is None:
+        from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+        from services.db_engine import init_engine_instrumentation
+        from services.query_log import attach_query_log
+
+        app = app or current_app._get_current_object()
+        engine = create_async_engine(state.url, **state.options)
+        init_engine_instrumentation(app, engine.sync_engine, prefix='db.async_pool')
+        attach_query_log(app, engine.sync_engine)
+        state.sessionmaker = async_sessionmaker(engine, expire_on_commit=False)
+        state.engine = engine
+        logger.info(f"Async engine created ({engine.url.drivername})")
+    return state.engine
+
+
+def async_session():
+    """New AsyncSession (`async with async_session() as session:`); objects stay loaded after commit"""
+    async_engine()
+    return _state().sessionmaker()
+
+
+async def run_in_executor(fn: Callable[..., Any], *args) -> Any:
+    """Run CPU-bound fn(*args) on the CPU executor without blocking the event loop"""
+    state = _state()
+    if state.executor is None:
+        state.executor = ThreadPoolExecutor(max_workers=state.cpu_workers, thread_name_prefix='asgi-cpu')
+    context = contextvars.copy_context()
+    return await asyncio.get_running_loop().run_in_executor(state.executor, functools.partial(context.run, fn, *args))
+
+
+async def close_async_io(app):
+    """Dispose the async engine, Redis clients and executor (ASGI lifespan shutdown)"""
+    state = _state(app)
+    if state.engine is not None:
+        await state.engine.dispose()
+        state.engine = state.sessionmaker = None
+    await close_async_redis_clients()
+    if state.executor is not None:
+        state.executor.shutdown(wait=False)
+        state.executor = None
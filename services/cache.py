@@ -0,0 +1,129 @@
+"""
+Primitivas de cache compartidas por los servicios.
+
+- LRUCache: cache acotado en proceso con expiracion opcional por entrada
+- SingleFlight: coalesce llamadas concurrentes con la misma clave para que
+  solo una ejecute el trabajo costoso (query a BD, render) y el resto espere
+- AsyncSingleFlight: lo mismo para corutinas de un event loop (modo ASGI)
+"""
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+
+_MISSING = object()
+
+
+class LRUCache:
+    """Bounded, thread-safe LRU cache. Entries may carry an absolute expiry (time.time())."""
+
+    def __init__(self, maxsize: int = 1024):
+        self.maxsize = maxsize
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is _MISSING:
+                return default
+            value, expires_at = entry
+            if expires_at is not None and expires_at <= time.time():
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: Hashable, value: Any, expires_at: Optional[float] = None):
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._data.pop(key, _MISSING)
+            return default if entry is _MISSING else entry[0]
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+class _Call:
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Deduplicate concurrent calls for the same key within the process"""
+
+    def __init__(self):
+        self._calls: Dict[Hashable, _Call] = {}
+        self._lock = threading.Lock()
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        """
+        Run fn() once per key at a time. Callers arriving while a call is in
+        flight wait for it and receive the same result (or exception).
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+
+        if not leader:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+            return call.result
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.event.set()
+
+
+class AsyncSingleFlight:
+    """SingleFlight for coroutines running on one event loop"""
+
+    def __init__(self):
+        self._calls: Dict[Hashable, asyncio.Future] = {}
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """Await fn() once per key at a time; concurrent callers share its result (or exception)"""
+        call = self._calls.get(key)
+        if call is not None:
+            # shield: si este caller se cancela, la carga del lider sigue para los demas
+            return await asyncio.shield(call)
+
+        call = self._calls[key] = asyncio.get_running_loop().create_future()
+        try:
+            result = await fn()
+            call.set_result(result)
+            return result
+        except Exception as e:
+            call.set_exception(e)
+            call.exception()  # sin seguidores no hay que loguear "exception was never retrieved"
+            raise
+        except BaseException:
+            call.cancel()
+            raise
+        finally:
+            self._calls.pop(key, None)
@@ -0,0 +1,96 @@
+"""
+App de Celery unica, configurada desde create_app.
+
+Antes habia dos (una con broker hardcodeado en email_service y otra en
+celery_worker que envolvia la tarea de la primera). Ahora:
+
+- Una cola por familia de tareas (QUEUES, tareas `<cola>.*`): por ahora solo
+  `email`. Una familia nueva con tareas pesadas se agrega a QUEUES para no
+  demorar los emails; cada worker elige sus colas con `-Q`.
+- Tareas fire-and-forget: task_ignore_result, sin escrituras al result backend
+  por tarea (CELERY_RESULT_BACKEND vacio = sin backend).
+- acks_late + reject_on_worker_lost: una tarea se confirma al terminar, asi un
+  worker caido no pierde emails.
+- Prefetch (CELERY_PREFETCH_MULTIPLIER): las tareas de email son cortas y de
+  I/O; con prefetch alto el worker no espera al broker entre tareas.
+- Timing por tarea via signals: timers `celery.task.<nombre>` en el registro
+  de metricas y un resumen de throughput en el log cada CELERY_STATS_INTERVAL s.
+"""
+import logging
+import threading
+import time
+
+from celery import Celery, signals
+from kombu import Queue
+
+from services.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+QUEUES = ('email',)
+
+celery = Celery('carbon_console')
+
+_task_started = {}
+_stats = {'since': time.monotonic(), 'tasks': 0, 'lock': threading.Lock()}
+
+
+def init_celery(app):
+    """Configure the shared Celery app from the Flask config"""
+    celery.conf.update(
+        broker_url=app.config['CELERY_BROKER_URL'],
+        result_backend=app.config['CELERY_RESULT_BACKEND'] or None,
+        task_ignore_result=True,
+        task_acks_late=True,
+        task_reject_on_worker_lost=True,
+        worker_prefetch_multiplier=app.config['CELERY_PREFETCH_MULTIPLIER'],
+        task_queues=[Queue(name) for name in QUEUES],
+        task_default_queue='email',
+        task_routes={f'{name}.*': {'queue': name} for name in QUEUES},
+        task_serializer='json',
+        accept_content=['json'],
+        result_serializer='json',
+        timezone='UTC',
+        enable_utc=True,
+        broker_connection_retry_on_startup=True,
+        task_always_eager=app.config['CELERY_TASK_ALWAYS_EAGER'],
+    )
+
+    class ContextTask(celery.Task):
+        """Run tasks inside the Flask app context"""
+        def __call__(self, *args, **kwargs):
+            with app.app_context():
+                return self.run(*args, **kwargs)
+
+    celery.Task = ContextTask
+    app.extensions['celery'] = celery
+    _stats['interval'] = app.config['CELERY_STATS_INTERVAL']
+    return celery
+
+
+@signals.task_prerun.connect
+def _task_prerun(task_id=None, **kwargs):
+    _task_started[task_id] = time.perf_counter()
+
+
+@signals.task_postrun.connect
+def _task_postrun(task_id=None, task=None, state=None, **kwargs):
+    started = _task_started.pop(task_id, None)
+    if started is None:
+        return
+    metrics.observe(f'celery.task.{task.name}', time.perf_counter() - started)
+    metrics.increment(f'celery.task.{task.name}.{(state or "unknown").lower()}')
+
+    interval = _stats.get('interval', 0)
+    if not interval:
+        return
+    with _stats['lock']:
+        _stats['tasks'] += 1
+        elapsed = time.monotonic() - _stats['since']
+        if elapsed < interval:
+            return
+        tasks, _stats['tasks'], _stats['since'] = _stats['tasks'], 0, time.monotonic()
+    timers = metrics.snapshot()['timers']
+    summary = ', '.join(f"{name[len('celery.task.'):]} p50={t['p50_ms']}ms p95={t['p95_ms']}ms"
+                        for name, t in timers.items() if name.startswith('celery.task.'))
+    logger.info(f"Celery throughput: {tasks} tasks in {elapsed:.0f}s ({tasks / elapsed:.1f}/s); {summary}")
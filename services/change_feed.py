@@ -0,0 +1,66 @@
+"""
+Feed incremental de operaciones nuevas para sincronizar sistemas externos.
+
+GET /api/operations/changes?since=<token> devuelve hasta `limit` operaciones
+posteriores al token, en orden, y el token para la proxima llamada. Cada
+pagina es un range scan sobre el indice ix_operations_changes (txid, seq): el
+costo depende de las filas nuevas, no del tamano de la tabla.
+
+Por que (txid, seq) y no solo seq: en Postgres seq se asigna al insertar y
+las transacciones confirman en cualquier orden, asi que una fila con seq menor
+puede hacerse visible despues de que el consumidor avanzo. Solo se devuelven
+filas de transacciones anteriores al xmin del snapshot (todas terminadas):
+cualquier fila que se confirme despues tiene un txid mayor y queda delante
+del token. En SQLite las escrituras son serializadas; txid es 0 y el orden es
+el de seq.
+
+Los tokens son opacos para el consumidor ("<txid>.<seq>").
+"""
+from typing import Optional, Tuple
+
+from sqlalchemy import text, tuple_
+
+from app import db
+from models import Operation
+from services.json_provider import serialize_rows
+
+START = (0, 0)  # seq empieza en 1
+
+# Transacciones con id menor ya terminaron (Postgres 13+)
+_PG_HORIZON = text("pg_snapshot_xmin(pg_current_snapshot())::text::bigint")
+
+
+def encode_token(txid: int, seq: int) -> str:
+    return f"{txid}.{seq}"
+
+
+def decode_token(token: Optional[str]) -> Tuple[int, int]:
+    """Parse a resume token; empty means from the beginning. Raises ValueError if malformed"""
+    if not token:
+        return START
+    txid, seq = token.split('.')
+    return int(txid), int(seq)
+
+
+def fetch_changes(since: Optional[str], limit: int) -> dict:
+    """Next page of operations after `since`: {'changes', 'next', 'has_more'}"""
+    position = decode_token(since)
+    stmt = (
+        db.select(Operation.txid, Operation.seq, *[getattr(Operation, name) for name in Operation.SERIALIZED_COLUMNS])
+        .where(tuple_(Operation.txid, Operation.seq) > tuple_(*position))
+        .order_by(Operation.txid, Operation.seq)
+        .limit(limit + 1)
+    )
+    if db.engine.dialect.name == 'postgresql':
+        stmt = stmt.where(Operation.txid < _PG_HORIZON)
+
+    rows = db.session.execute(stmt).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    if rows:
+        position = (rows[-1].txid, rows[-1].seq)
+    return {
+        'changes': serialize_rows(Operation.SERIALIZED_COLUMNS, [row[2:] for row in rows]),
+        'next': encode_token(*position),
+        'has_more': has_more,
+    }
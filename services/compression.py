@@ -0,0 +1,115 @@
+"""
+Compresion negociada de respuestas JSON y HTML.
+
+Hook after_request: si la respuesta supera COMPRESS_MIN_SIZE bytes y el
+cliente la acepta (Accept-Encoding), se comprime con el primer algoritmo de
+COMPRESS_ALGORITHMS que este disponible y tenga mayor q. zstd y brotli son
+opcionales (paquetes `zstandard` y `Brotli`); gzip esta siempre.
+
+El nivel depende del tamano: payloads chicos con nivel alto (comprimir es
+barato), listados grandes con nivel bajo para no gastar CPU del worker.
+
+Un ETag fuerte se marca con el encoding (`"<tag>-gzip"`): cada representacion
+tiene su propio validador. services/http_cache.py acepta ambos en If-None-Match.
+"""
+import gzip
+import logging
+
+from flask import current_app, request
+
+from services.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - dependencia opcional
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - dependencia opcional
+    zstandard = None
+
+COMPRESSIBLE_MIMETYPES = {'application/json', 'text/html'}
+
+# (hasta bytes, nivel): el primer umbral que cubre el tamano del payload
+LEVELS = {
+    'zstd': [(64 * 1024, 9), (1024 * 1024, 3), (None, 1)],
+    'br': [(64 * 1024, 6), (1024 * 1024, 4), (None, 1)],
+    'gzip': [(64 * 1024, 6), (1024 * 1024, 4), (None, 1)],
+}
+
+
+def _compress_zstd(data: bytes, level: int) -> bytes:
+    return zstandard.ZstdCompressor(level=level).compress(data)
+
+
+def _compress_br(data: bytes, level: int) -> bytes:
+    return brotli.compress(data, quality=level)
+
+
+def _compress_gzip(data: bytes, level: int) -> bytes:
+    return gzip.compress(data, compresslevel=level, mtime=0)
+
+
+COMPRESSORS = {'gzip': _compress_gzip}
+if brotli is not None:
+    COMPRESSORS['br'] = _compress_br
+if zstandard is not None:
+    COMPRESSORS['zstd'] = _compress_zstd
+
+
+def compression_level(encoding: str, size: int) -> int:
+    for limit, level in LEVELS[encoding]:
+        if limit is None or size <= limit:
+            return level
+
+
+def negotiate_encoding(accept_encodings, algorithms) -> str:
+    """Best available encoding accepted by the client (highest q, then server order), or None"""
+    candidates = []
+    for position, encoding in enumerate(algorithms):
+        if encoding not in COMPRESSORS:
+            continue
+        quality = accept_encodings[encoding]
+        if quality > 0:
+            candidates.append((-quality, position, encoding))
+    return min(candidates)[2] if candidates else None
+
+
+def _compress_response(response):
+    config = current_app.extensions['compression']
+    if (response.status_code != 200 or response.direct_passthrough or response.is_streamed
+            or response.mimetype not in COMPRESSIBLE_MIMETYPES or 'Content-Encoding' in response.headers):
+        return response
+
+    response.vary.add('Accept-Encoding')
+    size = response.content_length or 0
+    if size < config['min_size']:
+        return response
+    encoding = negotiate_encoding(request.accept_encodings, config['algorithms'])
+    if encoding is None:
+        return response
+
+    data = response.get_data()
+    with metrics.timer(f'compression.{encoding}'):
+        compressed = COMPRESSORS[encoding](data, compression_level(encoding, len(data)))
+    response.set_data(compressed)
+    response.headers['Content-Encoding'] = encoding
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(f"{etag}-{encoding}")
+    metrics.increment('compression.bytes_in', len(data))
+    metrics.increment('compression.bytes_out', len(compressed))
+    return response
+
+
+def init_compression(app):
+    algorithms = [a.strip() for a in app.config['COMPRESS_ALGORITHMS'].split(',') if a.strip()]
+    unavailable = [a for a in algorithms if a not in COMPRESSORS]
+    if unavailable:
+        logger.info(f"Compression algorithms not installed, skipping: {', '.join(unavailable)}")
+    app.extensions['compression'] = {'min_size': app.config['COMPRESS_MIN_SIZE'], 'algorithms': algorithms}
+    if app.config['COMPRESS_ENABLED']:
+        app.after_request(_compress_response)
@@ -0,0 +1,225 @@
+"""
+Generador de operaciones sinteticas para pruebas de rendimiento.
+
+A diferencia de seed_data.py (usuarios de prueba + 5 operaciones), genera
+millones de filas con distribuciones parecidas a produccion:
+
+- type: mezcla ponderada (electricity domina, 'other' cae en el factor default)
+- amount: log-normal por tipo; carbon_score con los mismos factores que
+  CarbonCalculatorService._calculate_local, sin llamar al servicio por fila
+- user_email: pocos clientes concentran la mayoria de las operaciones
+  (distribucion tipo Zipf); ~10% sin email (operaciones internas)
+- created_at: crecimiento lineal hacia el final del rango y curva horaria
+  con pico en horario laboral
+
+La salida es deterministica para el mismo seed y rango de fechas. Las filas se
+insertan en chunks: COPY en Postgres, executemany sobre la conexion DBAPI en
+SQLite y executemany de SQLAlchemy para cualquier otro motor.
+"""
+import io
+import queue
+import random
+import threading
+import time
+from datetime import datetime, timedelta
+from itertools import accumulate
+from operator import itemgetter
+from typing import Iterator, List, Tuple
+
+from app import db
+from models import Operation
+from services.carbon_calculator import CarbonCalculatorService
+from services.response_cache import bump_operations_generation
+
+COLUMNS = ('operation_id', 'type', 'amount', 'carbon_score', 'user_email', 'created_at')
+AMOUNT_TYPE = Operation.__table__.c.amount.type
+SCORE_TYPE = Operation.__table__.c.carbon_score.type
+
+# (tipo, peso, mu, sigma) de la log-normal de amount
+TYPE_PROFILES = [
+    ('electricity', 45, 4.5, 0.9),
+    ('transportation', 30, 3.5, 1.1),
+    ('heating', 15, 4.0, 0.8),
+    ('manufacturing', 8, 5.0, 1.2),
+    ('other', 2, 3.0, 1.0),
+]
+HOUR_WEIGHTS = [1, 1, 1, 1, 1, 2, 4, 7, 10, 12, 12, 11, 10, 11, 12, 12, 11, 9, 7, 5, 4, 3, 2, 1]
+INTERNAL_SHARE = 0.10
+SQLITE_BULK_CACHE_KIB = 256 * 1024
+# Variante RFC 4122: los dos bits altos del nibble 17 son '10'
+VARIANT_NIBBLES = {digit: '89ab'[int(digit, 16) & 3] for digit in '0123456789abcdef'}
+
+
+class OperationGenerator:
+    """Deterministic stream of synthetic operation rows
+
+    created_at sale como texto 'YYYY-MM-DD HH:MM:SS.ffffff' (formato de
+    SQLAlchemy en SQLite, aceptado tal cual por COPY): formatear un datetime
+    por fila costaba mas que generar el resto de la fila.
+    """
+
+    def __init__(self, seed: int, days: int, end: datetime, users: int):
+        self.rng = random.Random(seed)
+        self.start = end - timedelta(days=days)
+        self.days = days
+        # None = operacion interna sin email
+        self.users = [f"customer{i:06d}@example.com" for i in range(users)] + [None]
+        zipf = [1.0 / (rank + 1) for rank in range(users)]
+        zipf.append(sum(zipf) * INTERNAL_SHARE / (1 - INTERNAL_SHARE))
+        self.user_weights = list(accumulate(zipf))
+        self.types = [profile[0] for profile in TYPE_PROFILES]
+        self.type_weights = list(accumulate(profile[1] for profile in TYPE_PROFILES))
+        self.profiles = {profile[0]: profile[2:] for profile in TYPE_PROFILES}
+        self.factors = {
+            name: CarbonCalculatorService.CARBON_FACTORS.get(name, CarbonCalculatorService.CARBON_FACTORS['default'])
+            for name in self.types
+        }
+        # Prefijo 'YYYY-MM-DD HH:' por (dia, hora); solo minutos y segundos se formatean por fila
+        self.hour_prefixes = [
+            (self.start + timedelta(days=day, hours=hour)).strftime('%Y-%m-%d %H:')
+            for day in range(days) for hour in range(24)
+        ]
+        self.day_weights = list(accumulate(day + 1 for day in range(days)))
+        self.hour_weights = list(accumulate(HOUR_WEIGHTS))
+
+    def chunk(self, size: int) -> List[Tuple]:
+        rng = self.rng
+        profiles, factors, prefixes = self.profiles, self.factors, self.hour_prefixes
+        types = rng.choices(self.types, cum_weights=self.type_weights, k=size)
+        emails = rng.choices(self.users, cum_weights=self.user_weights, k=size)
+        days = rng.choices(range(self.days), cum_weights=self.day_weights, k=size)
+        hours = rng.choices(range(24), cum_weights=self.hour_weights, k=size)
+        seconds = rng.choices(range(3600), k=size)
+        # UUID v4 a partir de bytes aleatorios: mucho mas barato que uuid.UUID() por fila
+        raw = rng.randbytes(16 * size).hex()
+        rows = []
+        for index, (operation_type, email, day, hour, second) in enumerate(zip(types, emails, days, hours, seconds)):
+            mu, sigma = profiles[operation_type]
+            amount = round(rng.lognormvariate(mu, sigma), 2) or 0.01
+            h = raw[32 * index:32 * index + 32]
+            rows.append((
+                f"{h[:8]}-{h[8:12]}-4{h[13:16]}-{VARIANT_NIBBLES[h[16]]}{h[17:20]}-{h[20:]}",
+                operation_type,
+                amount,
+                round(amount * factors[operation_type], 2),
+                email,
+                f"{prefixes[day * 24 + hour]}{second // 60:02d}:{second % 60:02d}.000000",
+            ))
+        # Orden por created_at como en produccion (id crece con el tiempo); ademas el
+        # indice de created_at recibe inserciones casi secuenciales
+        rows.sort(key=itemgetter(5))
+        return rows
+
+    def chunks(self, total: int, chunk_size: int) -> Iterator[List[Tuple]]:
+        remaining = total
+        while remaining > 0:
+            size = min(chunk_size, remaining)
+            yield self.chunk(size)
+            remaining -= size
+
+
+def _copy_postgres(connection, rows):
+    # COPY no pasa por los TypeDecorator: amount/carbon_score van como enteros de punto fijo
+    amount_units, score_units = AMOUNT_TYPE.to_units, SCORE_TYPE.to_units
+    buffer = io.StringIO()
+    for operation_id, operation_type, amount, score, email, created_at in rows:
+        email = '\\N' if email is None else email
+        buffer.write(f"{operation_id}\t{operation_type}\t{amount_units(amount)}\t{score_units(score)}\t"
+                     f"{email}\t{created_at}\n")
+    buffer.seek(0)
+    with connection.cursor() as cursor:
+        cursor.copy_expert(f"COPY operations ({', '.join(COLUMNS)}) FROM STDIN", buffer)
+
+
+def _executemany_sqlite(connection, rows):
+    cursor = connection.cursor()
+    # Reservar el rango de seq del chunk de una vez: el trigger por fila solo cubre inserts sueltos
+    last = cursor.execute("UPDATE operations_seq SET value = value + ? RETURNING value", (len(rows),)).fetchone()[0]
+    first = last - len(rows) + 1
+    columns = COLUMNS + ('seq',)
+    placeholders = ', '.join('?' for _ in columns)
+    amount_units, score_units = AMOUNT_TYPE.to_units, SCORE_TYPE.to_units
+    cursor.executemany(f"INSERT INTO operations ({', '.join(columns)}) VALUES ({placeholders})", [
+        # GUID en SQLite: los 16 bytes del UUID
+        (bytes.fromhex(operation_id.replace('-', '')), operation_type, amount_units(amount), score_units(score),
+         email, created_at, first + i)
+        for i, (operation_id, operation_type, amount, score, email, created_at) in enumerate(rows)
+    ])
+    cursor.close()
+
+
+def _insert_generic(rows):
+    with db.engine.begin() as connection:
+        connection.execute(Operation.__table__.insert(), [
+            dict(zip(COLUMNS, row[:5] + (datetime.fromisoformat(row[5]),))) for row in rows
+        ])
+
+
+def _prefetch(chunks: Iterator[List[Tuple]], depth: int = 2) -> Iterator[List[Tuple]]:
+    """Generate chunks in a background thread while the caller inserts the previous one"""
+    buffer: queue.Queue = queue.Queue(maxsize=depth)
+    done = object()
+
+    def produce():
+        try:
+            for rows in chunks:
+                buffer.put(rows)
+        except BaseException as exc:  # se re-lanza en el hilo que inserta
+            buffer.put(exc)
+        buffer.put(done)
+
+    threading.Thread(target=produce, name='operation-generator', daemon=True).start()
+    while True:
+        item = buffer.get()
+        if item is done:
+            return
+        if isinstance(item, BaseException):
+            raise item
+        yield item
+
+
+def generate_operations(total: int, seed: int = 42, chunk_size: int = 50000, days: int = 365,
+                        end: datetime = None, users: int = 5000, progress=None) -> dict:
+    """Insert `total` synthetic operations; returns timing stats"""
+    end = end or datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+    generator = OperationGenerator(seed, days, end, users)
+    dialect = db.engine.dialect.name
+
+    if dialect == 'postgresql':
+        from services.partitioning import ensure_partitions, month_start
+        ensure_partitions(months_ahead=days // 28 + 2, start=month_start(generator.start))
+
+    inserted = 0
+    started = time.perf_counter()
+    raw = db.engine.raw_connection()
+    if dialect == 'sqlite':
+        # Cache de paginas grande solo en esta conexion: los indices de operation_id
+        # (aleatorio) y created_at dejan de ir a disco en cada chunk
+        raw.execute(f"PRAGMA cache_size = -{SQLITE_BULK_CACHE_KIB}")
+    try:
+        # COPY / sqlite3 sueltan el GIL mientras escriben: generar el siguiente chunk en paralelo
+        for rows in _prefetch(generator.chunks(total, chunk_size)):
+            if dialect == 'postgresql':
+                _copy_postgres(raw, rows)
+                raw.commit()
+            elif dialect == 'sqlite':
+                _executemany_sqlite(raw, rows)
+                raw.commit()
+            else:
+                _insert_generic(rows)
+            inserted += len(rows)
+            if progress:
+                progress(inserted, time.perf_counter() - started)
+    finally:
+        raw.close()
+        if inserted:
+            bump_operations_generation()
+
+    elapsed = time.perf_counter() - started
+    return {
+        'rows': inserted,
+        'seconds': round(elapsed, 2),
+        'rows_per_second': round(inserted / elapsed) if elapsed else 0,
+        'start': generator.start.isoformat(),
+        'end': end.isoformat(),
+    }
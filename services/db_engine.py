@@ -0,0 +1,127 @@
+"""
+Configuracion del engine de SQLAlchemy y metricas del pool de conexiones.
+
+Por defecto el pool se dimensiona para la topologia de uwsgi.ini (4 procesos x
+2 threads): cada proceso necesita como maximo una conexion por thread, con un
+pequeño overflow para CLI/tareas. En SQLite (modo local) se activan WAL y
+synchronous=NORMAL para que lecturas y escrituras no se bloqueen entre si.
+
+Metricas exportadas (ver GET /api/metrics/):
+- db.pool.checkout_wait: tiempo esperando una conexion libre
+- db.pool.checked_out / db.pool.saturation: conexiones en uso y fraccion del maximo
+- db.pool.timeouts: checkouts que agotaron pool_timeout
+
+El engine async del modo ASGI (services/async_io.py) tiene su propio pool
+(ASYNC_DB_POOL_SIZE, una conexion por request en vuelo) y sus gauges van
+como db.async_pool.*.
+"""
+import logging
+import time
+
+from sqlalchemy import event
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import QueuePool
+
+from services.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool that records how long each checkout waits for a connection"""
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        except PoolTimeoutError:
+            metrics.increment('db.pool.timeouts')
+            raise
+        finally:
+            metrics.observe('db.pool.checkout_wait', time.perf_counter() - start)
+
+
+def build_engine_options(config) -> dict:
+    """Build SQLALCHEMY_ENGINE_OPTIONS from the app config"""
+    uri = config['SQLALCHEMY_DATABASE_URI']
+    options = {'pool_pre_ping': config['DB_POOL_PRE_PING']}
+
+    if uri.startswith('sqlite'):
+        # Flask-SQLAlchemy elige el pool para SQLite (StaticPool en memoria)
+        return options
+
+    options.update({
+        'poolclass': InstrumentedQueuePool,
+        'pool_size': config['DB_POOL_SIZE'],
+        'max_overflow': config['DB_MAX_OVERFLOW'],
+        'pool_timeout': config['DB_POOL_TIMEOUT'],
+        'pool_recycle': config['DB_POOL_RECYCLE'],
+    })
+
+    if uri.startswith('postgresql') and config['DB_STATEMENT_TIMEOUT_MS']:
+        options['connect_args'] = {
+            'options': f"-c statement_timeout={config['DB_STATEMENT_TIMEOUT_MS']}"
+        }
+
+    return options
+
+
+def build_async_engine_options(config) -> dict:
+    """Options for the async engine (ASYNC_DATABASE_URL) of the ASGI mode"""
+    uri = config['ASYNC_DATABASE_URL']
+    options = {'pool_pre_ping': config['DB_POOL_PRE_PING']}
+
+    if uri.startswith('sqlite'):
+        return options
+
+    # Sin poolclass: create_async_engine usa AsyncAdaptedQueuePool
+    options.update({
+        'pool_size': config['ASYNC_DB_POOL_SIZE'],
+        'max_overflow': config['ASYNC_DB_MAX_OVERFLOW'],
+        'pool_timeout': config['DB_POOL_TIMEOUT'],
+        'pool_recycle': config['DB_POOL_RECYCLE'],
+    })
+
+    if uri.startswith('postgresql+asyncpg') and config['DB_STATEMENT_TIMEOUT_MS']:
+        options['connect_args'] = {
+            'server_settings': {'statement_timeout': str(config['DB_STATEMENT_TIMEOUT_MS'])}
+        }
+
+    return options
+
+
+def init_engine_instrumentation(app, engine, prefix: str = 'db.pool'):
+    """Attach SQLite pragmas and pool gauges (`prefix`.*) to an engine"""
+    if engine.dialect.name == 'sqlite':
+        journal_mode = app.config['SQLITE_JOURNAL_MODE']
+        synchronous = app.config['SQLITE_SYNCHRONOUS']
+
+        @event.listens_for(engine, 'connect')
+        def set_sqlite_pragmas(dbapi_connection, connection_record):
+            cursor = dbapi_connection.cursor()
+            if engine.url.database not in (None, '', ':memory:'):
+                cursor.execute(f"PRAGMA journal_mode={journal_mode}")
+            cursor.execute(f"PRAGMA synchronous={synchronous}")
+            cursor.execute("PRAGMA busy_timeout=5000")
+            cursor.close()
+
+    pool = engine.pool
+    if not isinstance(pool, QueuePool):
+        return
+
+    capacity = pool.size() + max(pool._max_overflow, 0)
+
+    def record_usage(checked_out):
+        metrics.set_gauge(f'{prefix}.checked_out', checked_out)
+        metrics.set_gauge(f'{prefix}.saturation', round(checked_out / capacity, 3) if capacity else 0.0)
+
+    @event.listens_for(pool, 'checkout')
+    def on_checkout(dbapi_connection, connection_record, connection_proxy):
+        record_usage(pool.checkedout())
+
+    @event.listens_for(pool, 'checkin')
+    def on_checkin(dbapi_connection, connection_record):
+        # El evento se dispara antes de devolver la conexion al pool
+        record_usage(max(pool.checkedout() - 1, 0))
+
+    metrics.set_gauge(f'{prefix}.capacity', capacity)
@@ -0,0 +1,182 @@
+"""
+Ruteo de lecturas a una replica de solo lectura.
+
+- RoutingSession envia los SELECT de las vistas marcadas con @read_only al
+  engine de la replica (REPLICA_DATABASE_URL); todo lo demas va al primario.
+- Si la replica falla (conexion, tabla inexistente), se marca como caida por
+  REPLICA_RETRY_AFTER segundos y la query se reintenta contra el primario.
+- Read-your-writes: un cliente que escribio en los ultimos
+  READ_YOUR_WRITES_WINDOW segundos lee del primario, para no ver datos
+  anteriores a su propia escritura por el lag de replicacion. La marca se
+  guarda en proceso y, si DB_ROUTING_REDIS_URL esta configurado, en Redis para
+  que la vean todos los workers.
+
+Sin REPLICA_DATABASE_URL todo funciona igual que antes (solo primario).
+"""
+import logging
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+from flask import current_app, g, has_request_context, request, session
+from flask_sqlalchemy.session import Session
+from sqlalchemy import create_engine
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.sql import Select, CompoundSelect
+
+from services.cache import LRUCache
+from services.metrics import metrics
+from services.redis_client import get_redis_client
+
+logger = logging.getLogger(__name__)
+
+
+class _RoutingState:
+    def __init__(self, engine, window, retry_after, redis_url):
+        self.engine = engine
+        self.window = window
+        self.retry_after = retry_after
+        self.redis_url = redis_url
+        self.recent_writers = LRUCache(10000)
+        self.replica_down_until = 0.0
+
+
+def init_db_routing(app):
+    """Create the replica engine (if configured) and register the read-your-writes hook"""
+    engine = None
+    replica_url = app.config.get('REPLICA_DATABASE_URL')
+    if replica_url:
+        from services.db_engine import build_engine_options, init_engine_instrumentation
+        options = build_engine_options(dict(app.config, SQLALCHEMY_DATABASE_URI=replica_url))
+        engine = create_engine(replica_url, **options)
+        init_engine_instrumentation(app, engine)
+
+    app.extensions['db_routing'] = _RoutingState(
+        engine,
+        app.config.get('READ_YOUR_WRITES_WINDOW', 5),
+        app.config.get('REPLICA_RETRY_AFTER', 30),
+        app.config.get('DB_ROUTING_REDIS_URL')
+    )
+    app.after_request(_remember_writer)
+
+
+def _state():
+    return current_app.extensions.get('db_routing')
+
+
+def _client_key():
+    """Identity used for the read-your-writes guard (JWT identity, backoffice user or IP)"""
+    try:
+        from flask_jwt_extended import get_jwt_identity
+        identity = get_jwt_identity()
+    except Exception:
+        identity = None
+    return identity or session.get('user_email') or request.remote_addr
+
+
+def _remember_writer(response):
+    state = _state()
+    if state is not None and g.get('db_wrote') and state.engine is not None:
+        key = _client_key()
+        until = time.time() + state.window
+        state.recent_writers.set(key, until, expires_at=until)
+        if state.redis_url:
+            try:
+                get_redis_client(state.redis_url).set(f"db_routing:writer:{key}", 1, px=int(state.window * 1000))
+            except Exception as e:
+                logger.warning(f"Could not record recent writer in Redis: {e}")
+    return response
+
+
+def _wrote_recently(state):
+    key = _client_key()
+    if state.recent_writers.get(key) is not None:
+        return True
+    if state.redis_url:
+        try:
+            return bool(get_redis_client(state.redis_url).exists(f"db_routing:writer:{key}"))
+        except Exception as e:
+            logger.warning(f"Could not read recent writer from Redis: {e}")
+    return False
+
+
+def replica_engine(app=None):
+    """Return the replica engine, or None when no replica is configured"""
+    state = (app or current_app).extensions.get('db_routing')
+    return state.engine if state is not None else None
+
+
+def replica_available():
+    state = _state()
+    return state is not None and state.engine is not None and state.replica_down_until <= time.time()
+
+
+class RoutingSession(Session):
+    """Flask-SQLAlchemy session that sends read-only SELECTs to the replica bind"""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and has_request_context():
+            if self._flushing or (clause is not None and getattr(clause, 'is_dml', False)):
+                g.db_wrote = True
+            elif g.get('db_read_only') and isinstance(clause, (Select, CompoundSelect)) and replica_available():
+                g.db_replica_used = True
+                metrics.increment('db_routing.replica_reads')
+                return _state().engine
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+    def execute(self, statement, *args, **kwargs):
+        if not (has_request_context() and g.get('db_read_only')):
+            return super().execute(statement, *args, **kwargs)
+
+        g.db_replica_used = False
+        try:
+            return super().execute(statement, *args, **kwargs)
+        except DBAPIError as e:
+            if not g.get('db_replica_used'):
+                raise
+            # Replica caida o desactualizada (p.ej. sin la tabla): reintentar en el primario
+            logger.warning(f"Replica read failed, falling back to primary: {e}")
+            metrics.increment('db_routing.replica_failures')
+            state = _state()
+            state.replica_down_until = time.time() + state.retry_after
+            self.rollback()
+            return super().execute(statement, *args, **kwargs)
+
+
+@contextmanager
+def primary():
+    """Force queries in the block to go to the primary"""
+    previous = g.get('db_read_only', False)
+    g.db_read_only = False
+    try:
+        yield
+    finally:
+        g.db_read_only = previous
+
+
+@contextmanager
+def replica_reads():
+    """
+    Allow queries in the block to go to the replica (if available and the
+    client has not written recently). Useful for streamed responses, whose
+    generator runs after the view has returned.
+    """
+    previous = g.get('db_read_only', False)
+    g.db_read_only = replica_available() and not _wrote_recently(_state())
+    try:
+        yield
+    finally:
+        g.db_read_only = previous
+
+
+def read_only(f):
+    """
+    Marca una vista como de solo lectura: sus SELECT pueden ir a la replica.
+    Aplicar debajo de los decoradores de autenticacion para que la identidad
+    del cliente este disponible.
+    """
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        with replica_reads():
+            return f(*args, **kwargs)
+    return decorated_function
@@ -0,0 +1,97 @@
+"""
+Tipos de columna compactos, transparentes para la aplicacion.
+
+- GUID: UUID nativo en Postgres (16 bytes) y BLOB de 16 bytes en SQLite, en
+  lugar de VARCHAR(36). En Python sigue siendo el string canonico
+  'xxxxxxxx-xxxx-...', asi que la API no cambia. El indice unico ocupa
+  aproximadamente la mitad.
+- FixedPoint(scale): entero (BIGINT) con `scale` decimales. Evita redondeos de
+  float al guardar; en Python se lee como float (entero / 10**scale, el float
+  mas cercano al decimal guardado). El rango se achica en 10**scale: las vistas
+  validan con fits() antes de guardar (amount hasta ~9.2e12), y con has_scale()
+  rechazan valores con mas de `scale` decimales en vez de redondearlos en
+  silencio (1e-7 se guardaria como 0).
+"""
+import uuid
+
+from sqlalchemy import BigInteger, LargeBinary
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.types import TypeDecorator
+
+
+def parse_guid(value) -> uuid.UUID:
+    """uuid.UUID from a UUID, canonical string or 32-hex string; raises ValueError if invalid"""
+    if isinstance(value, uuid.UUID):
+        return value
+    if isinstance(value, bytes):
+        return uuid.UUID(bytes=value)
+    return uuid.UUID(str(value))
+
+
+def is_guid(value) -> bool:
+    try:
+        parse_guid(value)
+        return True
+    except (ValueError, TypeError, AttributeError):
+        return False
+
+
+class GUID(TypeDecorator):
+    """UUID stored natively (Postgres) or as 16 raw bytes; exposed as the canonical string"""
+
+    impl = LargeBinary(16)
+    cache_ok = True
+
+    def load_dialect_impl(self, dialect):
+        if dialect.name == 'postgresql':
+            return dialect.type_descriptor(postgresql.UUID(as_uuid=True))
+        return dialect.type_descriptor(LargeBinary(16))
+
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        guid = parse_guid(value)
+        return guid if dialect.name == 'postgresql' else guid.bytes
+
+    def process_result_value(self, value, dialect):
+        if value is None:
+            return None
+        return str(value if isinstance(value, uuid.UUID) else uuid.UUID(bytes=value))
+
+
+class FixedPoint(TypeDecorator):
+    """Decimal number stored as a scaled BIGINT"""
+
+    impl = BigInteger
+    cache_ok = True
+
+    MAX_UNITS = 2 ** 63 - 1
+
+    def __init__(self, scale: int):
+        super().__init__()
+        self.scale = scale
+        self.factor = 10 ** scale
+
+    def to_units(self, value) -> int:
+        return round(value * self.factor)
+
+    def fits(self, value) -> bool:
+        """Whether `value` is finite and its scaled integer fits in a BIGINT"""
+        try:
+            return abs(self.to_units(value)) <= self.MAX_UNITS
+        except (OverflowError, ValueError, TypeError):
+            return False
+
+    def has_scale(self, value) -> bool:
+        """Whether `value` fits and has at most `scale` decimals (reads back unchanged)"""
+        return self.fits(value) and self.round_trip(value) == value
+
+    def process_bind_param(self, value, dialect):
+        return None if value is None else self.to_units(value)
+
+    def round_trip(self, value):
+        """`value` as it will read back from the database, without reading it"""
+        return self.process_result_value(self.process_bind_param(value, None), None)
+
+    def process_result_value(self, value, dialect):
+        return None if value is None else value / self.factor
@@ -1,47 +1,24 @@
 """
-Servicio de emails asincrono con Celery + Redis.
+Servicio de emails asincrono.
 
-El envio de emails no bloquea el request HTTP. Se encola en Redis
-y el worker de Celery lo procesa en background.
+El envio de emails no bloquea el request HTTP. Se encola segun EMAIL_TRANSPORT:
+- stream (default): Redis Stream consumido por `flask email worker`
+  (ver services/email_stream.py)
+- celery: tarea `email.send_confirmation` en la cola `email` de Celery
+  (ver services/celery_app.py)
 """
-import asyncio
-from celery import Celery
+import smtplib
 from flask import current_app
 from flask_mail import Message
 from app import mail
-import redis
-import json
+from services.celery_app import celery
 import logging
 
-celery = Celery('email_service')
-celery.conf.update(
-    broker_url='redis://localhost:6379/0',
-    result_backend='redis://localhost:6379/0',
-    task_serializer='json',
-    accept_content=['json'],
-    result_serializer='json',
-    timezone='UTC',
-    enable_utc=True,
-)
+def build_confirmation_message(operation_data: dict) -> Message:
+    """Confirmation email for a created operation"""
+    subject = "Transacción recibida – Carbon Snapshot Console"
 
-class EmailService:
-    """Async service to handle email notifications with Redis queue"""
-
-    def __init__(self):
-        self.redis_client = redis.Redis(host='localhost', port=6379, db=0, decode_responses=True)
-        self.logger = logging.getLogger(__name__)
-
-    @staticmethod
-    @celery.task
-    def send_operation_confirmation_async(operation_data: dict):
-        """Send confirmation email for a new operation asynchronously"""
-        logger = logging.getLogger(__name__)
-        try:
-            logger.info(f"Sending confirmation email for operation: {operation_data.get('operation_id')}")
-
-            subject = "Transacción recibida – Carbon Snapshot Console"
-
-            body = f"""
+    body = f"""
 Estimado usuario,
 
 Hemos recibido su transacción exitosamente:
@@ -58,66 +35,44 @@ Saludos,
 El equipo de Carbon Snapshot Console
             """
 
-            msg = Message(
-                subject=subject,
-                recipients=[operation_data['user_email']],
-                body=body
-            )
-
-            mail.send(msg)
-            logger.info(f"Email sent successfully to {operation_data['user_email']}")
-            return True
-
-        except Exception as e:
-            logger.error(f"Failed to send email to {operation_data.get('user_email', 'unknown')}: {str(e)}")
-            return False
-
-    async def queue_email_confirmation(self, operation_data: dict):
-        """Queue email confirmation task to Redis"""
-        try:
-            self.logger.info(f"Queuing email confirmation for operation: {operation_data.get('operation_id')}")
-
-            # Store in Redis queue for processing
-            await asyncio.get_event_loop().run_in_executor(
-                None,
-                lambda: self.redis_client.lpush(
-                    'email_queue',
-                    json.dumps(operation_data)
-                )
-            )
+    return Message(
+        subject=subject,
+        recipients=[operation_data['user_email']],
+        body=body
+    )
 
-            # Trigger Celery task
-            self.send_operation_confirmation_async.delay(operation_data)
+class EmailService:
+    """Queues confirmation emails on the configured transport (EMAIL_TRANSPORT)"""
 
-            self.logger.info(f"Email queued successfully for {operation_data['user_email']}")
-            return True
+    def __init__(self):
+        self.logger = logging.getLogger(__name__)
 
-        except Exception as e:
-            self.logger.error(f"Failed to queue email for {operation_data.get('user_email', 'unknown')}: {str(e)}")
-            return False
+    @staticmethod
+    @celery.task(name='email.send_confirmation', autoretry_for=(smtplib.SMTPException, OSError),
+                 retry_backoff=True, max_retries=5)
+    def send_operation_confirmation_async(operation_data: dict):
+        """Send confirmation email for a new operation asynchronously (retried on SMTP errors)"""
+        logger = logging.getLogger(__name__)
+        logger.info(f"Sending confirmation email for operation: {operation_data.get('operation_id')}")
+        mail.send(build_confirmation_message(operation_data))
+        logger.info(f"Email sent successfully to {operation_data['user_email']}")
+        return True
 
     @staticmethod
     def send_operation_confirmation(operation_data: dict):
-        """Legacy sync method - queues email for async processing"""
+        """Queue the confirmation email: Redis Stream (default) or Celery task"""
         logger = logging.getLogger(__name__)
         try:
             logger.info(f"Initiating email confirmation for operation: {operation_data.get('operation_id')}")
 
-            service = EmailService()
-            # Run the async queue method in sync context
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
-            result = loop.run_until_complete(
-                service.queue_email_confirmation(operation_data)
-            )
-            loop.close()
-
-            if result:
-                logger.info(f"Email confirmation process completed for operation: {operation_data.get('operation_id')}")
+            if current_app.config['EMAIL_TRANSPORT'] == 'stream':
+                from services.email_stream import email_stream
+                email_stream().publish(operation_data)
             else:
-                logger.warning(f"Email confirmation process failed for operation: {operation_data.get('operation_id')}")
+                EmailService.send_operation_confirmation_async.delay(operation_data)
 
-            return result
+            logger.info(f"Email queued successfully for {operation_data['user_email']}")
+            return True
         except Exception as e:
             logger.error(f"Failed to queue email confirmation for operation {operation_data.get('operation_id', 'unknown')}: {str(e)}")
             return False
@@ -0,0 +1,173 @@
+"""
+Cola de emails de confirmacion sobre un Redis Stream con consumer group.
+
+Reemplaza la lista `email_queue`, que nadie consumia y crecia sin limite:
+
+- Productor: XADD con MAXLEN aproximado (EMAIL_STREAM_MAXLEN), asi la memoria
+  de Redis queda acotada aunque no haya workers.
+- Workers (`flask email worker`): XREADGROUP en lotes, un solo login SMTP por
+  lote y XACK + XDEL de los enviados. Escalan horizontalmente: cada proceso es
+  un consumidor mas del grupo.
+- Mensajes pendientes de un worker caido (o con error de envio) se reclaman
+  despues de EMAIL_CLAIM_IDLE_MS; al llegar a EMAIL_MAX_DELIVERIES intentos
+  pasan al stream de dead letters (`<stream>:dead`, tambien con MAXLEN).
+"""
+import json
+import logging
+import os
+import socket
+import threading
+import time
+from typing import Dict, List, Tuple
+
+import redis
+from flask import current_app
+
+from services.metrics import metrics
+from services.redis_client import get_async_redis_client, get_redis_client
+
+logger = logging.getLogger(__name__)
+
+
+class EmailStream:
+    """Producer and consumer-group operations on the email stream"""
+
+    GROUP = 'email-senders'
+
+    def __init__(self, url: str, stream: str, maxlen: int, claim_idle_ms: int, max_deliveries: int):
+        self.url = url
+        self.stream = stream
+        self.dead_letter_stream = f"{stream}:dead"
+        self.maxlen = maxlen
+        self.claim_idle_ms = claim_idle_ms
+        self.max_deliveries = max_deliveries
+        self._group_ready = False
+
+    @property
+    def client(self) -> redis.Redis:
+        return get_redis_client(self.url)
+
+    def publish(self, operation_data: dict) -> str:
+        return self.client.xadd(self.stream, {'data': json.dumps(operation_data)},
+                                maxlen=self.maxlen, approximate=True)
+
+    async def publish_async(self, operation_data: dict) -> str:
+        """publish() from an async view (ASGI mode)"""
+        return await get_async_redis_client(self.url).xadd(self.stream, {'data': json.dumps(operation_data)},
+                                                           maxlen=self.maxlen, approximate=True)
+
+    def ensure_group(self):
+        if self._group_ready:
+            return
+        try:
+            self.client.xgroup_create(self.stream, self.GROUP, id='0', mkstream=True)
+        except redis.ResponseError as e:
+            if 'BUSYGROUP' not in str(e):
+                raise
+        self._group_ready = True
+
+    def _reclaim(self, consumer: str, count: int) -> List[Tuple[str, dict]]:
+        """Take over entries idle for claim_idle_ms; dead-letter the ones delivered too many times"""
+        pending = self.client.xpending_range(self.stream, self.GROUP, min='-', max='+', count=count,
+                                             idle=self.claim_idle_ms)
+        if not pending:
+            return []
+        exhausted = {entry['message_id'] for entry in pending if entry['times_delivered'] >= self.max_deliveries}
+        claimed = self.client.xclaim(self.stream, self.GROUP, consumer, self.claim_idle_ms,
+                                     [entry['message_id'] for entry in pending])
+        retry, dead = [], []
+        for message_id, fields in claimed:
+            if not fields:  # borrado por MAXLEN mientras estaba pendiente
+                dead.append(message_id)
+            elif message_id in exhausted:
+                self.client.xadd(self.dead_letter_stream, fields, maxlen=self.maxlen, approximate=True)
+                dead.append(message_id)
+            else:
+                retry.append((message_id, json.loads(fields['data'])))
+        if dead:
+            logger.error(f"Moved {len(dead)} undeliverable emails to {self.dead_letter_stream}")
+            metrics.increment('email.dead_lettered', len(dead))
+            self.ack(dead)
+        return retry
+
+    def read(self, consumer: str, count: int, block_ms: int) -> List[Tuple[str, dict]]:
+        self.ensure_group()
+        messages = self._reclaim(consumer, count)
+        if messages:
+            return messages
+        response = self.client.xreadgroup(self.GROUP, consumer, {self.stream: '>'}, count=count, block=block_ms)
+        return [(message_id, json.loads(fields['data'])) for message_id, fields in (response[0][1] if response else [])]
+
+    def ack(self, message_ids: List[str]):
+        if message_ids:
+            pipe = self.client.pipeline(transaction=False)
+            pipe.xack(self.stream, self.GROUP, *message_ids)
+            pipe.xdel(self.stream, *message_ids)
+            pipe.execute()
+
+    def backlog(self) -> Dict[str, int]:
+        pending = self.client.xpending(self.stream, self.GROUP)
+        return {'length': self.client.xlen(self.stream), 'pending': pending['pending']}
+
+
+def init_email_stream(app):
+    app.extensions['email_stream'] = EmailStream(
+        app.config['EMAIL_STREAM_REDIS_URL'],
+        app.config['EMAIL_STREAM'],
+        app.config['EMAIL_STREAM_MAXLEN'],
+        app.config['EMAIL_CLAIM_IDLE_MS'],
+        app.config['EMAIL_MAX_DELIVERIES'],
+    )
+
+
+def email_stream() -> EmailStream:
+    return current_app.extensions['email_stream']
+
+
+def send_batch(messages: List[Tuple[str, dict]]) -> List[str]:
+    """Send a batch over one SMTP connection; returns the ids that were sent"""
+    from app import mail
+    from services.email_service import build_confirmation_message
+
+    sent = []
+    with metrics.timer('email.batch'):
+        with mail.connect() as connection:
+            for message_id, operation_data in messages:
+                try:
+                    connection.send(build_confirmation_message(operation_data))
+                    sent.append(message_id)
+                except Exception as e:
+                    # Queda pendiente: se reintenta al reclamarlo
+                    logger.error(f"Failed to send email for operation {operation_data.get('operation_id')}: {e}")
+    metrics.increment('email.sent', len(sent))
+    metrics.increment('email.failed', len(messages) - len(sent))
+    return sent
+
+
+def run_email_worker(app, consumer: str = None, batch_size: int = 100, block_ms: int = 5000,
+                     stop: threading.Event = None, drain: bool = False) -> Dict[str, int]:
+    """Consume the email stream until `stop` is set (or until empty with drain=True)"""
+    consumer = consumer or f"{socket.gethostname()}-{os.getpid()}-{threading.get_ident()}"
+    stop = stop or threading.Event()
+    totals = {'received': 0, 'sent': 0}
+
+    with app.app_context():
+        stream = email_stream()
+        while not stop.is_set():
+            try:
+                messages = stream.read(consumer, batch_size, block_ms)
+                if not messages:
+                    if drain:
+                        break
+                    continue
+                sent = send_batch(messages)
+                stream.ack(sent)
+            except Exception as e:
+                # Redis o SMTP caidos: sin ack, el lote se reclama despues de EMAIL_CLAIM_IDLE_MS
+                logger.error(f"Email worker error, retrying: {e}")
+                metrics.increment('email.worker_errors')
+                time.sleep(1)
+                continue
+            totals['received'] += len(messages)
+            totals['sent'] += len(sent)
+    return totals
@@ -0,0 +1,190 @@
+"""
+Chequeos de salud para el load balancer.
+
+- GET /healthz (liveness): el proceso responde. No toca dependencias.
+- GET /readyz (readiness): estado de la base (primario y replica), de cada
+  Redis configurado y del broker de Celery (si EMAIL_TRANSPORT=celery), con
+  la latencia de cada chequeo.
+
+Los chequeos los corre un thread por worker cada HEALTH_CHECK_INTERVAL
+segundos, cada uno en paralelo y con HEALTH_CHECK_TIMEOUT; /readyz solo lee el
+ultimo resultado. Un probe nunca agrega carga a la base ni se bloquea en una
+dependencia lenta: una dependencia colgada aparece como 'timeout'. Si el
+refresco se atrasa (resultado mas viejo que 3 intervalos), /readyz falla.
+
+Solo los chequeos de HEALTH_CRITICAL_CHECKS (por nombre o prefijo, p.ej.
+'redis') sacan al worker del balanceo (503); los demas fallan como 'degraded'
+con 200, porque los servicios que usan Redis degradan a su modo local.
+"""
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from datetime import datetime, timezone
+from typing import Callable, Dict, Optional
+from urllib.parse import urlsplit
+
+from services.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+REDIS_URL_KEYS = (
+    'EMAIL_STREAM_REDIS_URL', 'OPERATION_CACHE_REDIS_URL', 'RESPONSE_CACHE_REDIS_URL',
+    'RATE_LIMIT_REDIS_URL', 'DB_ROUTING_REDIS_URL', 'INGEST_REDIS_URL', 'LIVE_FEED_REDIS_URL',
+)
+STALE_INTERVALS = 3
+
+
+class HealthMonitor:
+    """Background refresher of dependency checks, one per worker process"""
+
+    def __init__(self, app):
+        self.interval = app.config['HEALTH_CHECK_INTERVAL']
+        self.timeout = app.config['HEALTH_CHECK_TIMEOUT']
+        self.critical = [name.strip() for name in app.config['HEALTH_CRITICAL_CHECKS'].split(',') if name.strip()]
+        self.checks = build_checks(app)
+        self.report: Optional[dict] = None
+        self.refreshed_at = 0.0
+        self._ready = threading.Event()
+        self._lock = threading.Lock()
+        self._pid = None
+        self._executor = None
+
+    def _ensure_started(self):
+        # Despues de un fork (preload de uWSGI) el thread del master no existe en el worker
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._ready = threading.Event()
+            self.report = None
+            self._executor = None
+            threading.Thread(target=self._run, name='health-monitor', daemon=True).start()
+
+    def _run(self):
+        pid = os.getpid()
+        while self._pid == pid:
+            try:
+                self.refresh()
+            except Exception as e:
+                logger.error(f"Health refresh failed: {e}")
+            time.sleep(self.interval)
+
+    def refresh(self):
+        """Run every check in parallel, bounded by the timeout, and publish the results"""
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=len(self.checks), thread_name_prefix='health-check')
+        futures = {name: self._executor.submit(_timed, check) for name, check in self.checks.items()}
+        deadline = time.monotonic() + self.timeout
+        results = {}
+        for name, future in futures.items():
+            try:
+                results[name] = future.result(timeout=max(deadline - time.monotonic(), 0))
+            except FutureTimeout:
+                results[name] = {'status': 'timeout', 'latency_ms': round(self.timeout * 1000, 1)}
+            results[name]['critical'] = self.is_critical(name)
+            metrics.observe(f'health.{name}', results[name]['latency_ms'] / 1000)
+            if results[name]['status'] != 'ok':
+                metrics.increment(f'health.{name}.failures')
+
+        self.report = {'checks': results, 'checked_at': datetime.now(timezone.utc).isoformat(timespec='seconds')}
+        self.refreshed_at = time.monotonic()
+        self._ready.set()
+        return self.report
+
+    def is_critical(self, name: str) -> bool:
+        return any(name == critical or name.startswith(f"{critical}:") for critical in self.critical)
+
+    def readiness(self):
+        """(payload, http_status) from the latest cached results; never runs a check inline"""
+        self._ensure_started()
+        if not self._ready.wait(self.timeout + 1):
+            return {'status': 'starting', 'checks': {}}, 503
+
+        report = self.report
+        age = time.monotonic() - self.refreshed_at
+        failing = [name for name, result in report['checks'].items() if result['status'] != 'ok']
+        if age > self.interval * STALE_INTERVALS + self.timeout:
+            status, code = 'stale', 503
+        elif any(report['checks'][name]['critical'] for name in failing):
+            status, code = 'fail', 503
+        elif failing:
+            status, code = 'degraded', 200
+        else:
+            status, code = 'ok', 200
+        return dict(report, status=status, age_s=round(age, 1)), code
+
+
+def _timed(check: Callable[[], None]) -> dict:
+    start = time.perf_counter()
+    try:
+        check()
+        result = {'status': 'ok'}
+    except Exception as e:
+        result = {'status': 'error', 'error': f"{type(e).__name__}: {e}"[:200]}
+    result['latency_ms'] = round((time.perf_counter() - start) * 1000, 1)
+    return result
+
+
+def build_checks(app) -> Dict[str, Callable[[], None]]:
+    """Name -> callable for every dependency configured in `app`"""
+    from sqlalchemy import text
+    from app import db
+    from services.db_routing import replica_engine
+
+    with app.app_context():
+        primary = db.engine
+
+    def ping_engine(engine):
+        def check():
+            with engine.connect() as connection:
+                connection.execute(text('SELECT 1'))
+        return check
+
+    checks = {'database': ping_engine(primary)}
+    replica = replica_engine(app)
+    if replica is not None:
+        checks['replica'] = ping_engine(replica)
+
+    urls = []
+    for key in REDIS_URL_KEYS:
+        url = app.config.get(key)
+        if key == 'EMAIL_STREAM_REDIS_URL' and app.config.get('EMAIL_TRANSPORT') != 'stream':
+            continue
+        if url and url not in urls:
+            urls.append(url)
+    for url in urls:
+        name = 'redis' if len(urls) == 1 else f"redis:{_describe(url)}"
+        checks[name] = _ping_redis(url)
+
+    if app.config.get('EMAIL_TRANSPORT') == 'celery':
+        celery = app.extensions['celery']
+        timeout = app.config['HEALTH_CHECK_TIMEOUT']
+
+        def check_broker():
+            with celery.connection_for_write() as connection:
+                connection.ensure_connection(max_retries=1, timeout=timeout)
+        checks['broker'] = check_broker
+
+    return checks
+
+
+def _ping_redis(url):
+    from services.redis_client import get_redis_client
+
+    def check():
+        get_redis_client(url).ping()
+    return check
+
+
+def _describe(url: str) -> str:
+    """host:port/db without credentials"""
+    parts = urlsplit(url)
+    return f"{parts.hostname}:{parts.port or 6379}{parts.path or '/0'}"
+
+
+def init_health(app):
+    app.extensions['health'] = HealthMonitor(app)
@@ -0,0 +1,88 @@
+"""
+GET condicional (ETag / If-None-Match) para listados grandes.
+
+El dashboard consulta GET /api/operations/ cada pocos segundos. El ETag se
+deriva de la generacion de operaciones (services/response_cache.py) o, con
+el cache desactivado, de un marcador barato de la tabla (count +
+max(created_at), un agregado sobre indices) en vez de hashear el body: si el
+cliente ya tiene la version actual, se responde 304 sin ejecutar el listado
+ni serializarlo.
+
+Uso en una vista, despues del chequeo de permisos:
+
+    generation = operations_generation()
+    etag = operations_etag(generation)
+    not_modified = not_modified_response(etag)
+    if not_modified is not None:
+        return not_modified
+    ...
+    return tag_response(jsonify(data), etag)
+"""
+import hashlib
+from typing import Optional
+
+from flask import current_app, request
+from sqlalchemy import func, select
+
+from app import db
+from models import Operation
+from services.compression import LEVELS
+from services.metrics import metrics
+from services.response_cache import Generation
+
+CACHE_CONTROL = 'private, no-cache'
+
+
+def _marker_select():
+    return select(func.count(Operation.id), func.max(Operation.created_at))
+
+
+def _format_marker(count, newest) -> str:
+    return f"{count}:{newest.isoformat() if newest else ''}"
+
+
+def _table_marker() -> str:
+    """Cheap marker that changes whenever operations are inserted or removed"""
+    return _format_marker(*db.session.execute(_marker_select()).one())
+
+
+def _etag(marker: str) -> str:
+    args = '&'.join(f"{k}={v}" for k, v in sorted(request.args.items(multi=True)))
+    raw = f"{request.path}?{args}:{marker}"
+    return hashlib.sha1(raw.encode()).hexdigest()[:20]
+
+
+def operations_etag(generation: Optional[Generation] = None) -> str:
+    """Strong ETag for the current request over the operations table"""
+    return _etag(f"g{generation.token}" if generation is not None else _table_marker())
+
+
+async def operations_etag_async(generation: Optional[Generation] = None) -> str:
+    """operations_etag() for async views (the table marker goes through the async engine)"""
+    if generation is not None:
+        return _etag(f"g{generation.token}")
+    from services.async_io import async_session
+    async with async_session() as session:
+        return _etag(_format_marker(*(await session.execute(_marker_select())).one()))
+
+
+def not_modified_response(etag: str):
+    """304 response when If-None-Match has `etag` (or its compressed variant), None otherwise"""
+    if_none_match = request.if_none_match
+    if not if_none_match:
+        return None
+    for candidate in [etag] + [f"{etag}-{encoding}" for encoding in LEVELS]:
+        if if_none_match.contains(candidate):
+            metrics.increment('http_cache.not_modified')
+            response = current_app.response_class(status=304)
+            response.set_etag(candidate)
+            response.headers['Cache-Control'] = CACHE_CONTROL
+            response.vary.add('Accept-Encoding')
+            return response
+    return None
+
+
+def tag_response(response, etag: str):
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = CACHE_CONTROL
+    return response
@@ -0,0 +1,170 @@
+"""
+Idempotency-Key para los endpoints de creacion de operaciones.
+
+Los medidores reintentan POST ante timeouts; con el header Idempotency-Key un
+reintento devuelve la respuesta original sin recalcular el score, insertar otra
+operacion ni volver a encolar el email.
+
+Flujo (decorador `idempotent`):
+1. INSERT ... ON CONFLICT (scope, key) DO NOTHING RETURNING id. Es la unica
+   ida a la base para resolver duplicados concurrentes: el segundo INSERT
+   espera a que el primero termine su transaccion (indice unico) y no inserta.
+2. Si la clave es nuestra, la vista crea la operacion y llama a
+   `remember_response()` antes de su commit: clave, respuesta y operacion se
+   confirman juntas. Si la vista falla, la clave se libera.
+3. Si la clave ya existia se devuelve la respuesta guardada, con sus headers
+   (Location del 202) y Idempotent-Replayed: true, o 422 si el body es distinto.
+
+Las claves expiran a los IDEMPOTENCY_KEY_TTL segundos; una clave vencida se
+reemplaza al reutilizarla y `flask operations purge-idempotency-keys` borra el resto.
+"""
+import hashlib
+import json
+import logging
+from datetime import datetime, timedelta
+from functools import wraps
+from typing import Optional
+
+from flask import current_app, g, jsonify, request
+from flask_jwt_extended import get_jwt_identity
+from sqlalchemy import delete, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
+
+from app import db
+from models import IdempotencyKey
+from services.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+HEADER = 'Idempotency-Key'
+MAX_KEY_LENGTH = 255
+
+_UPSERT_DIALECTS = {'postgresql': postgresql.insert, 'sqlite': sqlite.insert}
+
+
+def _claim(scope: str, key: str, request_hash: str) -> Optional[int]:
+    """Insert the key in the current transaction; returns its id, or None if it already exists"""
+    now = datetime.utcnow()
+    values = dict(
+        scope=scope, key=key, request_hash=request_hash, created_at=now,
+        expires_at=now + timedelta(seconds=current_app.config['IDEMPOTENCY_KEY_TTL'])
+    )
+    insert = _UPSERT_DIALECTS.get(db.engine.dialect.name)
+    if insert is not None:
+        stmt = (insert(IdempotencyKey).values(**values)
+                .on_conflict_do_nothing(index_elements=['scope', 'key'])
+                .returning(IdempotencyKey.id))
+        return db.session.execute(stmt).scalar()
+
+    # Otros motores: INSERT en un savepoint y el conflicto como IntegrityError
+    try:
+        with db.session.begin_nested():
+            return db.session.execute(db.insert(IdempotencyKey).values(**values)
+                                      .returning(IdempotencyKey.id)).scalar()
+    except IntegrityError:
+        return None
+
+
+def _stored(scope: str, key: str):
+    stmt = select(
+        IdempotencyKey.id, IdempotencyKey.request_hash, IdempotencyKey.status_code,
+        IdempotencyKey.response_body, IdempotencyKey.response_headers, IdempotencyKey.expires_at
+    ).where(IdempotencyKey.scope == scope, IdempotencyKey.key == key)
+    return db.session.execute(stmt).first()
+
+
+def _replay(stored, request_hash: str):
+    if stored is None:
+        # Otra request libero la clave (su vista fallo) entre nuestro INSERT y el SELECT
+        metrics.increment('idempotency.conflicts')
+        return jsonify({'error': 'Request with this Idempotency-Key is being retried, try again'}), 409, {'Retry-After': '1'}
+    if stored.request_hash != request_hash:
+        metrics.increment('idempotency.mismatches')
+        return jsonify({'error': 'Idempotency-Key already used with a different request body'}), 422
+    if stored.status_code is None:
+        metrics.increment('idempotency.conflicts')
+        return jsonify({'error': 'Request with this Idempotency-Key is still in progress'}), 409, {'Retry-After': '1'}
+
+    metrics.increment('idempotency.replays')
+    response = current_app.response_class(stored.response_body, status=stored.status_code,
+                                          mimetype='application/json')
+    if stored.response_headers:
+        response.headers.update(json.loads(stored.response_headers))
+    response.headers['Idempotent-Replayed'] = 'true'
+    return response
+
+
+def _release(claim_id: int):
+    """Drop a claim whose request did not complete, so a retry can run again"""
+    db.session.rollback()
+    db.session.execute(delete(IdempotencyKey).where(IdempotencyKey.id == claim_id))
+    db.session.commit()
+
+
+def remember_response(body, status_code: int, headers: Optional[dict] = None):
+    """
+    Store the response (and headers such as Location) for the current Idempotency-Key
+    in the open transaction. Call it right before the view's commit; no-op without the header.
+    """
+    claim_id = g.get('idempotency_claim_id')
+    if claim_id is None:
+        return
+    db.session.execute(
+        update(IdempotencyKey).where(IdempotencyKey.id == claim_id)
+        .values(status_code=status_code, response_body=current_app.json.dumps(body),
+                response_headers=json.dumps(headers) if headers else None)
+    )
+    g.idempotency_saved = True
+
+
+def idempotent(f):
+    """
+    Honor the Idempotency-Key header on a create endpoint.
+    Aplicar debajo de jwt_required: el scope incluye la identidad del cliente.
+    """
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        key = request.headers.get(HEADER)
+        if key is None:
+            return f(*args, **kwargs)
+        if not key or len(key) > MAX_KEY_LENGTH:
+            return jsonify({'error': f'{HEADER} must be 1-{MAX_KEY_LENGTH} characters'}), 400
+
+        scope = f"{get_jwt_identity()}:{request.endpoint}"
+        request_hash = hashlib.sha256(request.get_data()).hexdigest()
+
+        claim_id = _claim(scope, key, request_hash)
+        if claim_id is None:
+            stored = _stored(scope, key)
+            if stored is not None and stored.expires_at <= datetime.utcnow():
+                # Clave vencida: reemplazarla como si no existiera
+                db.session.execute(delete(IdempotencyKey).where(IdempotencyKey.id == stored.id))
+                claim_id = _claim(scope, key, request_hash)
+                if claim_id is None:
+                    stored = _stored(scope, key)
+        if claim_id is None:
+            db.session.rollback()
+            logger.info(f"Replaying response for {HEADER} {key} ({scope})")
+            return _replay(stored, request_hash)
+
+        metrics.increment('idempotency.claims')
+        g.idempotency_claim_id = claim_id
+        g.idempotency_saved = False
+        completed = False
+        try:
+            response = f(*args, **kwargs)
+            completed = g.idempotency_saved
+            return response
+        finally:
+            g.idempotency_claim_id = None
+            if not completed:
+                _release(claim_id)
+    return decorated_function
+
+
+def purge_expired_keys(now: Optional[datetime] = None) -> int:
+    """Delete expired keys; returns how many were removed"""
+    result = db.session.execute(delete(IdempotencyKey).where(IdempotencyKey.expires_at <= (now or datetime.utcnow())))
+    db.session.commit()
+    return result.rowcount
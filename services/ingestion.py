@@ -0,0 +1,439 @@
+"""
+Ingesta asincrona de operaciones publicas (202 Accepted).
+
+Con INGEST_MODE=async (o =prefer y el header `Prefer: respond-async`),
+POST /public/operations/ solo valida el payload, asigna operation_id y
+created_at, agrega el registro a una cola durable y responde 202. Los workers
+(`flask ingest worker`) drenan la cola en lotes: calculan el carbon score,
+insertan con un solo INSERT multi-fila y disparan los emails de confirmacion.
+El cliente consulta GET /public/operations/<id>/status: cada cola guarda
+quien envio la operacion (identidad del JWT) y solo ese cliente ve su estado.
+
+Backends de la cola:
+- Redis Streams (INGEST_REDIS_URL): XADD + consumer group; los mensajes de un
+  worker caido se reasignan con XAUTOCLAIM despues de INGEST_CLAIM_IDLE_MS.
+- Log local append-only (INGEST_LOG_DIR): stand-in para desarrollo y tests,
+  no para produccion (un solo worker, un solo host). El offset consumido se
+  guarda despues del commit. Status y remitente van en un archivo chico por
+  operacion (status/<operation_id>.json): el polling de status lee uno solo,
+  sin recorrer logs, y los que superan INGEST_STATUS_TTL se borran al hacer ack
+  (como el TTL de las claves en Redis).
+
+La entrega es at-least-once: el INSERT ignora operation_id ya existentes, asi
+que un lote reentregado no duplica filas ni emails.
+"""
+import fcntl
+import json
+import logging
+import os
+import socket
+import threading
+import time
+import uuid
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+import redis
+from flask import current_app, request
+from sqlalchemy.dialects import postgresql, sqlite
+
+from app import db
+from models import Operation
+from services.carbon_calculator import CarbonCalculatorService
+from services.metrics import metrics
+from services.redis_client import get_redis_client
+from services.response_cache import bump_operations_generation
+from services.live_feed import publish_operations
+
+logger = logging.getLogger(__name__)
+
+QUEUED, COMPLETED, FAILED = 'queued', 'completed', 'failed'
+
+
+class RedisStreamQueue:
+    """Ingest queue on a Redis Stream with a consumer group"""
+
+    GROUP = 'ingest-workers'
+    STATUS_PREFIX = 'ingest:status:'
+    SUBMITTER_PREFIX = 'ingest:submitter:'
+
+    def __init__(self, url: str, stream: str, status_ttl: int, claim_idle_ms: int):
+        self.url = url
+        self.stream = stream
+        self.status_ttl = status_ttl
+        self.claim_idle_ms = claim_idle_ms
+        self._group_ready = False
+
+    @property
+    def client(self) -> redis.Redis:
+        return get_redis_client(self.url)
+
+    def enqueue(self, record: dict):
+        pipe = self.client.pipeline(transaction=True)
+        pipe.xadd(self.stream, {'data': json.dumps(record)})
+        pipe.set(self.STATUS_PREFIX + record['operation_id'], QUEUED, ex=self.status_ttl)
+        pipe.set(self.SUBMITTER_PREFIX + record['operation_id'], record['submitted_by'], ex=self.status_ttl)
+        pipe.execute()
+
+    def _ensure_group(self):
+        if self._group_ready:
+            return
+        try:
+            self.client.xgroup_create(self.stream, self.GROUP, id='0', mkstream=True)
+        except redis.ResponseError as e:
+            if 'BUSYGROUP' not in str(e):
+                raise
+        self._group_ready = True
+
+    def read_batch(self, consumer: str, count: int, block_ms: int) -> List[Tuple[str, dict]]:
+        self._ensure_group()
+        # Primero lo que quedo pendiente en workers caidos
+        _, messages, _ = self.client.xautoclaim(self.stream, self.GROUP, consumer, self.claim_idle_ms,
+                                                start_id='0-0', count=count)
+        if not messages:
+            response = self.client.xreadgroup(self.GROUP, consumer, {self.stream: '>'}, count=count, block=block_ms)
+            messages = response[0][1] if response else []
+        return [(message_id, json.loads(fields['data'])) for message_id, fields in messages if fields]
+
+    def ack(self, message_ids: List[str]):
+        if message_ids:
+            pipe = self.client.pipeline(transaction=False)
+            pipe.xack(self.stream, self.GROUP, *message_ids)
+            pipe.xdel(self.stream, *message_ids)
+            pipe.execute()
+
+    def mark(self, operation_ids: List[str], status: str, error: str = None):
+        pipe = self.client.pipeline(transaction=False)
+        value = status if error is None else f"{status}:{error}"
+        for operation_id in operation_ids:
+            pipe.set(self.STATUS_PREFIX + operation_id, value, ex=self.status_ttl)
+        pipe.execute()
+
+    def status(self, operation_id: str) -> Optional[Tuple[str, Optional[str]]]:
+        value = self.client.get(self.STATUS_PREFIX + operation_id)
+        if value is None:
+            return None
+        status, _, error = value.partition(':')
+        return status, error or None
+
+    def submitter(self, operation_id: str) -> Optional[str]:
+        return self.client.get(self.SUBMITTER_PREFIX + operation_id)
+
+    def backlog(self) -> int:
+        return self.client.xlen(self.stream)
+
+
+class LocalLogQueue:
+    """
+    Append-only NDJSON log + consumed offset, for development and tests without Redis.
+    Los procesos web agregan con flock; un solo worker consume.
+    """
+
+    PRUNE_INTERVAL = 60  # s entre barridos de status vencidos
+
+    def __init__(self, directory: str, status_ttl: int = 86400):
+        self.directory = directory
+        self.status_ttl = status_ttl
+        self.status_dir = os.path.join(directory, 'status')
+        os.makedirs(self.status_dir, exist_ok=True)
+        self.log_path = os.path.join(directory, 'operations.log')
+        self.offset_path = os.path.join(directory, 'operations.offset')
+        self.lock_path = os.path.join(directory, 'operations.lock')
+        self._worker_lock = None
+        self._pruned_at = 0.0
+
+    def _locked(self):
+        """Exclusive flock held until the returned handle is closed"""
+        handle = open(self.lock_path, 'a')
+        fcntl.flock(handle, fcntl.LOCK_EX)
+        return handle
+
+    def _offset(self) -> int:
+        try:
+            with open(self.offset_path) as f:
+                return int(f.read() or 0)
+        except FileNotFoundError:
+            return 0
+
+    def _write_offset(self, offset: int):
+        tmp_path = self.offset_path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            f.write(str(offset))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.offset_path)
+
+    def _status_path(self, operation_id: str) -> str:
+        return os.path.join(self.status_dir, f"{uuid.UUID(operation_id)}.json")
+
+    def _read_status(self, operation_id: str) -> Optional[dict]:
+        try:
+            with open(self._status_path(operation_id)) as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def _write_status(self, operation_id: str, entry: dict):
+        path = self._status_path(operation_id)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(entry, f)
+        os.replace(tmp_path, path)
+
+    def enqueue(self, record: dict):
+        # El status antes que el log: el worker nunca marca una operacion que aun no tiene status
+        self._write_status(record['operation_id'], {'status': QUEUED, 'submitted_by': record['submitted_by']})
+        line = json.dumps(record) + '\n'
+        with self._locked():
+            with open(self.log_path, 'a') as f:
+                f.write(line)
+                f.flush()
+                os.fsync(f.fileno())
+
+    def acquire_consumer(self):
+        """Only one worker may drain the local log"""
+        handle = open(os.path.join(self.directory, 'worker.lock'), 'a')
+        try:
+            fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            handle.close()
+            raise RuntimeError(f"Another ingest worker is already draining {self.log_path}")
+        self._worker_lock = handle
+
+    def read_batch(self, consumer: str, count: int, block_ms: int) -> List[Tuple[int, dict]]:
+        deadline = time.monotonic() + block_ms / 1000.0
+        while True:
+            batch = []
+            with self._locked():
+                offset = self._offset()
+                if os.path.exists(self.log_path):
+                    with open(self.log_path, 'rb') as f:
+                        f.seek(offset)
+                        while len(batch) < count:
+                            line = f.readline()
+                            if not line.endswith(b'\n'):  # vacio o escritura a medias
+                                break
+                            offset += len(line)
+                            batch.append((offset, json.loads(line)))
+            if batch or time.monotonic() >= deadline:
+                return batch
+            time.sleep(0.05)
+
+    def ack(self, offsets: List[int]):
+        if not offsets:
+            return
+        with self._locked():
+            offset = max(offsets)
+            if offset >= os.path.getsize(self.log_path):
+                # Todo consumido: compactar
+                open(self.log_path, 'w').close()
+                offset = 0
+            self._write_offset(offset)
+        self._prune_statuses()
+
+    def _prune_statuses(self):
+        """Drop status files older than status_ttl (at most once per PRUNE_INTERVAL)"""
+        now = time.time()
+        if now - self._pruned_at < self.PRUNE_INTERVAL:
+            return
+        self._pruned_at = now
+        with os.scandir(self.status_dir) as entries:
+            for entry in entries:
+                if entry.stat().st_mtime < now - self.status_ttl:
+                    os.remove(entry.path)
+
+    def mark(self, operation_ids: List[str], status: str, error: str = None):
+        for operation_id in operation_ids:
+            entry = self._read_status(operation_id) or {}
+            entry.update(status=status, error=error)
+            self._write_status(operation_id, entry)
+
+    def status(self, operation_id: str) -> Optional[Tuple[str, Optional[str]]]:
+        entry = self._read_status(operation_id)
+        if entry is None:
+            return None
+        return entry['status'], entry.get('error')
+
+    def submitter(self, operation_id: str) -> Optional[str]:
+        entry = self._read_status(operation_id)
+        return None if entry is None else entry.get('submitted_by')
+
+    def backlog(self) -> int:
+        with self._locked():
+            if not os.path.exists(self.log_path):
+                return 0
+            with open(self.log_path, 'rb') as f:
+                f.seek(self._offset())
+                return sum(1 for _ in f)
+
+
+def init_ingestion(app):
+    """Create the ingest queue backend for `app`"""
+    if app.config['INGEST_MODE'] not in ('sync', 'async', 'prefer'):
+        raise ValueError(f"Unknown INGEST_MODE: {app.config['INGEST_MODE']}")
+    if app.config['INGEST_REDIS_URL']:
+        queue = RedisStreamQueue(app.config['INGEST_REDIS_URL'], app.config['INGEST_STREAM'],
+                                 app.config['INGEST_STATUS_TTL'], app.config['INGEST_CLAIM_IDLE_MS'])
+    else:
+        # Relativo a instance/ (os.path.join ignora instance_path si INGEST_LOG_DIR es absoluto)
+        queue = LocalLogQueue(os.path.join(app.instance_path, app.config['INGEST_LOG_DIR']),
+                              app.config['INGEST_STATUS_TTL'])
+    app.extensions['ingest_queue'] = queue
+
+
+def ingest_queue():
+    return current_app.extensions['ingest_queue']
+
+
+def use_async_ingest() -> bool:
+    """Whether the current create request should be accepted asynchronously"""
+    mode = current_app.config['INGEST_MODE']
+    if mode == 'prefer':
+        return 'respond-async' in request.headers.get('Prefer', '')
+    return mode == 'async'
+
+
+def enqueue_operation(operation_type: str, amount: float, user_email: str, submitted_by: str) -> dict:
+    """Assign identifiers and append the operation to the ingest queue"""
+    record = {
+        'operation_id': str(uuid.uuid4()),
+        'type': operation_type,
+        'amount': amount,
+        'user_email': user_email,
+        'created_at': datetime.utcnow().isoformat(),
+        'submitted_by': submitted_by,
+    }
+    with metrics.timer('ingest.enqueue'):
+        ingest_queue().enqueue(record)
+    metrics.increment('ingest.accepted')
+    return record
+
+
+def operation_status(operation_id: str, submitted_by: str) -> Optional[dict]:
+    """Status of an operation accepted from `submitted_by`: queued, failed or completed (with the operation)"""
+    from services.operation_cache import operation_cache
+
+    queue = ingest_queue()
+    if queue.submitter(operation_id) != submitted_by:
+        # Ajena, desconocida o con el status vencido: 404 igual que si no existiera
+        return None
+    queued = queue.status(operation_id)
+    if queued is not None and queued[0] != COMPLETED:
+        status, error = queued
+        result = {'operation_id': operation_id, 'status': status}
+        if error:
+            result['error'] = error
+        return result
+
+    operation = operation_cache.get(operation_id)
+    if operation is None:
+        return None
+    return {'operation_id': operation_id, 'status': COMPLETED, 'operation': operation.to_dict()}
+
+
+_INSERT_DIALECTS = {'postgresql': postgresql.insert, 'sqlite': sqlite.insert}
+
+
+def process_batch(queue, batch: List[Tuple[object, dict]], calculator: CarbonCalculatorService,
+                  email_service=None) -> Dict[str, int]:
+    """Score, insert and confirm one batch; acks only after the commit"""
+    rows, failed = [], []
+    for _, record in batch:
+        try:
+            carbon_score = calculator.calculate_carbon_score(record['type'], record['amount'])
+            if not Operation.carbon_score.type.fits(carbon_score):
+                raise ValueError(f"carbon score out of range: {carbon_score}")
+        except Exception as e:
+            logger.error(f"Scoring failed for queued operation {record['operation_id']}: {e}")
+            failed.append(record['operation_id'])
+            continue
+        # Valores tal como quedan en las columnas de punto fijo: el feed y el email muestran lo mismo que la API
+        rows.append({
+            'operation_id': record['operation_id'],
+            'type': record['type'],
+            'amount': Operation.amount.type.round_trip(record['amount']),
+            'carbon_score': Operation.carbon_score.type.round_trip(carbon_score),
+            'user_email': record['user_email'],
+            'created_at': datetime.fromisoformat(record['created_at']),
+        })
+
+    inserted = set()
+    if rows:
+        insert = _INSERT_DIALECTS.get(db.engine.dialect.name)
+        with metrics.timer('ingest.batch_insert'):
+            if insert is not None:
+                # Reentregas: operation_id ya insertado -> se ignora (sin email repetido)
+                stmt = insert(Operation).on_conflict_do_nothing().returning(Operation.operation_id)
+                inserted = set(db.session.execute(stmt, rows).scalars())
+            else:
+                existing = set(db.session.execute(
+                    db.select(Operation.operation_id).where(Operation.operation_id.in_([r['operation_id'] for r in rows]))
+                ).scalars())
+                fresh = [row for row in rows if row['operation_id'] not in existing]
+                if fresh:
+                    db.session.execute(db.insert(Operation), fresh)
+                inserted = {row['operation_id'] for row in fresh}
+            db.session.commit()
+        if inserted:
+            bump_operations_generation()
+            publish_operations(
+                dict(row, created_at=row['created_at'].isoformat()) for row in rows if row['operation_id'] in inserted
+            )
+
+    # Status antes del ack: si el worker muere en el medio, el lote se reentrega y el
+    # INSERT lo ignora; al reves quedaria acked con el status en queued para siempre
+    if failed:
+        queue.mark(failed, FAILED, 'carbon score calculation failed')
+    if inserted:
+        queue.mark(sorted(inserted), COMPLETED)
+    queue.ack([message_id for message_id, _ in batch])
+
+    if email_service is not None:
+        for row in rows:
+            if row['operation_id'] in inserted:
+                email_service.send_operation_confirmation(dict(row, created_at=row['created_at'].isoformat()))
+
+    metrics.increment('ingest.inserted', len(inserted))
+    metrics.increment('ingest.failed', len(failed))
+    return {'received': len(batch), 'inserted': len(inserted), 'failed': len(failed)}
+
+
+def run_worker(app, consumer: str = None, batch_size: int = 500, block_ms: int = 1000,
+               stop: threading.Event = None, drain: bool = False, email_service=None) -> Dict[str, int]:
+    """
+    Drain the ingest queue until `stop` is set (or until empty with drain=True).
+    Un error de BD deja el lote sin ack: se reintenta (local) o lo reclama otro worker (Redis).
+    """
+    consumer = consumer or f"{socket.gethostname()}-{os.getpid()}-{threading.get_ident()}"
+    stop = stop or threading.Event()
+    calculator = CarbonCalculatorService()
+    totals = {'received': 0, 'inserted': 0, 'failed': 0}
+
+    with app.app_context():
+        queue = ingest_queue()
+        if isinstance(queue, LocalLogQueue):
+            queue.acquire_consumer()
+        if email_service is None:
+            from services.email_service import EmailService
+            email_service = EmailService()
+
+        while not stop.is_set():
+            batch = queue.read_batch(consumer, batch_size, block_ms)
+            if not batch:
+                if drain:
+                    break
+                continue
+            try:
+                result = process_batch(queue, batch, calculator, email_service)
+            except Exception as e:
+                db.session.rollback()
+                logger.error(f"Ingest batch of {len(batch)} failed, will be retried: {e}")
+                metrics.increment('ingest.batch_errors')
+                time.sleep(1)
+                continue
+            finally:
+                db.session.remove()
+            for key, value in result.items():
+                totals[key] += value
+            logger.info(f"Ingested batch: {result}")
+    return totals
@@ -0,0 +1,90 @@
+"""
+Proveedor JSON de la aplicacion.
+
+Flask serializa con el modulo json de la stdlib; para listados grandes eso
+domina el tiempo de respuesta. OrjsonProvider usa orjson (si esta instalado)
+manteniendo el contrato del proveedor por defecto: claves ordenadas, indentado
+en debug, mismo `default` para tipos que orjson no conoce (Decimal, __html__).
+
+Diferencias con el proveedor por defecto:
+- datetime/date se serializan en ISO 8601 (el default de Flask usa formato
+  HTTP). Los to_dict() ya devuelven isoformat, asi que las respuestas no cambian.
+- La salida no escapa caracteres no ASCII (UTF-8 valido).
+
+serialize_rows() es el camino para listados: recibe tuplas de columnas (un
+select() de columnas, sin hidratar objetos ORM) y deja los datetime para el
+proveedor cuando este los serializa de forma nativa.
+"""
+import logging
+from typing import Iterable, List, Sequence
+
+from flask import current_app
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # dependencia opcional
+    orjson = None
+
+logger = logging.getLogger(__name__)
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    """DefaultJSONProvider backed by orjson"""
+
+    native_datetime = True
+
+    def _options(self, indent: bool = False) -> int:
+        option = orjson.OPT_NON_STR_KEYS
+        if self.sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        return option
+
+    def dumps(self, obj, **kwargs) -> str:
+        # Argumentos propios de json.dumps (cls, separators, ...) -> proveedor por defecto
+        indent = kwargs.pop('indent', None)
+        kwargs.pop('sort_keys', None)
+        if kwargs:
+            return super().dumps(obj, indent=indent, **kwargs)
+        return orjson.dumps(obj, default=self.default, option=self._options(bool(indent))).decode()
+
+    def loads(self, s, **kwargs):
+        if kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = (self.compact is None and self._app.debug) or self.compact is False
+        body = orjson.dumps(obj, default=self.default, option=self._options(indent) | orjson.OPT_APPEND_NEWLINE)
+        return self._app.response_class(body, mimetype=self.mimetype)
+
+
+def init_json_provider(app):
+    """Install the provider selected by JSON_PROVIDER ('orjson' or 'default')"""
+    name = app.config['JSON_PROVIDER']
+    if name == 'orjson':
+        if orjson is None:
+            logger.warning("JSON_PROVIDER=orjson but orjson is not installed; using the default provider")
+            return
+        app.json = OrjsonProvider(app)
+    elif name != 'default':
+        raise ValueError(f"Unknown JSON_PROVIDER: {name}")
+    logger.info(f"JSON provider: {type(app.json).__name__}")
+
+
+def serialize_rows(columns: Sequence[str], rows: Iterable[tuple],
+                   datetime_columns: Sequence[str] = ('created_at',)) -> List[dict]:
+    """Column tuples -> dicts ready for jsonify, without ORM objects"""
+    if getattr(current_app.json, 'native_datetime', False):
+        return [dict(zip(columns, row)) for row in rows]
+    # El proveedor por defecto formatea datetime como fecha HTTP: mantener isoformat
+    result = []
+    for row in rows:
+        data = dict(zip(columns, row))
+        for name in datetime_columns:
+            data[name] = data[name].isoformat()
+        result.append(data)
+    return result
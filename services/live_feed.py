@@ -0,0 +1,283 @@
+"""
+Feed en vivo de operaciones nuevas para el backoffice (Server-Sent Events).
+
+Las vistas de creacion y el worker de ingesta llaman a publish_operations()
+despues del commit. El listado /bo/operations/ abre un EventSource contra
+GET /bo/operations/stream y agrega las filas nuevas arriba de la tabla, sin
+recargar ni re-renderizar la pagina.
+
+Transporte:
+- Con LIVE_FEED_REDIS_URL se publica en el canal pub/sub LIVE_FEED_CHANNEL.
+  Cada proceso que sirve streams tiene una sola suscripcion (thread puente)
+  que reparte los mensajes a sus viewers: N viewers no son N conexiones a
+  Redis. Es el modo para produccion (varios workers, ingesta en otro proceso).
+- Sin Redis, un broadcaster en proceso: solo ven los eventos los viewers del
+  mismo proceso que creo la operacion (desarrollo con `python app.py`).
+
+Cada stream ocupa al que lo atiende mientras esta abierto. Con un worker
+gevent (uwsgi-stream.ini) es un greenlet y en el modo ASGI una corutina
+(open_stream_async); en los dos el limite por proceso es LIVE_FEED_MAX_STREAMS.
+En un worker sync de uWSGI es un thread, asi que se admiten a lo sumo
+LIVE_FEED_SYNC_STREAMS por proceso (0 por defecto: el resto recibe 503). El
+listado solo abre el stream si LIVE_FEED_URL apunta a un servicio de streams
+o si el proceso los sirve sin un thread por viewer o con LIVE_FEED_SYNC_STREAMS
+(serves_streams()). Los
+streams se cierran a los LIVE_FEED_MAX_SECONDS y el listado reconecta con un
+token nuevo.
+"""
+import asyncio
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from typing import AsyncIterator, Iterable, Iterator, Optional
+
+from flask import current_app
+
+from services.metrics import metrics
+from services.redis_client import get_async_redis_client, get_redis_client
+
+logger = logging.getLogger(__name__)
+
+EVENT = 'operations'
+RETRY_MS = 3000
+
+
+class Broadcaster:
+    """Fan-out of messages to the live streams of this process"""
+
+    def __init__(self, queue_size: int = 100):
+        self.queue_size = queue_size
+        self._lock = threading.Lock()
+        self._subscribers = set()
+
+    def subscribe(self) -> queue.Queue:
+        subscriber = queue.Queue(maxsize=self.queue_size)
+        self.add(subscriber)
+        return subscriber
+
+    def add(self, subscriber):
+        """Register any object with put_nowait() (see open_stream_async)"""
+        with self._lock:
+            self._subscribers.add(subscriber)
+
+    def unsubscribe(self, subscriber: queue.Queue):
+        with self._lock:
+            self._subscribers.discard(subscriber)
+
+    def publish(self, message: str):
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for subscriber in subscribers:
+            try:
+                subscriber.put_nowait(message)
+            except queue.Full:
+                # Viewer lento: pierde eventos en vez de frenar a los demas
+                metrics.increment('live_feed.dropped')
+
+    def __len__(self):
+        with self._lock:
+            return len(self._subscribers)
+
+
+class _FeedState:
+    def __init__(self, config):
+        self.enabled = config['LIVE_FEED_ENABLED']
+        self.redis_url = config['LIVE_FEED_REDIS_URL']
+        self.channel = config['LIVE_FEED_CHANNEL']
+        self.heartbeat = config['LIVE_FEED_HEARTBEAT']
+        self.max_seconds = config['LIVE_FEED_MAX_SECONDS']
+        self.max_streams = config['LIVE_FEED_MAX_STREAMS'] if cooperative() else config['LIVE_FEED_SYNC_STREAMS']
+        self.max_async_streams = config['LIVE_FEED_MAX_STREAMS']
+        self.broadcaster = Broadcaster()
+        self.bridge_pid = None
+        self.lock = threading.Lock()
+
+
+def cooperative() -> bool:
+    """True when running under gevent with patched sockets (a stream costs a greenlet, not a thread)"""
+    try:
+        from gevent import monkey
+    except ImportError:
+        return False
+    return monkey.is_module_patched('socket')
+
+
+def serves_streams(app=None) -> bool:
+    """
+    True when this process takes streams on its own origin: gevent or the ASGI mode (no thread
+    per viewer), or sync workers explicitly given LIVE_FEED_SYNC_STREAMS.
+    """
+    app = app or current_app
+    return cooperative() or 'asgi' in app.extensions or app.config['LIVE_FEED_SYNC_STREAMS'] > 0
+
+
+def init_live_feed(app):
+    app.extensions['live_feed'] = _FeedState(app.config)
+
+
+def _state(app=None) -> _FeedState:
+    return (app or current_app).extensions['live_feed']
+
+
+def publish_operations(operations: Iterable[dict], app=None):
+    """Announce newly committed operations (to_dict() shape); never raises"""
+    state = _state(app)
+    if not state.enabled:
+        return
+    operations = list(operations)
+    if not operations:
+        return
+    message = json.dumps(operations, default=str)
+    try:
+        if state.redis_url:
+            get_redis_client(state.redis_url).publish(state.channel, message)
+        else:
+            state.broadcaster.publish(message)
+        metrics.increment('live_feed.published', len(operations))
+    except Exception as e:
+        logger.warning(f"Live feed publish failed: {e}")
+
+
+async def publish_operations_async(operations: Iterable[dict], app=None):
+    """publish_operations() for async views"""
+    state = _state(app)
+    if not state.enabled:
+        return
+    operations = list(operations)
+    if not operations:
+        return
+    message = json.dumps(operations, default=str)
+    try:
+        if state.redis_url:
+            await get_async_redis_client(state.redis_url).publish(state.channel, message)
+        else:
+            state.broadcaster.publish(message)
+        metrics.increment('live_feed.published', len(operations))
+    except Exception as e:
+        logger.warning(f"Live feed publish failed: {e}")
+
+
+def _ensure_bridge(state: _FeedState):
+    """Start (once per process) the thread that relays the Redis channel to local streams"""
+    if not state.redis_url or state.bridge_pid == os.getpid():
+        return
+    with state.lock:
+        if state.bridge_pid == os.getpid():
+            return
+        state.bridge_pid = os.getpid()
+        threading.Thread(target=_run_bridge, args=(state, os.getpid()), name='live-feed-bridge', daemon=True).start()
+
+
+def _run_bridge(state: _FeedState, pid: int):
+    while state.bridge_pid == pid:
+        pubsub = None
+        try:
+            pubsub = get_redis_client(state.redis_url).pubsub(ignore_subscribe_messages=True)
+            pubsub.subscribe(state.channel)
+            while state.bridge_pid == pid:
+                message = pubsub.get_message(timeout=1.0)
+                if message is not None:
+                    state.broadcaster.publish(message['data'])
+        except Exception as e:
+            logger.warning(f"Live feed subscription lost, retrying: {e}")
+            time.sleep(1)
+        finally:
+            if pubsub is not None:
+                try:
+                    pubsub.close()
+                except Exception:
+                    pass
+
+
+class StreamLimitReached(Exception):
+    """This process already serves its maximum number of live streams"""
+
+
+def open_stream(app=None) -> Iterator[str]:
+    """
+    Subscribe now (so nothing published after the response starts is lost) and
+    return the SSE body generator. Raises StreamLimitReached when the process is full.
+    """
+    state = _state(app)
+    if len(state.broadcaster) >= state.max_streams:
+        metrics.increment('live_feed.rejected')
+        raise StreamLimitReached()
+    _ensure_bridge(state)
+    subscriber = state.broadcaster.subscribe()
+    metrics.set_gauge('live_feed.streams', len(state.broadcaster))
+    return _events(state, subscriber)
+
+
+def open_stream_async(app=None) -> AsyncIterator[str]:
+    """open_stream() for the ASGI mode: the body is an async generator on the running event loop"""
+    state = _state(app)
+    if len(state.broadcaster) >= state.max_async_streams:
+        metrics.increment('live_feed.rejected')
+        raise StreamLimitReached()
+    _ensure_bridge(state)
+    subscriber = _LoopSubscriber(asyncio.get_running_loop(), state.broadcaster.queue_size)
+    state.broadcaster.add(subscriber)
+    metrics.set_gauge('live_feed.streams', len(state.broadcaster))
+    return _events_async(state, subscriber)
+
+
+def _events(state: _FeedState, subscriber: queue.Queue) -> Iterator[str]:
+    deadline = time.monotonic() + state.max_seconds
+    try:
+        yield f"retry: {RETRY_MS}\n\n"
+        while time.monotonic() < deadline:
+            message = _next(subscriber, min(state.heartbeat, max(deadline - time.monotonic(), 0)))
+            if message is None:
+                yield ": keepalive\n\n"
+            else:
+                yield f"event: {EVENT}\ndata: {message}\n\n"
+    finally:
+        state.broadcaster.unsubscribe(subscriber)
+        metrics.set_gauge('live_feed.streams', len(state.broadcaster))
+
+
+def _next(subscriber: queue.Queue, timeout: float) -> Optional[str]:
+    try:
+        return subscriber.get(timeout=timeout)
+    except queue.Empty:
+        return None
+
+
+class _LoopSubscriber:
+    """Broadcaster subscriber that hands messages to an asyncio.Queue, from any thread"""
+
+    def __init__(self, loop, queue_size: int):
+        self.loop = loop
+        self.queue = asyncio.Queue(maxsize=queue_size)
+
+    def put_nowait(self, message: str):
+        try:
+            self.loop.call_soon_threadsafe(self._put, message)
+        except RuntimeError:
+            pass  # loop cerrado: el stream ya termino
+
+    def _put(self, message: str):
+        try:
+            self.queue.put_nowait(message)
+        except asyncio.QueueFull:
+            metrics.increment('live_feed.dropped')
+
+
+async def _events_async(state: _FeedState, subscriber: _LoopSubscriber) -> AsyncIterator[str]:
+    deadline = time.monotonic() + state.max_seconds
+    try:
+        yield f"retry: {RETRY_MS}\n\n"
+        while time.monotonic() < deadline:
+            timeout = min(state.heartbeat, max(deadline - time.monotonic(), 0))
+            try:
+                message = await asyncio.wait_for(subscriber.queue.get(), timeout)
+            except asyncio.TimeoutError:
+                yield ": keepalive\n\n"
+            else:
+                yield f"event: {EVENT}\ndata: {message}\n\n"
+    finally:
+        state.broadcaster.unsubscribe(subscriber)
+        metrics.set_gauge('live_feed.streams', len(state.broadcaster))
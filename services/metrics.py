@@ -0,0 +1,98 @@
+"""
+Registro de metricas en proceso.
+
+Contadores, gauges y timers simples (thread-safe) que exponen los servicios
+(caches, pool de conexiones, tareas). Cada worker de uWSGI mantiene su propio
+registro; el snapshot se consulta via GET /api/metrics/.
+"""
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Dict, Any
+
+
+class _Timer:
+    """Accumulates durations and keeps a bounded window of samples for percentiles."""
+
+    def __init__(self, window: int):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.samples = deque(maxlen=window)
+
+    def observe(self, seconds: float):
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+        self.samples.append(seconds)
+
+    def snapshot(self) -> Dict[str, Any]:
+        ordered = sorted(self.samples)
+
+        def percentile(p):
+            if not ordered:
+                return 0.0
+            return ordered[min(len(ordered) - 1, int(p * len(ordered)))]
+
+        return {
+            'count': self.count,
+            'avg_ms': round(self.total / self.count * 1000, 3) if self.count else 0.0,
+            'p50_ms': round(percentile(0.50) * 1000, 3),
+            'p95_ms': round(percentile(0.95) * 1000, 3),
+            'p99_ms': round(percentile(0.99) * 1000, 3),
+            'max_ms': round(self.max * 1000, 3),
+        }
+
+
+class MetricsRegistry:
+    """Thread-safe registry of counters, gauges and timers"""
+
+    def __init__(self, window: int = 1024):
+        self._window = window
+        self._lock = threading.Lock()
+        self._counters: Dict[str, float] = {}
+        self._gauges: Dict[str, float] = {}
+        self._timers: Dict[str, _Timer] = {}
+
+    def increment(self, name: str, value: float = 1):
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+
+    def set_gauge(self, name: str, value: float):
+        with self._lock:
+            self._gauges[name] = value
+
+    def observe(self, name: str, seconds: float):
+        with self._lock:
+            timer = self._timers.get(name)
+            if timer is None:
+                timer = self._timers[name] = _Timer(self._window)
+            timer.observe(seconds)
+
+    @contextmanager
+    def timer(self, name: str):
+        """Time the wrapped block and record it under `name`"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'counters': dict(self._counters),
+                'gauges': dict(self._gauges),
+                'timers': {name: timer.snapshot() for name, timer in self._timers.items()},
+            }
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._gauges.clear()
+            self._timers.clear()
+
+
+metrics = MetricsRegistry()
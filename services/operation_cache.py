@@ -0,0 +1,271 @@
+"""
+Cache read-through de operaciones por operation_id.
+
+Las operaciones son inmutables una vez creadas, asi que no hace falta
+invalidacion: solo expiracion para acotar memoria.
+
+Niveles:
+1. LRU en proceso (por worker)
+2. Redis opcional (compartido entre workers), activado con OPERATION_CACHE_REDIS_URL
+3. Base de datos, con misses coalescidos (single-flight) para que requests
+   concurrentes por el mismo ID hagan una sola query
+
+get_async()/put_async() son los mismos niveles para las vistas nativas del
+modo ASGI (redis.asyncio y el engine async).
+"""
+import json
+import logging
+import time
+from datetime import datetime
+from typing import List, NamedTuple, Optional
+
+from flask import current_app, g, has_request_context
+
+from services.cache import AsyncSingleFlight, LRUCache, SingleFlight
+from services.db_routing import primary
+from services.db_types import is_guid
+from services.metrics import metrics
+from services.redis_client import get_async_redis_client, get_redis_client
+
+logger = logging.getLogger(__name__)
+
+
+class OperationSnapshot(NamedTuple):
+    """
+    Immutable, session-independent copy of an Operation row.
+    Tambien es la fila de los listados: campos en el orden de
+    Operation.SERIALIZED_COLUMNS, cargados con fetch_all() sin pasar por el ORM.
+    """
+    operation_id: str
+    type: str
+    amount: float
+    carbon_score: float
+    user_email: Optional[str]
+    created_at: datetime
+
+    @classmethod
+    def from_model(cls, operation):
+        return cls(
+            operation.operation_id,
+            operation.type,
+            operation.amount,
+            operation.carbon_score,
+            operation.user_email,
+            operation.created_at
+        )
+
+    @classmethod
+    def fetch_all(cls, stmt) -> List['OperationSnapshot']:
+        """Run a column select (Operation.serialized_select()) without hydrating ORM instances"""
+        from app import db
+        return [cls._make(row) for row in db.session.execute(stmt).all()]
+
+    @classmethod
+    def from_dict(cls, data: dict):
+        return cls(
+            data['operation_id'],
+            data['type'],
+            data['amount'],
+            data['carbon_score'],
+            data['user_email'],
+            datetime.fromisoformat(data['created_at'])
+        )
+
+    def to_dict(self):
+        return {
+            'operation_id': self.operation_id,
+            'type': self.type,
+            'amount': self.amount,
+            'carbon_score': self.carbon_score,
+            'user_email': self.user_email,
+            'created_at': self.created_at.isoformat()
+        }
+
+
+class _CacheState:
+    def __init__(self, maxsize, redis_url, ttl):
+        self.local = LRUCache(maxsize)
+        self.flight = SingleFlight()
+        self.async_flight = AsyncSingleFlight()
+        self.redis_url = redis_url
+        self.ttl = ttl
+
+
+class OperationCache:
+    """Read-through cache for operations, initialised per app (patron factory)"""
+
+    REDIS_KEY_PREFIX = 'operation:'
+
+    def init_app(self, app):
+        app.extensions['operation_cache'] = _CacheState(
+            app.config.get('OPERATION_CACHE_SIZE', 2048),
+            app.config.get('OPERATION_CACHE_REDIS_URL'),
+            app.config.get('OPERATION_CACHE_TTL', 86400)
+        )
+
+    @property
+    def _state(self) -> _CacheState:
+        return current_app.extensions['operation_cache']
+
+    def get(self, operation_id: str) -> Optional[OperationSnapshot]:
+        """Return the operation snapshot for `operation_id`, or None if it doesn't exist"""
+        if not is_guid(operation_id):
+            # No es un UUID: no puede existir (y la columna GUID no lo aceptaria)
+            return None
+        state = self._state
+        start = time.perf_counter()
+        try:
+            snapshot = state.local.get(operation_id)
+            if snapshot is not None:
+                metrics.increment('operation_cache.hits.local')
+                return snapshot
+
+            snapshot = self._get_remote(state, operation_id)
+            if snapshot is not None:
+                metrics.increment('operation_cache.hits.redis')
+                state.local.set(operation_id, snapshot)
+                return snapshot
+
+            metrics.increment('operation_cache.misses')
+            return state.flight.do(operation_id, lambda: self._load(state, operation_id))
+        finally:
+            metrics.observe('operation_cache.lookup', time.perf_counter() - start)
+
+    def put(self, operation):
+        """Prime the cache with a freshly created operation"""
+        state = self._state
+        snapshot = OperationSnapshot.from_model(operation)
+        state.local.set(snapshot.operation_id, snapshot)
+        self._set_remote(state, snapshot)
+        return snapshot
+
+    async def get_async(self, operation_id: str) -> Optional[OperationSnapshot]:
+        """get() for async views"""
+        if not is_guid(operation_id):
+            return None
+        state = self._state
+        start = time.perf_counter()
+        try:
+            snapshot = state.local.get(operation_id)
+            if snapshot is not None:
+                metrics.increment('operation_cache.hits.local')
+                return snapshot
+
+            snapshot = await self._get_remote_async(state, operation_id)
+            if snapshot is not None:
+                metrics.increment('operation_cache.hits.redis')
+                state.local.set(operation_id, snapshot)
+                return snapshot
+
+            metrics.increment('operation_cache.misses')
+            return await state.async_flight.do(operation_id, lambda: self._load_async(state, operation_id))
+        finally:
+            metrics.observe('operation_cache.lookup', time.perf_counter() - start)
+
+    async def put_async(self, operation):
+        """put() for async views"""
+        state = self._state
+        snapshot = OperationSnapshot.from_model(operation)
+        state.local.set(snapshot.operation_id, snapshot)
+        await self._set_remote_async(state, snapshot)
+        return snapshot
+
+    def prime(self, snapshots) -> int:
+        """Load snapshots into the local LRU only (warmup); returns how many"""
+        state = self._state
+        count = 0
+        for snapshot in snapshots:
+            state.local.set(snapshot.operation_id, snapshot)
+            count += 1
+        return count
+
+    def stats(self):
+        counters = metrics.snapshot()['counters']
+        hits = counters.get('operation_cache.hits.local', 0) + counters.get('operation_cache.hits.redis', 0)
+        misses = counters.get('operation_cache.misses', 0)
+        total = hits + misses
+        return {
+            'size': len(self._state.local),
+            'hits': hits,
+            'misses': misses,
+            'hit_rate': round(hits / total, 4) if total else 0.0,
+        }
+
+    def _load(self, state, operation_id):
+        from models import Operation
+
+        with metrics.timer('operation_cache.db_load'):
+            operation = Operation.query.filter_by(operation_id=operation_id).first()
+            if operation is None and has_request_context() and g.get('db_read_only'):
+                # Puede no haber llegado a la replica todavia
+                with primary():
+                    operation = Operation.query.filter_by(operation_id=operation_id).first()
+        if operation is None:
+            # Misses are not cached: the ID may be created later
+            return None
+        snapshot = OperationSnapshot.from_model(operation)
+        state.local.set(operation_id, snapshot)
+        self._set_remote(state, snapshot)
+        return snapshot
+
+    def _get_remote(self, state, operation_id):
+        if not state.redis_url:
+            return None
+        try:
+            raw = get_redis_client(state.redis_url).get(self.REDIS_KEY_PREFIX + operation_id)
+        except Exception as e:
+            logger.warning(f"Operation cache Redis read failed: {e}")
+            return None
+        return OperationSnapshot.from_dict(json.loads(raw)) if raw else None
+
+    def _set_remote(self, state, snapshot):
+        if not state.redis_url:
+            return
+        try:
+            get_redis_client(state.redis_url).set(
+                self.REDIS_KEY_PREFIX + snapshot.operation_id,
+                json.dumps(snapshot.to_dict()),
+                ex=state.ttl
+            )
+        except Exception as e:
+            logger.warning(f"Operation cache Redis write failed: {e}")
+
+    async def _load_async(self, state, operation_id):
+        from models import Operation
+        from services.async_io import async_session
+
+        with metrics.timer('operation_cache.db_load'):
+            async with async_session() as session:
+                stmt = Operation.serialized_select().where(Operation.operation_id == operation_id)
+                row = (await session.execute(stmt)).first()
+        if row is None:
+            return None
+        snapshot = OperationSnapshot._make(row)
+        state.local.set(operation_id, snapshot)
+        await self._set_remote_async(state, snapshot)
+        return snapshot
+
+    async def _get_remote_async(self, state, operation_id):
+        if not state.redis_url:
+            return None
+        try:
+            raw = await get_async_redis_client(state.redis_url).get(self.REDIS_KEY_PREFIX + operation_id)
+        except Exception as e:
+            logger.warning(f"Operation cache Redis read failed: {e}")
+            return None
+        return OperationSnapshot.from_dict(json.loads(raw)) if raw else None
+
+    async def _set_remote_async(self, state, snapshot):
+        if not state.redis_url:
+            return
+        try:
+            await get_async_redis_client(state.redis_url).set(
+                self.REDIS_KEY_PREFIX + snapshot.operation_id,
+                json.dumps(snapshot.to_dict()),
+                ex=state.ttl
+            )
+        except Exception as e:
+            logger.warning(f"Operation cache Redis write failed: {e}")
+
+
+operation_cache = OperationCache()
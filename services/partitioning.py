@@ -0,0 +1,259 @@
+"""
+Particionado mensual y archivado de la tabla operations.
+
+Postgres: `operations` es una tabla particionada por RANGE(created_at) con una
+particion por mes (operations_pYYYY_MM) mas una particion DEFAULT (ver la
+migracion b7c8d9e0f1a2). ensure_partitions() crea las particiones de los
+proximos meses para que los inserts nunca caigan en DEFAULT.
+
+SQLite (modo local): no hay particiones; la tabla es unica con indice sobre
+created_at y el archivado borra las filas exportadas con un DELETE por rango.
+
+Archivado: los meses anteriores al corte se exportan a ARCHIVE_DIR como
+NDJSON comprimido con gzip (operations_YYYY_MM.ndjson.gz) o, si pyarrow esta
+instalado, Parquet (operations_YYYY_MM.parquet). Despues de escribir el
+archivo se borran de la base exactamente las operaciones que contiene (se
+releen del archivo): una fila que llega al mes mientras se exporta (ingesta
+encolada, generador) queda en la base y va a otra parte del mes
+(operations_YYYY_MM_2.ndjson.gz) en la corrida siguiente. Si el proceso muere
+entre el archivo y el borrado, la corrida siguiente relee las partes que ya
+existen (verifica que se leen completas) y termina el borrado. La particion
+de Postgres se elimina (DETACH + DROP) solo cuando queda vacia.
+iter_archived_operations() permite al export seguir leyendolos.
+"""
+import glob
+import gzip
+import json
+import logging
+import os
+from datetime import date, datetime
+from typing import Iterator, List
+
+from sqlalchemy import func, select, text
+
+from app import db
+from models import Operation
+from services.response_cache import bump_operations_generation
+
+try:
+    import pyarrow
+    import pyarrow.parquet as pq
+except ImportError:  # Parquet es opcional
+    pyarrow = None
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_CHUNK_SIZE = 50000
+# Mismas claves que la API (Operation.to_dict)
+EXPORT_COLUMNS = Operation.SERIALIZED_COLUMNS
+
+
+def month_start(value) -> date:
+    return date(value.year, value.month, 1)
+
+
+def add_months(value: date, months: int) -> date:
+    index = value.year * 12 + value.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month: date) -> str:
+    return f"operations_p{month.year:04d}_{month.month:02d}"
+
+
+def is_partitioned() -> bool:
+    if db.engine.dialect.name != 'postgresql':
+        return False
+    return bool(db.session.execute(text(
+        "SELECT 1 FROM pg_partitioned_table p JOIN pg_class c ON c.oid = p.partrelid "
+        "WHERE c.relname = 'operations'"
+    )).scalar())
+
+
+def ensure_partitions(months_ahead: int = 3, start: date = None) -> List[str]:
+    """Create monthly partitions from `start` (default: current month) up to `months_ahead` months ahead"""
+    if not is_partitioned():
+        return []
+
+    first = month_start(start or datetime.utcnow())
+    created = []
+    for offset in range(months_ahead + 1):
+        month = add_months(first, offset)
+        name = partition_name(month)
+        exists = db.session.execute(text("SELECT to_regclass(:name)"), {'name': name}).scalar()
+        if exists:
+            continue
+        db.session.execute(text(
+            f"CREATE TABLE {name} PARTITION OF operations "
+            f"FOR VALUES FROM ('{month.isoformat()}') TO ('{add_months(month, 1).isoformat()}')"
+        ))
+        created.append(name)
+    db.session.commit()
+    return created
+
+
+def _serialize(row) -> dict:
+    data = dict(zip(EXPORT_COLUMNS, row))
+    data['created_at'] = data['created_at'].isoformat()
+    return data
+
+
+def _month_rows(month: date):
+    columns = [getattr(Operation, name) for name in EXPORT_COLUMNS]
+    stmt = (
+        select(*columns)
+        .where(Operation.created_at >= month, Operation.created_at < add_months(month, 1))
+        .order_by(Operation.created_at)
+        .execution_options(yield_per=ARCHIVE_CHUNK_SIZE)
+    )
+    return db.session.execute(stmt)
+
+
+def _write_ndjson(month: date, path: str) -> int:
+    count = 0
+    with gzip.open(path, 'wt', encoding='utf-8') as f:
+        for row in _month_rows(month):
+            f.write(json.dumps(_serialize(row)))
+            f.write('\n')
+            count += 1
+    return count
+
+
+def _write_parquet(month: date, path: str) -> int:
+    schema = pyarrow.schema([
+        ('operation_id', pyarrow.string()),
+        ('type', pyarrow.string()),
+        ('amount', pyarrow.float64()),
+        ('carbon_score', pyarrow.float64()),
+        ('user_email', pyarrow.string()),
+        ('created_at', pyarrow.timestamp('us')),
+    ])
+    count = 0
+    with pq.ParquetWriter(path, schema, compression='zstd') as writer:
+        for chunk in _month_rows(month).partitions():
+            columns = list(zip(*chunk))
+            writer.write_table(pyarrow.Table.from_arrays(
+                [pyarrow.array(values, type=field.type) for values, field in zip(columns, schema)],
+                schema=schema
+            ))
+            count += len(chunk)
+    return count
+
+
+def _archived_ids(path: str) -> Iterator[str]:
+    """operation_id of every row in an archive file; reading it to the end also verifies it"""
+    if path.endswith('.parquet'):
+        if pyarrow is None:
+            raise RuntimeError(f"Archive {path} is Parquet and pyarrow is not installed")
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=ARCHIVE_CHUNK_SIZE, columns=['operation_id']):
+            yield from batch.column(0).to_pylist()
+    else:
+        with gzip.open(path, 'rt', encoding='utf-8') as f:
+            for line in f:
+                yield json.loads(line)['operation_id']
+
+
+def _delete_archived(path: str) -> int:
+    """Delete the operations stored in `path` (and nothing else) in one transaction"""
+    table = Operation.__table__
+    deleted = 0
+    chunk = []
+    try:
+        for operation_id in _archived_ids(path):
+            chunk.append(operation_id)
+            if len(chunk) == ARCHIVE_CHUNK_SIZE:
+                deleted += db.session.execute(table.delete().where(table.c.operation_id.in_(chunk))).rowcount
+                chunk = []
+        if chunk:
+            deleted += db.session.execute(table.delete().where(table.c.operation_id.in_(chunk))).rowcount
+    except (OSError, EOFError, ValueError, KeyError) as e:
+        db.session.rollback()
+        raise RuntimeError(f"Archive {path} is unreadable ({e}); not deleting its month") from e
+    db.session.commit()
+    return deleted
+
+
+def _drop_partition_if_empty(month: date):
+    name = partition_name(month)
+    if not is_partitioned() or not db.session.execute(text("SELECT to_regclass(:name)"), {'name': name}).scalar():
+        return
+    if db.session.execute(text(f"SELECT EXISTS (SELECT 1 FROM {name})")).scalar():
+        return  # filas que llegaron despues del export: quedan para la proxima corrida
+    db.session.execute(text(f"ALTER TABLE operations DETACH PARTITION {name}"))
+    db.session.execute(text(f"DROP TABLE {name}"))
+    db.session.commit()
+
+
+def _month_archives(archive_dir: str, month: date) -> List[str]:
+    prefix = os.path.join(archive_dir, f"operations_{month.year:04d}_{month.month:02d}")
+    return sorted(glob.glob(prefix + '.ndjson.gz') + glob.glob(prefix + '.parquet')
+                  + glob.glob(prefix + '_*.ndjson.gz') + glob.glob(prefix + '_*.parquet'))
+
+
+def _next_archive_path(archive_dir: str, month: date, extension: str) -> str:
+    name = f"operations_{month.year:04d}_{month.month:02d}"
+    existing = _month_archives(archive_dir, month)
+    part = f"_{len(existing) + 1}" if existing else ''
+    return os.path.join(archive_dir, f"{name}{part}.{extension}")
+
+
+def archive_operations(before: date, archive_dir: str, fmt: str = 'ndjson') -> List[dict]:
+    """
+    Export every month strictly before `before` to `archive_dir` and remove it from the database.
+    Returns one summary dict per archived month.
+    """
+    if fmt == 'parquet' and pyarrow is None:
+        raise RuntimeError("Parquet archival requires pyarrow to be installed")
+
+    oldest = db.session.execute(select(func.min(Operation.created_at))).scalar()
+    if oldest is None:
+        return []
+
+    os.makedirs(archive_dir, exist_ok=True)
+    cutoff = month_start(before)
+    month = month_start(oldest)
+    archived = []
+    extension = 'parquet' if fmt == 'parquet' else 'ndjson.gz'
+    writer = _write_parquet if fmt == 'parquet' else _write_ndjson
+    while month < cutoff:
+        # Corrida anterior interrumpida entre el archivo y el borrado: terminarla
+        for path in _month_archives(archive_dir, month):
+            resumed = _delete_archived(path)
+            if resumed:
+                archived.append({'month': month.isoformat()[:7], 'rows': resumed, 'path': path})
+                logger.info(f"Removed {resumed} operations already archived in {path}")
+
+        path = _next_archive_path(archive_dir, month, extension)
+        tmp_path = path + '.tmp'
+        count = writer(month, tmp_path)
+        if count:
+            os.replace(tmp_path, path)
+            deleted = _delete_archived(path)
+            archived.append({'month': month.isoformat()[:7], 'rows': count, 'path': path})
+            logger.info(f"Archived {count} operations for {month.isoformat()[:7]} to {path} ({deleted} removed)")
+        else:
+            os.remove(tmp_path)
+        _drop_partition_if_empty(month)
+        month = add_months(month, 1)
+    if archived:
+        bump_operations_generation()
+    return archived
+
+
+def iter_archived_operations(archive_dir: str) -> Iterator[dict]:
+    """Yield archived operations (oldest month first) in the same shape as Operation.to_dict()"""
+    paths = glob.glob(os.path.join(archive_dir, 'operations_*.ndjson.gz'))
+    paths += glob.glob(os.path.join(archive_dir, 'operations_*.parquet'))
+    for path in sorted(paths):
+        if path.endswith('.parquet'):
+            if pyarrow is None:
+                logger.warning(f"Skipping {path}: pyarrow is not installed")
+                continue
+            for batch in pq.ParquetFile(path).iter_batches(batch_size=ARCHIVE_CHUNK_SIZE):
+                for row in batch.to_pylist():
+                    row['created_at'] = row['created_at'].isoformat()
+                    yield row
+        else:
+            with gzip.open(path, 'rt', encoding='utf-8') as f:
+                for line in f:
+                    yield json.loads(line)
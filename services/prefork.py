@@ -0,0 +1,166 @@
+"""
+Preload de la app en el master de uWSGI y warmup antes de aceptar trafico.
+
+Con lazy-apps cada worker importa y construye la app por su cuenta: no se
+comparte memoria y el primer request de cada worker paga templates, imports,
+conexiones y caches frios. En modo preload (PRELOAD_APP=True con
+lazy-apps = false en uwsgi.ini):
+
+1. El master construye la app y corre el warmup compartido: compila los
+   templates Jinja, importa los modulos que las vistas cargan de forma lazy,
+   carga las WARMUP_OPERATIONS operaciones mas recientes en el cache de
+   operaciones, renderiza un recibo de prueba (fuentes de reportlab) y hace
+   unos requests internos (test client, token de un minuto) al login del
+   backoffice, al feed de cambios y al recibo de un id inexistente (miss del
+   cache: compila la query de busqueda). Asi quedan inicializados el routing,
+   JWT y el cache de compilacion de SQLAlchemy. Despues cierra sus conexiones y congela el heap (gc.freeze) para que el
+   GC no toque esas paginas y los workers las compartan (copy-on-write).
+2. Cada worker, despues del fork y antes de aceptar requests, descarta los
+   pools heredados (engine.dispose(close=False) y clientes Redis, sin cerrar
+   los sockets del master) y abre sus propias conexiones.
+
+Sin preload (lazy-apps = true) el worker hace todo el warmup al cargar la app.
+"""
+import gc
+import logging
+import os
+import time
+from datetime import datetime, timedelta
+
+from services.metrics import metrics
+from services.profiler import ensure_profile_watcher, stop_profile_watcher
+
+logger = logging.getLogger(__name__)
+
+WARMUP_OPERATION_ID = '00000000-0000-4000-8000-000000000000'  # no existe: el recibo da 404
+
+LAZY_MODULES = (
+    'services.change_feed',
+    'services.partitioning',
+    'services.profiler',
+)
+
+
+def prepare_app(app):
+    """Warm `app` up and, in preload mode, arrange for the workers to reset inherited connections"""
+    preload = app.config['PRELOAD_APP']
+    if app.config['WARMUP_ENABLED']:
+        start = time.perf_counter()
+        warm_shared_state(app)
+        metrics.reset()  # los requests del warmup no cuentan como trafico
+        logger.info("Warmup done in %.0f ms", (time.perf_counter() - start) * 1000)
+
+    if not preload:
+        if app.config['WARMUP_ENABLED']:
+            warm_connections(app)
+        ensure_profile_watcher(app)
+        return
+
+    # El master no atiende requests: cierra lo que abrio el warmup antes del fork
+    stop_profile_watcher(app)
+    for engine in _engines(app):
+        engine.dispose()
+    from services.redis_client import reset_redis_clients
+    reset_redis_clients()
+    gc.freeze()
+    _register_postfork(lambda: after_fork(app))
+    logger.info("App preloaded in master pid %s (%s objects frozen)", os.getpid(), gc.get_freeze_count())
+
+
+def after_fork(app):
+    """Drop pools inherited from the master and open this worker's own connections"""
+    from services.redis_client import reset_redis_clients
+    for engine in _engines(app):
+        engine.dispose(close=False)  # los sockets heredados siguen siendo del master
+    reset_redis_clients(disconnect=False)
+    metrics.reset()
+    if app.config['WARMUP_ENABLED']:
+        warm_connections(app)
+    # Cada worker se puede perfilar por PID aunque nunca haya atendido un request
+    ensure_profile_watcher(app)
+    logger.debug("Worker %s reset inherited connections", os.getpid())
+
+
+def warm_shared_state(app):
+    """Per-app warmup that is worth sharing between workers: templates, imports, caches"""
+    import importlib
+    for name in LAZY_MODULES:
+        importlib.import_module(name)
+
+    for name in app.jinja_env.list_templates():
+        app.jinja_env.get_template(name)
+
+    from flask_jwt_extended import create_access_token
+    from models import Operation
+    from services.operation_cache import OperationSnapshot, operation_cache
+    from services.receipt_renderer import render_operation_receipt
+
+    render_operation_receipt(OperationSnapshot(WARMUP_OPERATION_ID, 'electricity', 1.0, 0.5, None, datetime(2026, 1, 1)))
+
+    with app.app_context():
+        limit = app.config['WARMUP_OPERATIONS']
+        if limit:
+            try:
+                stmt = Operation.serialized_select().order_by(Operation.created_at.desc()).limit(limit)
+                primed = operation_cache.prime(OperationSnapshot.fetch_all(stmt))
+                logger.info("Warmup primed %d operations", primed)
+            except Exception as e:
+                # Base sin migrar o inaccesible: el worker arranca igual, con cache frio
+                logger.warning(f"Warmup could not prime the operation cache: {e}")
+        token = create_access_token(identity='warmup@localhost', additional_claims={'is_internal': True},
+                                    expires_delta=timedelta(minutes=1))
+
+    client = app.test_client()
+    for path in ('/bo/login', '/api/operations/changes?limit=1', f"/operations/{WARMUP_OPERATION_ID}/receipt/"):
+        response = client.get(path, headers={'Authorization': f'Bearer {token}'})
+        if response.status_code >= 500:
+            logger.warning(f"Warmup request {path} returned {response.status_code}")
+
+
+def warm_connections(app):
+    """Fill each engine's pool (one connection per thread) and connect the configured Redis clients"""
+    from sqlalchemy import text
+    from sqlalchemy.pool import QueuePool
+    from services.redis_client import get_redis_client
+
+    with metrics.timer('warmup.connections'):
+        for engine in _engines(app):
+            size = engine.pool.size() if isinstance(engine.pool, QueuePool) else 1
+            connections = []
+            try:
+                for _ in range(size):
+                    connection = engine.connect()
+                    connection.execute(text('SELECT 1'))
+                    connections.append(connection)
+            except Exception as e:
+                logger.warning(f"Warmup could not open database connections: {e}")
+            finally:
+                for connection in connections:
+                    connection.close()  # vuelve al pool, abierta
+
+        for key in ('OPERATION_CACHE_REDIS_URL', 'RESPONSE_CACHE_REDIS_URL', 'RATE_LIMIT_REDIS_URL',
+                    'DB_ROUTING_REDIS_URL', 'INGEST_REDIS_URL'):
+            url = app.config.get(key)
+            if not url:
+                continue
+            try:
+                get_redis_client(url).ping()
+            except Exception as e:
+                logger.warning(f"Warmup could not reach Redis for {key}: {e}")
+
+
+def _engines(app):
+    from app import db
+    from services.db_routing import replica_engine
+    with app.app_context():
+        engines = list(db.engines.values())
+    replica = replica_engine(app)
+    return engines + ([replica] if replica is not None else [])
+
+
+def _register_postfork(callback):
+    try:
+        from uwsgidecorators import postfork  # solo existe dentro de uWSGI
+        postfork(callback)
+    except ImportError:
+        os.register_at_fork(after_in_child=callback)
@@ -0,0 +1,324 @@
+"""
+Profiling bajo demanda de un worker en produccion (desactivado por defecto).
+
+Con PROFILER_ENABLED=True:
+- Sampling profiler por PID: POST /api/debug/profile?pid=P&seconds=N (JWT
+  interno) deja un pedido en PROFILER_DIR (bajo instance/, compartido por los
+  workers del host) y responde 202. Cada worker tiene un thread que revisa su
+  pedido cada POLL_SECONDS; el worker P muestrea en ese thread (no ocupa un
+  thread de requests, y funciona aunque los de requests esten todos
+  trabados) y escribe el resultado en PROFILER_DIR, que se descarga con
+  GET /api/debug/profile/<id>: stacks colapsados (flamegraph.pl, speedscope)
+  o archivo speedscope (format=speedscope). GET /api/debug/profile lista los
+  PIDs vivos. El muestreo lee los stacks de todos los threads cada
+  PROFILER_INTERVAL_MS (sys._current_frames, sin tracing: el resto del
+  worker corre a velocidad normal).
+- Header X-Profile: 1 de un usuario interno: el request corre bajo cProfile y
+  la respuesta se reemplaza por el reporte de pstats (las PROFILER_TOP
+  funciones con mas tiempo acumulado); el status original va en
+  X-Profiled-Status.
+
+Desactivado no se registra ningun hook ni thread y los endpoints responden 404.
+"""
+import cProfile
+import io
+import json
+import logging
+import os
+import pstats
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+from flask import g, request
+
+from services.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+SPEEDSCOPE_SCHEMA = 'https://www.speedscope.app/file-format-schema.json'
+
+Frame = Tuple[str, str, int]  # (archivo, funcion, primera linea)
+
+POLL_SECONDS = 0.5
+WATCHER_STALE_SECONDS = 5  # sin heartbeat en este tiempo el PID no se considera vivo
+RESULT_TTL_SECONDS = 24 * 3600
+RESULT_FILES = {'collapsed': 'collapsed.txt', 'speedscope': 'speedscope.json'}
+PROFILE_ID = re.compile(r'^(\d+)-\d+$')  # <pid>-<ms>
+
+_sampling = threading.Lock()
+
+
+class ProfilerBusy(Exception):
+    """Another sampling run is already active in this process"""
+
+
+class SamplingProfiler:
+    """Periodically snapshots the stacks of every other thread"""
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self.duration = 0.0
+
+    def run(self, seconds: float) -> 'SamplingProfiler':
+        if not _sampling.acquire(blocking=False):
+            raise ProfilerBusy()
+        try:
+            own = threading.get_ident()
+            start = time.perf_counter()
+            deadline = start + seconds
+            while time.perf_counter() < deadline:
+                names = {thread.ident: thread.name for thread in threading.enumerate()}
+                for ident, frame in sys._current_frames().items():
+                    if ident != own:
+                        self.stacks[(names.get(ident, str(ident)), _walk(frame))] += 1
+                self.samples += 1
+                time.sleep(self.interval)
+            self.duration = time.perf_counter() - start
+        finally:
+            _sampling.release()
+        metrics.increment('profiler.samples', self.samples)
+        return self
+
+    def collapsed(self) -> str:
+        """One 'thread;frame;frame count' line per distinct stack (root first)"""
+        lines = []
+        for (thread, stack), count in self.stacks.most_common():
+            names = [thread] + [f"{function} ({filename}:{line})" for filename, function, line in stack]
+            lines.append(f"{';'.join(name.replace(';', ':') for name in names)} {count}")
+        return '\n'.join(lines) + '\n'
+
+    def speedscope(self, name: str) -> dict:
+        """speedscope 'sampled' profile, one per thread"""
+        frames: Dict[Frame, int] = {}
+        profiles: Dict[str, dict] = {}
+        for (thread, stack), count in self.stacks.items():
+            indexes = [frames.setdefault(frame, len(frames)) for frame in stack]
+            profile = profiles.setdefault(thread, {
+                'type': 'sampled', 'name': f"{name} [{thread}]", 'unit': 'seconds',
+                'startValue': 0, 'endValue': round(self.duration, 6), 'samples': [], 'weights': [],
+            })
+            profile['samples'].append(indexes)
+            profile['weights'].append(round(count * self.interval, 6))
+        return {
+            '$schema': SPEEDSCOPE_SCHEMA,
+            'name': name,
+            'exporter': 'carbon_console',
+            'shared': {'frames': [
+                {'name': function, 'file': filename, 'line': line} for filename, function, line in frames
+            ]},
+            'profiles': list(profiles.values()),
+        }
+
+
+class ProfileRequests:
+    """Per-PID profiling: request files in PROFILER_DIR served by a watcher thread in each worker"""
+
+    def __init__(self, app):
+        self.directory = os.path.join(app.instance_path, app.config['PROFILER_DIR'])
+        self.workers_directory = os.path.join(self.directory, 'workers')
+        self.interval = app.config['PROFILER_INTERVAL_MS'] / 1000.0
+        self._lock = threading.Lock()
+        self._pid = None
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.directory, name)
+
+    def ensure_started(self):
+        # Despues de un fork (preload de uWSGI) el thread del master no existe en el worker
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            os.makedirs(self.workers_directory, exist_ok=True)
+            self._pid = os.getpid()
+            threading.Thread(target=self._run, name='profile-watcher', daemon=True).start()
+
+    def stop(self):
+        self._pid = None
+
+    def _run(self):
+        pid = os.getpid()
+        heartbeat = os.path.join(self.workers_directory, str(pid))
+        while self._pid == pid:
+            try:
+                _write(heartbeat, str(time.time()))
+                self._serve(pid)
+            except Exception as e:
+                logger.error(f"Profile watcher failed: {e}")
+            time.sleep(POLL_SECONDS)
+
+    def _serve(self, pid: int):
+        request_path = self._path(f"{pid}.request")
+        try:
+            with open(request_path) as f:
+                job = json.load(f)
+            profile_id = job['id']
+        except FileNotFoundError:
+            return
+        except (ValueError, KeyError, TypeError) as e:
+            # Sin id no hay donde dejar el error: descartarlo para no fallar en cada poll
+            logger.error(f"Discarding malformed profile request {request_path}: {e}")
+            os.remove(request_path)
+            return
+        running = self._path(f"{profile_id}.running")
+        _write(running, str(time.time()))
+        os.remove(request_path)
+        try:
+            logger.info(f"Sampling worker {pid} for {job['seconds']}s (profile {profile_id})")
+            profiler = SamplingProfiler(self.interval).run(float(job['seconds']))
+            _write(self._path(f"{profile_id}.{RESULT_FILES['collapsed']}"), profiler.collapsed())
+            _write(self._path(f"{profile_id}.{RESULT_FILES['speedscope']}"),
+                   json.dumps(profiler.speedscope(f"worker-{profile_id}")))
+        except ProfilerBusy:
+            self._fail(profile_id, 'A profile is already running in this worker')
+        except Exception as e:
+            logger.error(f"Profile {profile_id} failed: {e}")
+            self._fail(profile_id, f"Profile failed: {e}")
+        finally:
+            os.remove(running)
+        self._prune()
+
+    def _fail(self, profile_id: str, message: str):
+        """Leave an error file for GET /api/debug/profile/<id> (and no partial results)"""
+        for output in RESULT_FILES.values():
+            try:
+                os.remove(self._path(f"{profile_id}.{output}"))
+            except FileNotFoundError:
+                pass
+        try:
+            _write(self._path(f"{profile_id}.error"), message)
+        except OSError as e:
+            logger.error(f"Could not record the failure of profile {profile_id}: {e}")
+
+    def _prune(self):
+        cutoff = time.time() - RESULT_TTL_SECONDS
+        for name in os.listdir(self.directory):
+            path = self._path(name)
+            if os.path.isfile(path) and os.path.getmtime(path) < cutoff:
+                os.remove(path)
+
+    def workers(self) -> List[dict]:
+        """PIDs with a live watcher on this host, most recently seen first"""
+        now = time.time()
+        alive = []
+        for name in os.listdir(self.workers_directory) if os.path.isdir(self.workers_directory) else ():
+            age = now - os.path.getmtime(os.path.join(self.workers_directory, name))
+            if age <= WATCHER_STALE_SECONDS:
+                alive.append({'pid': int(name), 'last_seen_s': round(age, 2)})
+            elif age > RESULT_TTL_SECONDS:
+                os.remove(os.path.join(self.workers_directory, name))
+        return sorted(alive, key=lambda worker: worker['last_seen_s'])
+
+    def submit(self, pid: int, seconds: float) -> Optional[str]:
+        """Queue a sampling run for `pid`; returns the profile id, or None if one is already pending"""
+        request_path = self._path(f"{pid}.request")
+        if os.path.exists(request_path):
+            return None
+        profile_id = f"{pid}-{int(time.time() * 1000)}"
+        _write(request_path, json.dumps({'id': profile_id, 'seconds': seconds}))
+        return profile_id
+
+    def result(self, profile_id: str, output: str) -> Tuple[str, Optional[str]]:
+        """('done', path), ('pending', None), ('failed', message) or ('unknown', None)"""
+        match = PROFILE_ID.match(profile_id)
+        if match is None:
+            return 'unknown', None
+        path = self._path(f"{profile_id}.{RESULT_FILES[output]}")
+        if os.path.exists(path):
+            return 'done', path
+        if os.path.exists(self._path(f"{profile_id}.error")):
+            with open(self._path(f"{profile_id}.error")) as f:
+                return 'failed', f.read()
+        if os.path.exists(self._path(f"{profile_id}.running")):
+            return 'pending', None
+        try:
+            with open(self._path(f"{match.group(1)}.request")) as f:
+                if json.load(f)['id'] == profile_id:
+                    return 'pending', None
+        except (FileNotFoundError, ValueError):
+            pass
+        return 'unknown', None
+
+
+def _write(path: str, data: str):
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+def _walk(frame) -> Tuple[Frame, ...]:
+    stack = []
+    while frame is not None:
+        code = frame.f_code
+        stack.append((code.co_filename, code.co_name, code.co_firstlineno))
+        frame = frame.f_back
+    return tuple(reversed(stack))
+
+
+def init_profiler(app):
+    """Register the profile watcher and the X-Profile per-request hooks (only when PROFILER_ENABLED)"""
+    if not app.config['PROFILER_ENABLED']:
+        return
+    top = app.config['PROFILER_TOP']
+    requests = app.extensions['profiler'] = ProfileRequests(app)
+
+    @app.before_request
+    def start_profile_watcher():
+        requests.ensure_started()
+
+    @app.before_request
+    def start_request_profile():
+        if request.headers.get('X-Profile') != '1' or not _is_internal():
+            return
+        g.request_profile = cProfile.Profile()
+        g.request_profile.enable()
+
+    @app.after_request
+    def finish_request_profile(response):
+        profile = g.pop('request_profile', None)
+        if profile is None:
+            return response
+        profile.disable()
+        metrics.increment('profiler.requests')
+
+        report = io.StringIO()
+        pstats.Stats(profile, stream=report).sort_stats('cumulative').print_stats(top)
+        profiled = app.response_class(report.getvalue(), mimetype='text/plain')
+        profiled.headers['X-Profiled-Status'] = str(response.status_code)
+        profiled.headers['Cache-Control'] = 'no-store'
+        response.close()
+        logger.info("Profiled request %s %s", request.method, request.path)
+        return profiled
+
+    logger.info("Profiler enabled (X-Profile header and /api/debug/profile)")
+
+
+def ensure_profile_watcher(app):
+    """Start this process's profile watcher, if profiling is enabled (servers that skip before_request)"""
+    requests = app.extensions.get('profiler')
+    if requests is not None:
+        requests.ensure_started()
+
+
+def stop_profile_watcher(app):
+    """Stop this process's profile watcher (the preload master, before forking)"""
+    requests = app.extensions.get('profiler')
+    if requests is not None:
+        requests.stop()
+
+
+def _is_internal() -> bool:
+    from flask_jwt_extended import get_jwt, verify_jwt_in_request
+    try:
+        verify_jwt_in_request(optional=True)
+        return bool(get_jwt().get('is_internal', False))
+    except Exception:
+        return False
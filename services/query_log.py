@@ -0,0 +1,120 @@
+"""
+Instrumentacion de queries SQL por request (opcional, QUERY_LOG_ENABLED).
+
+Con hooks before/after_cursor_execute sobre los engines (primario y replica):
+- Slow-query log: las sentencias que tardan mas de SLOW_QUERY_MS se loguean
+  con el endpoint que las emitio y sus parametros recortados.
+- Conteo por request: cantidad de queries y tiempo total en la base, en las
+  metricas db.queries.<endpoint> / db.query_time.<endpoint>.
+- Detector de N+1: si la misma sentencia (mismo SQL, distintos parametros) se
+  repite QUERY_N_PLUS_ONE_THRESHOLD veces en un request, se loguea un warning
+  una vez por sentencia y se cuenta en db.n_plus_one.
+- En modo debug (o con QUERY_LOG_HEADERS) la respuesta lleva X-Query-Count y
+  X-Query-Time-Ms.
+
+Desactivado no registra ningun listener: costo cero.
+"""
+import logging
+import time
+from collections import Counter
+
+from flask import g, has_request_context, request
+from sqlalchemy import event
+
+from services.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+_START_ATTR = '_query_log_start'  # en el ExecutionContext: muere con la sentencia, aunque falle
+PARAMS_PREVIEW = 200
+
+
+class _RequestQueries:
+    __slots__ = ('count', 'total', 'statements', 'flagged')
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.statements = Counter()
+        self.flagged = set()
+
+
+def _endpoint() -> str:
+    return (request.endpoint or request.path) if has_request_context() else '-'
+
+
+def _current() -> _RequestQueries:
+    queries = g.get('query_log')
+    if queries is None:
+        queries = g.query_log = _RequestQueries()
+    return queries
+
+
+def init_query_log(app, engines):
+    """Attach the cursor hooks to `engines` and the per-request hooks to `app` (if enabled)"""
+    if not app.config['QUERY_LOG_ENABLED']:
+        return
+    slow_seconds = app.config['SLOW_QUERY_MS'] / 1000.0
+    n_plus_one = app.config['QUERY_N_PLUS_ONE_THRESHOLD']
+    headers = app.debug or app.config['QUERY_LOG_HEADERS']
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        # No en conn.info: si la sentencia falla after_cursor_execute no corre y la marca
+        # quedaria en la conexion del pool para siempre
+        if context is not None:
+            setattr(context, _START_ATTR, time.perf_counter())
+
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        start = getattr(context, _START_ATTR, None)
+        if start is None:
+            return
+        elapsed = time.perf_counter() - start
+        metrics.observe('db.query', elapsed)
+
+        if elapsed >= slow_seconds:
+            metrics.increment('db.slow_queries')
+            logger.warning("Slow query (%.1f ms) in %s: %s | params=%.*s",
+                           elapsed * 1000, _endpoint(), statement, PARAMS_PREVIEW, repr(parameters))
+
+        if not has_request_context():
+            return
+        queries = _current()
+        queries.count += 1
+        queries.total += elapsed
+        if executemany:
+            return
+        queries.statements[statement] += 1
+        if queries.statements[statement] >= n_plus_one and statement not in queries.flagged:
+            queries.flagged.add(statement)
+            metrics.increment('db.n_plus_one')
+            logger.warning("Possible N+1 in %s: statement repeated %d times: %s",
+                           _endpoint(), queries.statements[statement], statement)
+
+    app.extensions['query_log'] = (before_cursor_execute, after_cursor_execute)
+    for engine in engines:
+        attach_query_log(app, engine)
+
+    @app.after_request
+    def record_request_queries(response):
+        queries = g.get('query_log')
+        if queries is None:
+            return response
+        endpoint = _endpoint()
+        metrics.increment(f'db.queries.{endpoint}', queries.count)
+        metrics.observe(f'db.query_time.{endpoint}', queries.total)
+        if headers:
+            response.headers['X-Query-Count'] = str(queries.count)
+            response.headers['X-Query-Time-Ms'] = f"{queries.total * 1000:.1f}"
+        return response
+
+    logger.info("Query log enabled (slow >= %s ms, N+1 threshold %s)", app.config['SLOW_QUERY_MS'], n_plus_one)
+
+
+def attach_query_log(app, engine):
+    """Attach the cursor hooks to an engine created later (e.g. the async engine); no-op if disabled"""
+    listeners = app.extensions.get('query_log')
+    if listeners is None or engine is None:
+        return
+    before_cursor_execute, after_cursor_execute = listeners
+    event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+    event.listen(engine, 'after_cursor_execute', after_cursor_execute)
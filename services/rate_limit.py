@@ -0,0 +1,195 @@
+"""
+Rate limiting por cliente y control de admision por blueprint.
+
+Un integrador que reintenta en loop puede ocupar todos los threads de uWSGI con
+POST /public/operations/ y dejar sin capacidad a la API interna y al
+backoffice. Antes de cualquier trabajo de BD, cada request de un blueprint
+protegido pasa por:
+
+1. Token bucket por identidad JWT (IP si no hay token, p.ej. login):
+   RATE_LIMIT_RATE tokens/s con rafagas de hasta RATE_LIMIT_BURST. El estado
+   vive en Redis (RATE_LIMIT_REDIS_URL, script Lua atomico, compartido entre
+   workers) o en proceso si no hay Redis o este falla. Sin tokens -> 429.
+2. Tope de requests concurrentes del blueprint por worker
+   (PUBLIC_API_MAX_CONCURRENCY). Sin lugar -> 503. Asi siempre quedan threads
+   libres para el trafico interno.
+
+Ambas respuestas llevan Retry-After.
+
+En el modo ASGI las vistas nativas llaman a admit_async() (token bucket con
+redis.asyncio). El tope de concurrencia existe para no agotar los threads de
+uWSGI; una corutina no ocupa un thread, asi que ahi no se aplica.
+"""
+import logging
+import math
+import threading
+import time
+from typing import Tuple
+
+from flask import current_app, g, jsonify, request
+
+from services.cache import LRUCache
+from services.metrics import metrics
+from services.redis_client import get_async_redis_client, get_redis_client
+
+logger = logging.getLogger(__name__)
+
+# KEYS[1] = bucket; ARGV = rate, burst, now, cost. Devuelve {permitido, segundos hasta tener `cost` tokens}
+TOKEN_BUCKET_LUA = """
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local now = tonumber(ARGV[3])
+local cost = tonumber(ARGV[4])
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or burst
+local ts = tonumber(state[2]) or now
+tokens = math.min(burst, tokens + math.max(0, now - ts) * rate)
+local allowed = 0
+local wait = 0
+if tokens >= cost then
+    tokens = tokens - cost
+    allowed = 1
+else
+    wait = (cost - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now)
+redis.call('PEXPIRE', KEYS[1], math.ceil(burst / rate * 1000) + 1000)
+return {allowed, tostring(wait)}
+"""
+
+
+class LocalTokenBuckets:
+    """In-process token buckets, one per key (bounded LRU)"""
+
+    def __init__(self, maxsize: int = 10000):
+        self._buckets = LRUCache(maxsize)
+        self._lock = threading.Lock()
+
+    def acquire(self, key: str, rate: float, burst: int, now: float = None, cost: int = 1) -> Tuple[bool, float]:
+        """Take `cost` tokens; returns (allowed, seconds until enough tokens)"""
+        now = time.time() if now is None else now
+        with self._lock:
+            tokens, ts = self._buckets.get(key) or (burst, now)
+            tokens = min(burst, tokens + max(0.0, now - ts) * rate)
+            if tokens >= cost:
+                self._buckets.set(key, (tokens - cost, now))
+                return True, 0.0
+            self._buckets.set(key, (tokens, now))
+            return False, (cost - tokens) / rate
+
+
+class RateLimiter:
+    """Token buckets in Redis when configured, in-process otherwise (and as fallback)"""
+
+    KEY_PREFIX = 'rate_limit:'
+
+    def init_app(self, app):
+        app.extensions['rate_limiter'] = {
+            'local': LocalTokenBuckets(app.config['RATE_LIMIT_LOCAL_KEYS']),
+            'redis_url': app.config['RATE_LIMIT_REDIS_URL'],
+            'script': None,
+            'slots': {},  # blueprint -> BoundedSemaphore del tope de concurrencia
+            'lock': threading.Lock(),
+        }
+
+    def acquire(self, key: str, rate: float, burst: int) -> Tuple[bool, float]:
+        state = current_app.extensions['rate_limiter']
+        if state['redis_url']:
+            try:
+                if state['script'] is None:
+                    state['script'] = get_redis_client(state['redis_url']).register_script(TOKEN_BUCKET_LUA)
+                allowed, wait = state['script'](keys=[self.KEY_PREFIX + key], args=[rate, burst, time.time(), 1])
+                return bool(allowed), float(wait)
+            except Exception as e:
+                # Sin Redis cada worker limita por su cuenta: mas permisivo, pero sigue acotado
+                logger.warning(f"Rate limit Redis backend failed, using in-process buckets: {e}")
+                metrics.increment('rate_limit.redis_errors')
+        return state['local'].acquire(key, rate, burst)
+
+    async def acquire_async(self, key: str, rate: float, burst: int) -> Tuple[bool, float]:
+        """acquire() for async views"""
+        state = current_app.extensions['rate_limiter']
+        if state['redis_url']:
+            try:
+                # register_script no hace I/O; el script queda ligado al cliente del event loop
+                script = get_async_redis_client(state['redis_url']).register_script(TOKEN_BUCKET_LUA)
+                allowed, wait = await script(keys=[self.KEY_PREFIX + key], args=[rate, burst, time.time(), 1])
+                return bool(allowed), float(wait)
+            except Exception as e:
+                logger.warning(f"Rate limit Redis backend failed, using in-process buckets: {e}")
+                metrics.increment('rate_limit.redis_errors')
+        return state['local'].acquire(key, rate, burst)
+
+
+rate_limiter = RateLimiter()
+
+
+def _client_key():
+    """JWT identity when the request carries a valid token, client IP otherwise"""
+    from flask_jwt_extended import get_jwt_identity, verify_jwt_in_request
+    try:
+        verify_jwt_in_request(optional=True)
+        identity = get_jwt_identity()
+    except Exception:
+        # Token invalido: lo rechaza la vista; aca solo se cuenta por IP
+        identity = None
+    return f"user:{identity}" if identity else f"ip:{request.remote_addr}"
+
+
+def _retry_after(seconds: float) -> dict:
+    return {'Retry-After': str(max(1, math.ceil(seconds)))}
+
+
+def limit_blueprint(blueprint, max_concurrency_key: str):
+    """
+    Register rate limiting and a per-worker concurrency cap on `blueprint`.
+    `max_concurrency_key` is the config key with the cap (0 = unlimited).
+    """
+    name = blueprint.name
+
+    def _semaphore():
+        state = current_app.extensions['rate_limiter']
+        semaphore = state['slots'].get(name)
+        if semaphore is None:
+            with state['lock']:
+                semaphore = state['slots'].get(name)
+                if semaphore is None:
+                    limit = current_app.config[max_concurrency_key]
+                    semaphore = state['slots'][name] = threading.BoundedSemaphore(limit) if limit > 0 else False
+        return semaphore
+
+    @blueprint.before_request
+    def admission_control():
+        config = current_app.config
+        if config['RATE_LIMIT_ENABLED']:
+            allowed, wait = rate_limiter.acquire(f"{name}:{_client_key()}", config['RATE_LIMIT_RATE'],
+                                                 config['RATE_LIMIT_BURST'])
+            if not allowed:
+                metrics.increment(f'rate_limit.{name}.rejected')
+                return jsonify({'error': 'Rate limit exceeded'}), 429, _retry_after(wait)
+
+        semaphore = _semaphore()
+        if semaphore:
+            if not semaphore.acquire(blocking=False):
+                metrics.increment(f'admission.{name}.rejected')
+                return jsonify({'error': 'Service busy, retry later'}), 503, _retry_after(1)
+            g.admission_slot = semaphore
+
+    @blueprint.teardown_request
+    def release_slot(exc):
+        semaphore = g.pop('admission_slot', None)
+        if semaphore:
+            semaphore.release()
+
+
+async def admit_async(name: str):
+    """Rate limit of limit_blueprint(`name`) for an async view: 429 response, or None if admitted"""
+    config = current_app.config
+    if not config['RATE_LIMIT_ENABLED']:
+        return None
+    allowed, wait = await rate_limiter.acquire_async(f"{name}:{_client_key()}", config['RATE_LIMIT_RATE'],
+                                                     config['RATE_LIMIT_BURST'])
+    if not allowed:
+        metrics.increment(f'rate_limit.{name}.rejected')
+        return jsonify({'error': 'Rate limit exceeded'}), 429, _retry_after(wait)
+    return None
@@ -0,0 +1,80 @@
+"""
+Generacion del comprobante PDF de una operacion.
+
+Compartido por el endpoint de recibos (/operations/<id>/receipt/) y la
+descarga desde el backoffice. Cada uno conserva sus textos: el recibo de la
+API con acentos, el del backoffice sin ellos (BACKOFFICE_LABELS).
+"""
+import io
+from datetime import datetime
+
+from reportlab.lib.pagesizes import letter
+from reportlab.pdfgen import canvas
+
+RECEIPT_LABELS = {
+    'title': "Comprobante de Operación",
+    'details': "Detalles de la Operación:",
+    'operation_id': "ID de Operación",
+    'carbon_score': "Puntuación de Carbono",
+    'created_at': "Fecha de Creación",
+    'footer': "Este documento fue generado automáticamente por Carbon Snapshot Console",
+}
+
+BACKOFFICE_LABELS = {
+    'title': "Comprobante de Operacion",
+    'details': "Detalles de la Operacion:",
+    'operation_id': "ID de Operacion",
+    'carbon_score': "Puntuacion de Carbono",
+    'created_at': "Fecha de Creacion",
+    'footer': "Este documento fue generado automaticamente por Carbon Snapshot Console",
+}
+
+
+def render_operation_receipt(operation, labels=RECEIPT_LABELS) -> io.BytesIO:
+    """Render the receipt for `operation` (model or snapshot) into an in-memory PDF"""
+    buffer = io.BytesIO()
+    p = canvas.Canvas(buffer, pagesize=letter)
+    width, height = letter
+
+    # Header
+    p.setFont("Helvetica-Bold", 20)
+    p.drawString(50, height - 50, "Carbon Snapshot Console")
+
+    # Subtitle
+    p.setFont("Helvetica", 14)
+    p.drawString(50, height - 80, labels['title'])
+
+    # Date
+    p.setFont("Helvetica", 12)
+    p.drawString(50, height - 110, f"Fecha: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+
+    # Operation details
+    y_position = height - 150
+    p.setFont("Helvetica-Bold", 12)
+    p.drawString(50, y_position, labels['details'])
+
+    y_position -= 30
+    p.setFont("Helvetica", 11)
+
+    details = [
+        f"{labels['operation_id']}: {operation.operation_id}",
+        f"Tipo: {operation.type}",
+        f"Cantidad: {operation.amount}",
+        f"{labels['carbon_score']}: {operation.carbon_score}",
+        f"Email del Usuario: {operation.user_email or 'N/A'}",
+        f"{labels['created_at']}: {operation.created_at.strftime('%Y-%m-%d %H:%M:%S')}"
+    ]
+
+    for detail in details:
+        p.drawString(50, y_position, detail)
+        y_position -= 20
+
+    # Footer
+    p.setFont("Helvetica", 10)
+    p.drawString(50, 50, labels['footer'])
+
+    p.showPage()
+    p.save()
+
+    buffer.seek(0)
+    return buffer
@@ -0,0 +1,63 @@
+"""
+Clientes Redis compartidos.
+
+Un cliente (y su pool de conexiones) por URL y por proceso, en lugar de
+crear uno nuevo en cada servicio o request. En el modo ASGI (asgi.py) las
+vistas async usan clientes redis.asyncio, tambien uno por URL y por proceso.
+"""
+import threading
+import redis
+
+_clients = {}
+_async_clients = {}
+_lock = threading.Lock()
+
+
+def get_redis_client(url: str) -> redis.Redis:
+    """Return the shared Redis client for `url`, creating it on first use"""
+    client = _clients.get(url)
+    if client is None:
+        with _lock:
+            client = _clients.get(url)
+            if client is None:
+                client = _clients[url] = redis.Redis.from_url(
+                    url,
+                    socket_connect_timeout=1,
+                    socket_timeout=1,
+                    decode_responses=True
+                )
+    return client
+
+
+def reset_redis_clients(disconnect: bool = True):
+    """
+    Drop every shared client. After a fork pass disconnect=False: the inherited
+    sockets belong to the parent and closing them would break its connections.
+    """
+    with _lock:
+        if disconnect:
+            for client in _clients.values():
+                client.connection_pool.disconnect()
+        _clients.clear()
+
+
+def get_async_redis_client(url: str):
+    """Shared redis.asyncio client for `url` (only from the event loop of the ASGI worker)"""
+    client = _async_clients.get(url)
+    if client is None:
+        import redis.asyncio
+        client = _async_clients[url] = redis.asyncio.Redis.from_url(
+            url,
+            socket_connect_timeout=1,
+            socket_timeout=1,
+            decode_responses=True
+        )
+    return client
+
+
+async def close_async_redis_clients():
+    """Close every redis.asyncio client (ASGI shutdown: the clients belong to the closing loop)"""
+    clients = list(_async_clients.values())
+    _async_clients.clear()
+    for client in clients:
+        await client.aclose()
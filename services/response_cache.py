@@ -0,0 +1,355 @@
+"""
+Cache de respuestas de lectura por generacion de operaciones.
+
+Las lecturas de listados superan por mucho a las escrituras. Cada respuesta
+cacheada se guarda con clave (endpoint, query params normalizados,
+generacion), donde la generacion es un contador global que cada camino de
+insercion o borrado de operaciones incrementa despues de su commit
+(`bump_operations_generation()`): API interna, API publica, worker de ingesta,
+`flask operations generate` y `flask operations archive`. Al cambiar la
+generacion las claves viejas dejan de usarse y el LRU las descarta.
+
+Contador:
+- RESPONSE_CACHE_REDIS_URL: hash en Redis (HINCRBY), compartido entre hosts.
+- Sin Redis: 16 bytes en un archivo mmap de instance/ (epoch + contador,
+  incremento con flock), compartido entre los workers de uWSGI del host.
+El epoch aleatorio evita reutilizar generaciones si el contador se pierde.
+
+Lecturas: LRU en proceso -> SingleFlight (una sola carga por worker) -> con
+Redis, tier compartido con lock SET NX para que un solo worker recalcule. La
+generacion se incrementa tras el commit en el primario: durante los
+READ_YOUR_WRITES_WINDOW segundos siguientes una replica atrasada dejaria datos
+viejos bajo la generacion nueva, asi que en esa ventana las cargas van al
+primario; despues, a la replica como el resto de las lecturas.
+
+Si el contador no responde (Redis caido) la request se sirve sin cache. Las
+entradas expiran igual a los RESPONSE_CACHE_TTL segundos, como cota para
+escrituras hechas por fuera de la app.
+
+Las variantes *_async son las mismas operaciones para las vistas nativas del
+modo ASGI (redis.asyncio; el contador en archivo no espera I/O). Comparten el
+LRU local con las vistas sync del mismo proceso.
+"""
+import asyncio
+import fcntl
+import hashlib
+import logging
+import mmap
+import os
+import struct
+import threading
+import time
+from contextlib import nullcontext
+from typing import Awaitable, Callable, NamedTuple, Optional
+
+from flask import current_app, request
+
+from services.cache import AsyncSingleFlight, LRUCache, SingleFlight
+from services.db_routing import primary
+from services.metrics import metrics
+from services.redis_client import get_async_redis_client, get_redis_client
+
+logger = logging.getLogger(__name__)
+
+_COUNTER = struct.Struct('<QQd')  # epoch, generacion, time.time() del ultimo incremento
+
+
+class Generation(NamedTuple):
+    token: str
+    bumped_at: float
+
+
+class FileGenerationCounter:
+    """Generation counter in a small mmap'ed file shared by the processes of a host"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._map = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def _mapped(self) -> mmap.mmap:
+        if self._map is None or self._pid != os.getpid():
+            with self._lock:
+                if self._map is None or self._pid != os.getpid():
+                    os.makedirs(os.path.dirname(self.path), exist_ok=True)
+                    fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+                    try:
+                        fcntl.flock(fd, fcntl.LOCK_EX)
+                        if os.fstat(fd).st_size < _COUNTER.size:
+                            os.ftruncate(fd, _COUNTER.size)
+                            os.pwrite(fd, _COUNTER.pack(int.from_bytes(os.urandom(8), 'little'), 0, 0.0), 0)
+                        self._map = mmap.mmap(fd, _COUNTER.size)
+                        self._pid = os.getpid()
+                    finally:
+                        fcntl.flock(fd, fcntl.LOCK_UN)
+                        os.close(fd)
+        return self._map
+
+    def current(self) -> Generation:
+        epoch, generation, bumped_at = _COUNTER.unpack(self._mapped()[:_COUNTER.size])
+        return Generation(f"{epoch:x}:{generation}", bumped_at)
+
+    def bump(self):
+        mapped = self._mapped()
+        with open(self.path, 'rb') as handle:
+            fcntl.flock(handle, fcntl.LOCK_EX)
+            epoch, generation, _ = _COUNTER.unpack(mapped[:_COUNTER.size])
+            mapped[:_COUNTER.size] = _COUNTER.pack(epoch, generation + 1, time.time())
+
+    async def current_async(self) -> Generation:
+        return self.current()
+
+    async def bump_async(self):
+        self.bump()
+
+
+class RedisGenerationCounter:
+    """Generation counter in a Redis hash shared by every host"""
+
+    KEY = 'operations:generation'
+
+    def __init__(self, url: str):
+        self.url = url
+
+    def current(self) -> Generation:
+        client = get_redis_client(self.url)
+        epoch, generation, bumped_at = client.hmget(self.KEY, 'epoch', 'value', 'bumped_at')
+        if epoch is None:
+            # Clave nueva (o perdida): un epoch nuevo invalida las generaciones anteriores
+            client.hsetnx(self.KEY, 'epoch', os.urandom(8).hex())
+            epoch, generation, bumped_at = client.hmget(self.KEY, 'epoch', 'value', 'bumped_at')
+        return Generation(f"{epoch}:{generation or 0}", float(bumped_at or 0))
+
+    def bump(self):
+        pipe = get_redis_client(self.url).pipeline(transaction=True)
+        pipe.hsetnx(self.KEY, 'epoch', os.urandom(8).hex())
+        pipe.hincrby(self.KEY, 'value', 1)
+        pipe.hset(self.KEY, 'bumped_at', time.time())
+        pipe.execute()
+
+    async def current_async(self) -> Generation:
+        client = get_async_redis_client(self.url)
+        epoch, generation, bumped_at = await client.hmget(self.KEY, 'epoch', 'value', 'bumped_at')
+        if epoch is None:
+            await client.hsetnx(self.KEY, 'epoch', os.urandom(8).hex())
+            epoch, generation, bumped_at = await client.hmget(self.KEY, 'epoch', 'value', 'bumped_at')
+        return Generation(f"{epoch}:{generation or 0}", float(bumped_at or 0))
+
+    async def bump_async(self):
+        pipe = get_async_redis_client(self.url).pipeline(transaction=True)
+        pipe.hsetnx(self.KEY, 'epoch', os.urandom(8).hex())
+        pipe.hincrby(self.KEY, 'value', 1)
+        pipe.hset(self.KEY, 'bumped_at', time.time())
+        await pipe.execute()
+
+
+class _ResponseCacheState:
+    def __init__(self, enabled, counter, maxsize, ttl, redis_url, lock_ms, replica_lag):
+        self.enabled = enabled
+        self.counter = counter
+        self.local = LRUCache(maxsize)
+        self.flight = SingleFlight()
+        self.async_flight = AsyncSingleFlight()
+        self.ttl = ttl
+        self.redis_url = redis_url
+        self.lock_ms = lock_ms
+        self.replica_lag = replica_lag
+
+
+def init_response_cache(app):
+    redis_url = app.config['RESPONSE_CACHE_REDIS_URL']
+    if redis_url:
+        counter = RedisGenerationCounter(redis_url)
+    else:
+        counter = FileGenerationCounter(os.path.join(app.instance_path, app.config['RESPONSE_CACHE_GENERATION_FILE']))
+    app.extensions['response_cache'] = _ResponseCacheState(
+        app.config['RESPONSE_CACHE_ENABLED'],
+        counter,
+        app.config['RESPONSE_CACHE_SIZE'],
+        app.config['RESPONSE_CACHE_TTL'],
+        redis_url,
+        app.config['RESPONSE_CACHE_LOCK_MS'],
+        app.config['READ_YOUR_WRITES_WINDOW'],
+    )
+
+
+def _state() -> _ResponseCacheState:
+    return current_app.extensions['response_cache']
+
+
+def operations_generation() -> Optional[Generation]:
+    """Current operations generation, or None if the cache is disabled or the counter unavailable"""
+    state = _state()
+    if not state.enabled:
+        return None
+    try:
+        return state.counter.current()
+    except Exception as e:
+        logger.warning(f"Operations generation unavailable, bypassing response cache: {e}")
+        metrics.increment('response_cache.counter_errors')
+        return None
+
+
+def bump_operations_generation():
+    """Invalidate cached read responses; call after committing inserts or deletes of operations"""
+    state = _state()
+    try:
+        state.counter.bump()
+        metrics.increment('response_cache.generation_bumps')
+    except Exception as e:
+        # Sin contador las lecturas no usan el cache; el LRU local se vacia por las dudas
+        logger.error(f"Could not bump operations generation: {e}")
+        metrics.increment('response_cache.counter_errors')
+        state.local.clear()
+
+
+def _cache_key(generation: Generation) -> str:
+    args = '&'.join(f"{k}={v}" for k, v in sorted(request.args.items(multi=True)))
+    return f"{request.endpoint}?{args}@{generation.token}"
+
+
+def _load_shared(state, key: str, loader: Callable[[], bytes]) -> bytes:
+    """Redis tier: one worker computes (SET NX lock), the others wait for its result"""
+    client = get_redis_client(state.redis_url)
+    digest = hashlib.sha1(key.encode()).hexdigest()
+    body_key, lock_key = f"response_cache:{digest}", f"response_cache:lock:{digest}"
+    try:
+        body = client.get(body_key)
+        if body is not None:
+            metrics.increment('response_cache.hits.redis')
+            return body.encode()
+        holds_lock = bool(client.set(lock_key, os.getpid(), nx=True, px=state.lock_ms))
+        if not holds_lock:
+            deadline = time.monotonic() + state.lock_ms / 1000
+            while time.monotonic() < deadline:
+                time.sleep(0.02)
+                body = client.get(body_key)
+                if body is not None:
+                    metrics.increment('response_cache.hits.redis')
+                    return body.encode()
+            metrics.increment('response_cache.lock_timeouts')
+    except Exception as e:
+        logger.warning(f"Response cache Redis tier failed: {e}")
+        return loader()
+
+    body = loader()
+    try:
+        pipe = client.pipeline(transaction=False)
+        pipe.set(body_key, body.decode(), ex=state.ttl)
+        if holds_lock:
+            pipe.delete(lock_key)
+        pipe.execute()
+    except Exception as e:
+        logger.warning(f"Response cache Redis write failed: {e}")
+    return body
+
+
+def cached_body(generation: Optional[Generation], loader: Callable[[], bytes]) -> bytes:
+    """
+    Response body for the current request at `generation` (see
+    operations_generation()), from the cache or from `loader()`.
+    generation=None skips the cache.
+    """
+    state = _state()
+    if generation is None:
+        metrics.increment('response_cache.bypass')
+        return loader()
+
+    key = _cache_key(generation)
+    body = state.local.get(key)
+    if body is not None:
+        metrics.increment('response_cache.hits.local')
+        return body
+
+    def load():
+        metrics.increment('response_cache.misses')
+        with primary() if time.time() - generation.bumped_at < state.replica_lag else nullcontext():
+            body = _load_shared(state, key, loader) if state.redis_url else loader()
+        state.local.set(key, body, expires_at=time.time() + state.ttl)
+        return body
+
+    return state.flight.do(key, load)
+
+
+async def operations_generation_async() -> Optional[Generation]:
+    """operations_generation() for async views"""
+    state = _state()
+    if not state.enabled:
+        return None
+    try:
+        return await state.counter.current_async()
+    except Exception as e:
+        logger.warning(f"Operations generation unavailable, bypassing response cache: {e}")
+        metrics.increment('response_cache.counter_errors')
+        return None
+
+
+async def bump_operations_generation_async():
+    """bump_operations_generation() for async views"""
+    state = _state()
+    try:
+        await state.counter.bump_async()
+        metrics.increment('response_cache.generation_bumps')
+    except Exception as e:
+        logger.error(f"Could not bump operations generation: {e}")
+        metrics.increment('response_cache.counter_errors')
+        state.local.clear()
+
+
+async def _load_shared_async(state, key: str, loader: Callable[[], Awaitable[bytes]]) -> bytes:
+    client = get_async_redis_client(state.redis_url)
+    digest = hashlib.sha1(key.encode()).hexdigest()
+    body_key, lock_key = f"response_cache:{digest}", f"response_cache:lock:{digest}"
+    try:
+        body = await client.get(body_key)
+        if body is not None:
+            metrics.increment('response_cache.hits.redis')
+            return body.encode()
+        holds_lock = bool(await client.set(lock_key, os.getpid(), nx=True, px=state.lock_ms))
+        if not holds_lock:
+            deadline = time.monotonic() + state.lock_ms / 1000
+            while time.monotonic() < deadline:
+                await asyncio.sleep(0.02)
+                body = await client.get(body_key)
+                if body is not None:
+                    metrics.increment('response_cache.hits.redis')
+                    return body.encode()
+            metrics.increment('response_cache.lock_timeouts')
+    except Exception as e:
+        logger.warning(f"Response cache Redis tier failed: {e}")
+        return await loader()
+
+    body = await loader()
+    try:
+        pipe = client.pipeline(transaction=False)
+        pipe.set(body_key, body.decode(), ex=state.ttl)
+        if holds_lock:
+            pipe.delete(lock_key)
+        await pipe.execute()
+    except Exception as e:
+        logger.warning(f"Response cache Redis write failed: {e}")
+    return body
+
+
+async def cached_body_async(generation: Optional[Generation], loader: Callable[[], Awaitable[bytes]]) -> bytes:
+    """cached_body() for async views: `loader` is a coroutine function"""
+    state = _state()
+    if generation is None:
+        metrics.increment('response_cache.bypass')
+        return await loader()
+
+    key = _cache_key(generation)
+    body = state.local.get(key)
+    if body is not None:
+        metrics.increment('response_cache.hits.local')
+        return body
+
+    async def load():
+        metrics.increment('response_cache.misses')
+        # El engine async lee del primario: no hace falta la ventana de lag de la replica
+        body = await _load_shared_async(state, key, loader) if state.redis_url else await loader()
+        state.local.set(key, body, expires_at=time.time() + state.ttl)
+        return body
+
+    return await state.async_flight.do(key, load)
@@ -0,0 +1,45 @@
+"""
+Cache de JWTs verificados.
+
+Verificar un JWT (firma + claims) en cada request es costoso comparado con el
+trabajo real de muchos endpoints, y el token de una sesion casi nunca cambia.
+CachingJWTManager guarda los claims ya verificados, indexados por el hash del
+token y con expiracion en el `exp` del propio token. Como flask_jwt_extended
+decodifica siempre a traves del JWTManager, el cache lo comparten tanto
+`jwt_required()` de las APIs como `decode_token()` del backoffice.
+"""
+import hashlib
+import time
+
+from flask import current_app
+from flask_jwt_extended import JWTManager
+
+from services.cache import LRUCache
+from services.metrics import metrics
+
+
+class CachingJWTManager(JWTManager):
+    """JWTManager that memoizes successful token verifications until the token expires"""
+
+    def init_app(self, app, add_context_processor: bool = False):
+        super().init_app(app, add_context_processor=add_context_processor)
+        app.extensions['jwt_token_cache'] = LRUCache(app.config.get('JWT_DECODE_CACHE_SIZE', 1024))
+
+    def _decode_jwt_from_config(self, encoded_token: str, csrf_value=None, allow_expired: bool = False) -> dict:
+        cache = current_app.extensions.get('jwt_token_cache')
+        # CSRF checks and expired-token decoding depend on per-call arguments: never cache them
+        if cache is None or csrf_value is not None or allow_expired:
+            return super()._decode_jwt_from_config(encoded_token, csrf_value, allow_expired)
+
+        key = hashlib.sha256(encoded_token.encode()).digest()
+        claims = cache.get(key)
+        if claims is not None:
+            metrics.increment('jwt_cache.hits')
+            return claims
+
+        metrics.increment('jwt_cache.misses')
+        claims = super()._decode_jwt_from_config(encoded_token, csrf_value, allow_expired)
+        expires_at = claims.get('exp')
+        if expires_at is not None and expires_at > time.time():
+            cache.set(key, claims, expires_at=expires_at)
+        return claims
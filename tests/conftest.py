@@ -0,0 +1,34 @@
+import pytest
+from app import create_app, db
+from models import User
+
+@pytest.fixture
+def app(monkeypatch, tmp_path):
+    # Flask-SQLAlchemy crea el engine en create_app(): la base (y los archivos
+    # que la app deja en instance/) se eligen por entorno antes de construirla
+    monkeypatch.setenv('DATABASE_URL', f"sqlite:///{tmp_path / 'test.db'}")
+    monkeypatch.setenv('RESPONSE_CACHE_GENERATION_FILE', str(tmp_path / 'operations.generation'))
+    monkeypatch.setenv('INGEST_LOG_DIR', str(tmp_path / 'ingest'))
+    app = create_app()
+    app.config['TESTING'] = True
+
+    with app.app_context():
+        db.create_all()
+
+        # Create test users
+        internal_user = User(email='test_admin@test.com', is_internal=True)
+        internal_user.set_password('test123')
+
+        public_user = User(email='test_user@test.com', is_internal=False)
+        public_user.set_password('test123')
+
+        db.session.add_all([internal_user, public_user])
+        db.session.commit()
+
+        yield app
+
+        db.drop_all()
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
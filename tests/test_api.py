@@ -1,35 +1,3 @@
-import pytest
-import json
-from app import create_app, db
-from models import User, Operation
-
-@pytest.fixture
-def app():
-    app = create_app()
-    app.config['TESTING'] = True
-    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
-
-    with app.app_context():
-        db.create_all()
-
-        # Create test users
-        internal_user = User(email='test_admin@test.com', is_internal=True)
-        internal_user.set_password('test123')
-
-        public_user = User(email='test_user@test.com', is_internal=False)
-        public_user.set_password('test123')
-
-        db.session.add_all([internal_user, public_user])
-        db.session.commit()
-
-        yield app
-
-        db.drop_all()
-
-@pytest.fixture
-def client(app):
-    return app.test_client()
-
 def get_internal_token(client):
     """Helper to get JWT token for internal user"""
     response = client.post('/api/auth/login/',
@@ -0,0 +1,189 @@
+import asyncio
+import json
+
+import pytest
+from itsdangerous import URLSafeTimedSerializer
+
+from app import create_app, db
+from models import User
+from services.asgi_app import create_asgi_app
+from services.cache import AsyncSingleFlight
+from services.metrics import metrics
+
+@pytest.fixture
+def asgi_app(monkeypatch, tmp_path):
+    monkeypatch.setenv('DATABASE_URL', f"sqlite:///{tmp_path / 'asgi.db'}")
+    monkeypatch.setenv('RESPONSE_CACHE_GENERATION_FILE', str(tmp_path / 'operations.generation'))
+    monkeypatch.setenv('INGEST_LOG_DIR', str(tmp_path / 'ingest'))
+    app = create_app()
+    app.config['TESTING'] = True
+    with app.app_context():
+        db.create_all()
+        user = User(email='test_admin@test.com', is_internal=True)
+        user.set_password('test123')
+        db.session.add(user)
+        db.session.commit()
+    return create_asgi_app(app)
+
+def serve(asgi_app, scenario):
+    """Run scenario(call) on one event loop between lifespan startup and shutdown"""
+    async def call(method, path, body=None, headers=None):
+        raw = json.dumps(body).encode() if body is not None else b''
+        path, _, query = path.partition('?')
+        scope = {
+            'type': 'http', 'method': method, 'path': path, 'raw_path': path.encode(), 'root_path': '',
+            'query_string': query.encode(), 'http_version': '1.1', 'scheme': 'http',
+            'server': ('testserver', 80), 'client': ('127.0.0.1', 5000),
+            'headers': [(b'content-type', b'application/json'), (b'content-length', str(len(raw)).encode())]
+                       + [(k.lower().encode(), v.encode()) for k, v in (headers or {}).items()],
+        }
+        messages = [{'type': 'http.request', 'body': raw, 'more_body': False}]
+        response = {'body': b''}
+
+        async def receive():
+            return messages.pop() if messages else {'type': 'http.disconnect'}
+
+        async def send(message):
+            if message['type'] == 'http.response.start':
+                response['status'] = message['status']
+                response['headers'] = {k.decode(): v.decode() for k, v in message['headers']}
+            else:
+                response['body'] += message.get('body', b'')
+        await asgi_app(scope, receive, send)
+        return response
+
+    async def main():
+        lifespan, started = asyncio.Queue(), asyncio.Event()
+
+        async def send(message):
+            if message['type'] == 'lifespan.startup.complete':
+                started.set()
+
+        lifespan.put_nowait({'type': 'lifespan.startup'})
+        server = asyncio.ensure_future(asgi_app({'type': 'lifespan'}, lifespan.get, send))
+        await started.wait()
+        try:
+            return await scenario(call)
+        finally:
+            lifespan.put_nowait({'type': 'lifespan.shutdown'})
+            await server
+    return asyncio.run(main())
+
+async def login(call):
+    response = await call('POST', '/api/auth/login/', {'email': 'test_admin@test.com', 'password': 'test123'})
+    return {'Authorization': f"Bearer {json.loads(response['body'])['access_token']}"}
+
+def test_async_views_create_list_and_render(asgi_app):
+    metrics.reset()
+
+    async def scenario(call):
+        auth = await login(call)
+        created = await asyncio.gather(*[
+            call('POST', '/api/operations/', {'type': 'heating', 'amount': amount}, auth) for amount in (1, 2, 3)
+        ])
+        assert [r['status'] for r in created] == [201, 201, 201]
+        operation = json.loads(created[0]['body'])
+        assert operation['amount'] == 1.0 and operation['carbon_score'] == 1.8
+
+        listed = await call('GET', '/api/operations/', headers=auth)
+        assert listed['status'] == 200
+        assert len(json.loads(listed['body'])) == 3
+        etag = listed['headers']['etag']
+        unchanged = await call('GET', '/api/operations/', headers=dict(auth, **{'If-None-Match': etag}))
+        assert unchanged['status'] == 304
+
+        receipt = await call('GET', f"/operations/{operation['operation_id']}/receipt/", headers=auth)
+        assert receipt['status'] == 200
+        assert receipt['body'].startswith(b'%PDF')
+
+        assert (await call('GET', '/api/operations/'))['status'] == 401
+
+    serve(asgi_app, scenario)
+    counters = metrics.snapshot()['counters']
+    assert counters['response_cache.generation_bumps'] == 3
+    assert counters['operation_cache.hits.local'] == 1
+    assert 'asgi.wsgi_fallbacks' not in counters
+
+def test_unported_requests_go_through_wsgi(asgi_app):
+    metrics.reset()
+
+    async def scenario(call):
+        auth = await login(call)
+        headers = dict(auth, **{'Idempotency-Key': 'meter-1'})
+        first = await call('POST', '/api/operations/', {'type': 'heating', 'amount': 2.0}, headers)
+        retry = await call('POST', '/api/operations/', {'type': 'heating', 'amount': 2.0}, headers)
+        assert first['status'] == retry['status'] == 201
+        assert retry['headers']['idempotent-replayed'] == 'true'
+        assert json.loads(retry['body'])['operation_id'] == json.loads(first['body'])['operation_id']
+
+        changes = await call('GET', '/api/operations/changes?limit=10', headers=auth)
+        assert changes['status'] == 200
+        assert len(json.loads(changes['body'])['changes']) == 1
+
+    serve(asgi_app, scenario)
+    assert metrics.snapshot()['counters']['asgi.wsgi_fallbacks'] == 2
+
+def test_live_feed_streams_on_the_event_loop(asgi_app):
+    token = URLSafeTimedSerializer(asgi_app.app.secret_key, salt='live-feed').dumps('test_admin@test.com')
+    feed = asgi_app.app.extensions['live_feed']
+
+    async def scenario(call):
+        disconnect, chunks = asyncio.Event(), asyncio.Queue()
+        scope = {
+            'type': 'http', 'method': 'GET', 'path': '/bo/operations/stream', 'raw_path': b'/bo/operations/stream',
+            'root_path': '', 'query_string': f'token={token}'.encode(), 'http_version': '1.1', 'scheme': 'http',
+            'server': ('testserver', 80), 'client': ('127.0.0.1', 5000), 'headers': [],
+        }
+        messages = [{'type': 'http.request', 'body': b'', 'more_body': False}]
+
+        async def receive():
+            if messages:
+                return messages.pop()
+            await disconnect.wait()
+            return {'type': 'http.disconnect'}
+
+        async def send(message):
+            await chunks.put(message)
+
+        stream = asyncio.ensure_future(asgi_app(scope, receive, send))
+        start = await chunks.get()
+        assert start['status'] == 200
+        assert (b'content-type', b'text/event-stream; charset=utf-8') in start['headers']
+        assert (await chunks.get())['body'].startswith(b'retry:')
+        assert len(feed.broadcaster) == 1
+
+        auth = await login(call)
+        created = await call('POST', '/api/operations/', {'type': 'heating', 'amount': 3.0}, auth)
+        event = (await asyncio.wait_for(chunks.get(), 5))['body'].decode()
+        assert event.startswith('event: operations\n')
+        assert json.loads(event.split('data: ', 1)[1]) == [json.loads(created['body'])]
+
+        # Sin esperar al heartbeat: el viewer se libera al desconectarse
+        disconnect.set()
+        await asyncio.wait_for(stream, 5)
+        assert len(feed.broadcaster) == 0
+
+        forged = await call('GET', '/bo/operations/stream?token=forged')
+        assert forged['status'] == 401
+
+    serve(asgi_app, scenario)
+
+    # En modo ASGI el listado abre el stream del mismo origen
+    client = asgi_app.app.test_client()
+    client.post('/bo/login', data={'email': 'test_admin@test.com', 'password': 'test123'})
+    assert 'var streamUrl = "/bo/operations/stream?token=' in client.get('/bo/operations/').get_data(as_text=True)
+
+def test_async_single_flight_coalesces_concurrent_loads():
+    flight = AsyncSingleFlight()
+    calls = []
+
+    async def load():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return 'body'
+
+    async def main():
+        return await asyncio.gather(*[flight.do('key', load) for _ in range(5)])
+
+    assert asyncio.run(main()) == ['body'] * 5
+    assert len(calls) == 1
@@ -0,0 +1,122 @@
+import threading
+import time
+from services.cache import LRUCache, SingleFlight
+from services.metrics import metrics
+from services.operation_cache import operation_cache
+from tests.test_api import get_internal_token
+
+def test_lru_cache_evicts_least_recently_used():
+    """Test LRU eviction order and expiry"""
+    cache = LRUCache(maxsize=2)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    cache.get('a')
+    cache.set('c', 3)
+
+    assert cache.get('a') == 1
+    assert cache.get('b') is None
+    assert cache.get('c') == 3
+
+    cache.set('expired', 4, expires_at=time.time() - 1)
+    assert cache.get('expired') is None
+
+def test_single_flight_coalesces_concurrent_calls():
+    """Test that concurrent calls for the same key run the loader once"""
+    flight = SingleFlight()
+    calls = []
+    release = threading.Event()
+
+    def loader():
+        calls.append(1)
+        release.wait(1)
+        return 'value'
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(flight.do('key', loader))) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.05)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert len(calls) == 1
+    assert results == ['value'] * 5
+
+def test_operation_cache_serves_receipt_without_db(app, client):
+    """Test that receipts are served from the operation cache after creation"""
+    token = get_internal_token(client)
+    headers = {'Authorization': f'Bearer {token}'}
+
+    created = client.post('/api/operations/',
+                          json={'type': 'electricity', 'amount': 10.0},
+                          headers=headers).json
+    operation_id = created['operation_id']
+
+    misses_before = metrics.snapshot()['counters'].get('operation_cache.misses', 0)
+    response = client.get(f'/operations/{operation_id}/receipt/', headers=headers)
+
+    assert response.status_code == 200
+    assert response.mimetype == 'application/pdf'
+    assert metrics.snapshot()['counters'].get('operation_cache.misses', 0) == misses_before
+
+    with app.app_context():
+        assert operation_cache.get(operation_id).to_dict() == created
+
+def test_operation_cache_does_not_cache_missing_ids(app, client):
+    """Test that unknown operation IDs return 404 and are not cached"""
+    token = get_internal_token(client)
+    headers = {'Authorization': f'Bearer {token}'}
+
+    response = client.get('/operations/does-not-exist/receipt/', headers=headers)
+
+    assert response.status_code == 404
+    with app.app_context():
+        assert operation_cache.get('does-not-exist') is None
+
+def test_metrics_endpoint_requires_internal_user(client):
+    """Test metrics endpoint access control and cache stats"""
+    token = get_internal_token(client)
+    response = client.get('/api/metrics/', headers={'Authorization': f'Bearer {token}'})
+
+    assert response.status_code == 200
+    assert 'hit_rate' in response.json['operation_cache']
+    assert 'counters' in response.json
+
+def test_jwt_verification_is_cached_across_requests(client):
+    """Test that a token is verified once and then served from the token cache"""
+    token = get_internal_token(client)
+    headers = {'Authorization': f'Bearer {token}'}
+
+    client.get('/api/operations/', headers=headers)
+    counters = metrics.snapshot()['counters']
+    hits_before = counters.get('jwt_cache.hits', 0)
+    misses_before = counters.get('jwt_cache.misses', 0)
+
+    for _ in range(3):
+        assert client.get('/api/operations/', headers=headers).status_code == 200
+
+    counters = metrics.snapshot()['counters']
+    assert counters.get('jwt_cache.hits', 0) == hits_before + 3
+    assert counters.get('jwt_cache.misses', 0) == misses_before
+
+def test_jwt_cache_rejects_tampered_tokens(client):
+    """Test that cached verification does not accept a modified token"""
+    token = get_internal_token(client)
+    client.get('/api/operations/', headers={'Authorization': f'Bearer {token}'})
+
+    tampered = token[:-2] + ('AA' if not token.endswith('AA') else 'BB')
+    response = client.get('/api/operations/', headers={'Authorization': f'Bearer {tampered}'})
+
+    assert response.status_code == 422
+
+def test_backoffice_session_uses_token_cache(client):
+    """Test backoffice pages reuse the cached verification of the session token"""
+    client.post('/bo/login', data={'email': 'test_admin@test.com', 'password': 'test123'})
+    client.get('/bo/operations/')
+    hits_before = metrics.snapshot()['counters'].get('jwt_cache.hits', 0)
+
+    response = client.get('/bo/operations/')
+
+    assert response.status_code == 200
+    assert metrics.snapshot()['counters'].get('jwt_cache.hits', 0) == hits_before + 1
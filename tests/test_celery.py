@@ -0,0 +1,32 @@
+from services.celery_app import celery
+from services.email_service import EmailService
+from services.metrics import metrics
+
+OPERATION = {
+    'operation_id': 'op-1', 'type': 'electricity', 'amount': 10.0,
+    'carbon_score': 5.0, 'created_at': '2026-01-01T00:00:00', 'user_email': 'meter@test.com',
+}
+
+def test_celery_configured_from_app(app):
+    assert app.extensions['celery'] is celery
+    assert celery.conf.task_acks_late and celery.conf.task_ignore_result
+    assert celery.conf.worker_prefetch_multiplier == app.config['CELERY_PREFETCH_MULTIPLIER']
+    assert {q.name for q in celery.conf.task_queues} == {'email'}
+
+    task = EmailService.send_operation_confirmation_async
+    assert task.name == 'email.send_confirmation'
+    assert celery.amqp.router.route({}, task.name)['queue'].name == 'email'
+
+def test_email_task_records_timing(app):
+    app.extensions['mail'].suppress = True
+    app.config['EMAIL_TRANSPORT'] = 'celery'
+    celery.conf.task_always_eager = True
+    metrics.reset()
+    try:
+        assert EmailService.send_operation_confirmation(OPERATION) is True
+    finally:
+        celery.conf.task_always_eager = False
+
+    snapshot = metrics.snapshot()
+    assert snapshot['timers']['celery.task.email.send_confirmation']['count'] == 1
+    assert snapshot['counters']['celery.task.email.send_confirmation.success'] == 1
@@ -0,0 +1,47 @@
+import uuid
+from app import db
+from models import Operation
+from tests.test_api import get_internal_token, get_public_token
+
+def test_change_feed_pages_through_new_operations(app, client):
+    """Test bounded pages, resume tokens and catching up with new rows"""
+    headers = {'Authorization': f'Bearer {get_internal_token(client)}'}
+    created = [client.post('/api/operations/', json={'type': 'electricity', 'amount': 1.0 + i}, headers=headers).json
+               for i in range(5)]
+
+    first = client.get('/api/operations/changes?limit=3', headers=headers).json
+    assert [op['operation_id'] for op in first['changes']] == [op['operation_id'] for op in created[:3]]
+    assert first['has_more'] is True
+
+    second = client.get(f"/api/operations/changes?limit=3&since={first['next']}", headers=headers).json
+    assert [op['operation_id'] for op in second['changes']] == [op['operation_id'] for op in created[3:]]
+    assert second['has_more'] is False
+
+    caught_up = client.get(f"/api/operations/changes?since={second['next']}", headers=headers).json
+    assert caught_up == {'changes': [], 'next': second['next'], 'has_more': False}
+
+    new = client.post('/api/operations/', json={'type': 'heating', 'amount': 2.0}, headers=headers).json
+    latest = client.get(f"/api/operations/changes?since={second['next']}", headers=headers).json
+    assert [op['operation_id'] for op in latest['changes']] == [new['operation_id']]
+
+def test_change_feed_sequence_is_assigned_by_the_database(app):
+    """Test that every insert path gets an increasing seq"""
+    with app.app_context():
+        db.session.add(Operation(type='heating', amount=1.0, carbon_score=1.8))
+        db.session.commit()
+        db.session.execute(db.insert(Operation), [
+            {'operation_id': str(uuid.uuid4()), 'type': 'heating', 'amount': 1.0, 'carbon_score': 1.8} for i in range(2)
+        ])
+        db.session.commit()
+
+        seqs = db.session.execute(db.select(Operation.seq).order_by(Operation.id)).scalars().all()
+        assert seqs == sorted(seqs) and len(set(seqs)) == 3 and None not in seqs
+
+def test_change_feed_validation(client):
+    """Test access control and parameter validation"""
+    internal = {'Authorization': f'Bearer {get_internal_token(client)}'}
+    public = {'Authorization': f'Bearer {get_public_token(client)}'}
+
+    assert client.get('/api/operations/changes', headers=public).status_code == 403
+    assert client.get('/api/operations/changes?since=garbage', headers=internal).status_code == 400
+    assert client.get('/api/operations/changes?limit=0', headers=internal).status_code == 400
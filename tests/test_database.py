@@ -0,0 +1,192 @@
+import pytest
+import json
+import os
+from datetime import datetime
+from sqlalchemy import create_engine, text
+from app import create_app, db
+from models import Operation, User
+from services.db_routing import replica_engine
+from services.db_engine import InstrumentedQueuePool, build_engine_options, init_engine_instrumentation
+from services.metrics import metrics
+from tests.test_api import get_internal_token
+
+REPLICA_ONLY_ID = '00000000-0000-4000-8000-00000000beef'
+
+def test_engine_options_for_postgres(app):
+    """Test pool sizing and statement timeout for Postgres URLs"""
+    config = dict(app.config, SQLALCHEMY_DATABASE_URI='postgresql://user:pass@db:5432/vemo_db')
+    options = build_engine_options(config)
+
+    assert options['poolclass'] is InstrumentedQueuePool
+    assert options['pool_size'] == app.config['DB_POOL_SIZE']
+    assert options['max_overflow'] == app.config['DB_MAX_OVERFLOW']
+    assert options['pool_pre_ping'] is True
+    assert 'statement_timeout' in options['connect_args']['options']
+
+def test_engine_options_for_sqlite(app):
+    """Test that SQLite keeps Flask-SQLAlchemy's pool choice"""
+    options = build_engine_options(dict(app.config, SQLALCHEMY_DATABASE_URI='sqlite:///:memory:'))
+
+    assert 'poolclass' not in options
+    assert 'pool_size' not in options
+
+def test_pool_metrics_and_sqlite_pragmas(app, tmp_path):
+    """Test checkout wait/saturation metrics and WAL pragma on an instrumented pool"""
+    engine = create_engine(f"sqlite:///{tmp_path / 'pool.db'}", poolclass=InstrumentedQueuePool, pool_size=2, max_overflow=0)
+    init_engine_instrumentation(app, engine)
+    waits_before = metrics.snapshot()['timers'].get('db.pool.checkout_wait', {}).get('count', 0)
+
+    with engine.connect() as connection:
+        journal_mode = connection.execute(text('PRAGMA journal_mode')).scalar()
+        assert metrics.snapshot()['gauges']['db.pool.saturation'] == 0.5
+
+    snapshot = metrics.snapshot()
+    assert journal_mode == 'wal'
+    assert snapshot['timers']['db.pool.checkout_wait']['count'] == waits_before + 1
+    assert snapshot['gauges']['db.pool.checked_out'] == 0
+    engine.dispose()
+
+@pytest.fixture
+def replicated_app(monkeypatch, tmp_path):
+    """App with a primary and a 'replica' backed by two SQLite files"""
+    monkeypatch.setenv('DATABASE_URL', f"sqlite:///{tmp_path / 'primary.db'}")
+    monkeypatch.setenv('REPLICA_DATABASE_URL', f"sqlite:///{tmp_path / 'replica.db'}")
+    monkeypatch.setenv('RESPONSE_CACHE_GENERATION_FILE', str(tmp_path / 'operations.generation'))
+    monkeypatch.setenv('INGEST_LOG_DIR', str(tmp_path / 'ingest'))
+    app = create_app()
+    app.config['TESTING'] = True
+
+    with app.app_context():
+        db.create_all()
+        user = User(email='test_admin@test.com', is_internal=True)
+        user.set_password('test123')
+        db.session.add(user)
+        db.session.commit()
+
+        # Sin replicacion real: la replica arranca con el esquema y un dato propio
+        db.metadata.create_all(replica_engine())
+        with replica_engine().begin() as connection:
+            connection.execute(Operation.__table__.insert().values(
+                operation_id=REPLICA_ONLY_ID, type='heating', amount=1.0, carbon_score=1.8,
+                created_at=datetime(2026, 1, 1)
+            ))
+
+        yield app
+
+def test_read_only_views_use_replica(replicated_app):
+    """Test that listings are served from the replica bind"""
+    client = replicated_app.test_client()
+    token = get_internal_token(client)
+
+    response = client.get('/api/operations/', headers={'Authorization': f'Bearer {token}'})
+
+    assert response.status_code == 200
+    assert [op['operation_id'] for op in response.json] == [REPLICA_ONLY_ID]
+
+def test_read_your_writes_goes_to_primary(replicated_app):
+    """Test that a client that just wrote reads its own write from the primary"""
+    client = replicated_app.test_client()
+    headers = {'Authorization': f'Bearer {get_internal_token(client)}'}
+
+    created = client.post('/api/operations/', json={'type': 'electricity', 'amount': 10.0}, headers=headers)
+    response = client.get('/api/operations/', headers=headers)
+
+    assert [op['operation_id'] for op in response.json] == [created.json['operation_id']]
+
+def test_replica_failure_falls_back_to_primary(replicated_app):
+    """Test fallback to the primary when the replica cannot serve the query"""
+    with replicated_app.app_context():
+        db.metadata.drop_all(replica_engine())
+    client = replicated_app.test_client()
+    token = get_internal_token(client)
+
+    response = client.get('/api/operations/', headers={'Authorization': f'Bearer {token}'})
+
+    assert response.status_code == 200
+    assert response.json == []
+
+def test_archive_moves_old_months_and_export_still_reads_them(app, client, tmp_path):
+    """Test archival to NDJSON and export of archived plus live operations"""
+    from services.partitioning import archive_operations
+
+    app.config['ARCHIVE_DIR'] = str(tmp_path)
+    with app.app_context():
+        db.session.add_all([
+            Operation(type='heating', amount=1.0, carbon_score=1.8, created_at=datetime(2025, 1, 15)),
+            Operation(type='heating', amount=2.0, carbon_score=3.6, created_at=datetime(2025, 2, 1)),
+            Operation(type='electricity', amount=4.0, carbon_score=2.0, created_at=datetime(2026, 3, 1)),
+        ])
+        db.session.commit()
+
+        archived = archive_operations(datetime(2025, 3, 1).date(), str(tmp_path))
+
+        assert [entry['month'] for entry in archived] == ['2025-01', '2025-02']
+        assert Operation.query.count() == 1
+
+    token = get_internal_token(client)
+    response = client.get('/api/operations/export', headers={'Authorization': f'Bearer {token}'})
+    rows = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+
+    assert response.status_code == 200
+    assert [row['amount'] for row in rows] == [1.0, 2.0, 4.0]
+    assert rows[0]['created_at'] == '2025-01-15T00:00:00'
+
+    response = client.get('/api/operations/export?include_archived=false',
+                          headers={'Authorization': f'Bearer {token}'})
+    assert len(response.get_data(as_text=True).splitlines()) == 1
+
+def test_archive_only_deletes_exported_rows_and_resumes(app, tmp_path, monkeypatch):
+    """Test rows landing in a month during its export survive, and a re-run finishes an interrupted archive"""
+    import services.partitioning as partitioning
+
+    archive_dir = str(tmp_path / 'archive')
+    with app.app_context():
+        db.session.add(Operation(type='heating', amount=1.0, carbon_score=1.8, created_at=datetime(2025, 1, 15)))
+        db.session.commit()
+
+        # Una fila del mismo mes que se inserta mientras se escribe el archivo
+        write_ndjson = partitioning._write_ndjson
+
+        def write_then_insert(month, path):
+            count = write_ndjson(month, path)
+            with db.engine.begin() as connection:
+                connection.execute(Operation.__table__.insert(), {
+                    'operation_id': '00000000-0000-4000-8000-000000000001', 'type': 'heating',
+                    'amount': 2.0, 'carbon_score': 3.6, 'created_at': datetime(2025, 1, 20),
+                })
+            return count
+        monkeypatch.setattr(partitioning, '_write_ndjson', write_then_insert)
+        partitioning.archive_operations(datetime(2025, 2, 1).date(), archive_dir)
+        monkeypatch.setattr(partitioning, '_write_ndjson', write_ndjson)
+        assert [op.amount for op in Operation.query.all()] == [2.0]
+
+        # Corte entre el archivo y el borrado: la corrida siguiente lo termina y archiva el resto
+        monkeypatch.setattr(partitioning, '_delete_archived', lambda path: 0)
+        partitioning.archive_operations(datetime(2025, 2, 1).date(), archive_dir)
+        monkeypatch.undo()
+        assert Operation.query.count() == 1
+        archived = partitioning.archive_operations(datetime(2025, 2, 1).date(), archive_dir)
+        assert [entry['rows'] for entry in archived] == [1]
+        assert Operation.query.count() == 0
+
+    assert sorted(os.listdir(archive_dir)) == ['operations_2025_01.ndjson.gz', 'operations_2025_01_2.ndjson.gz']
+    assert [row['amount'] for row in partitioning.iter_archived_operations(archive_dir)] == [1.0, 2.0]
+
+def test_data_generator_is_deterministic_and_loads_rows(app):
+    """Test synthetic data: same seed -> same rows, readable through the ORM"""
+    from services.data_generator import OperationGenerator, generate_operations
+
+    end = datetime(2026, 1, 1)
+    first = OperationGenerator(7, 30, end, 50).chunk(100)
+    assert first == OperationGenerator(7, 30, end, 50).chunk(100)
+    assert first != OperationGenerator(8, 30, end, 50).chunk(100)
+
+    with app.app_context():
+        stats = generate_operations(250, seed=7, chunk_size=100, days=30, end=end, users=50)
+        operations = Operation.query.order_by(Operation.id).all()
+
+    assert stats['rows'] == 250
+    assert len(operations) == 250
+    assert len({op.operation_id for op in operations}) == 250
+    assert all(datetime(2025, 12, 2) <= op.created_at < end for op in operations)
+    assert all(op.carbon_score > 0 for op in operations)
@@ -0,0 +1,114 @@
+import pytest
+from services.email_stream import EmailStream, run_email_worker
+
+class FakeStreamRedis:
+    """Just enough of the Redis Streams API for EmailStream (no Redis server in the test env)"""
+
+    def __init__(self):
+        self.streams = {}
+        self.pending = {}  # id -> [consumer, deliveries, idle_ms]
+        self.seq = 0
+
+    def xadd(self, name, fields, maxlen=None, approximate=True):
+        self.seq += 1
+        message_id = f"{self.seq}-0"
+        entries = self.streams.setdefault(name, [])
+        entries.append((message_id, dict(fields)))
+        if maxlen is not None:
+            del entries[:-maxlen]
+        return message_id
+
+    def xgroup_create(self, name, group, id='0', mkstream=False):
+        self.streams.setdefault(name, [])
+        self.delivered = set()
+
+    def xreadgroup(self, group, consumer, streams, count=None, block=None):
+        (name, _), = streams.items()
+        fresh = [(i, f) for i, f in self.streams[name] if i not in self.delivered][:count]
+        for message_id, _ in fresh:
+            self.delivered.add(message_id)
+            self.pending[message_id] = [consumer, 1, 0]
+        return [[name, fresh]] if fresh else []
+
+    def xpending_range(self, name, group, min, max, count, idle=None):
+        return [{'message_id': i, 'times_delivered': p[1]} for i, p in self.pending.items() if p[2] >= (idle or 0)][:count]
+
+    def xclaim(self, name, group, consumer, min_idle_time, message_ids):
+        entries = dict(self.streams[name])
+        for message_id in message_ids:
+            self.pending[message_id] = [consumer, self.pending[message_id][1] + 1, 0]
+        return [(i, entries.get(i)) for i in message_ids]
+
+    def xack(self, name, group, *ids):
+        for message_id in ids:
+            self.pending.pop(message_id, None)
+
+    def xdel(self, name, *ids):
+        self.streams[name] = [(i, f) for i, f in self.streams[name] if i not in ids]
+
+    def pipeline(self, transaction=False):
+        return self
+
+    def execute(self):
+        pass
+
+    def age_pending(self, ms):
+        for entry in self.pending.values():
+            entry[2] += ms
+
+@pytest.fixture
+def stream(app, monkeypatch):
+    fake = FakeStreamRedis()
+    monkeypatch.setattr('services.email_stream.get_redis_client', lambda url: fake)
+    stream = EmailStream('redis://fake', 'email:test', maxlen=3, claim_idle_ms=1000, max_deliveries=2)
+    app.extensions['email_stream'] = stream
+    app.config['EMAIL_TRANSPORT'] = 'stream'
+    return stream
+
+def _operation(i):
+    return {'operation_id': f'op-{i}', 'type': 'heating', 'amount': 1.0, 'carbon_score': 1.8,
+            'user_email': 'test_user@test.com', 'created_at': '2026-01-01T00:00:00'}
+
+def test_publish_is_bounded_by_maxlen(stream):
+    """Test the producer trims the stream so Redis memory stays bounded"""
+    for i in range(5):
+        stream.publish(_operation(i))
+    assert [fields for _, fields in stream.client.streams['email:test']][0]['data'].find('op-2') > 0
+    assert len(stream.client.streams['email:test']) == 3
+
+def test_worker_sends_batches_and_acks(app, stream):
+    """Test the worker sends every queued email and leaves nothing pending"""
+    from app import mail
+
+    app.extensions['mail'].suppress = True
+    for i in range(3):
+        stream.publish(_operation(i))
+    with mail.record_messages() as outbox:
+        totals = run_email_worker(app, consumer='w1', batch_size=2, block_ms=0, drain=True)
+
+    assert totals == {'received': 3, 'sent': 3}
+    assert sorted(message.body.split('ID de Operación: ')[1].split()[0] for message in outbox) == ['op-0', 'op-1', 'op-2']
+    assert stream.client.pending == {}
+    assert stream.client.streams['email:test'] == []
+
+def test_crashed_worker_entries_are_reclaimed_then_dead_lettered(app, stream):
+    """Test pending entries of a dead consumer are retried and moved aside after max deliveries"""
+    stream.publish(_operation(1))
+    with app.app_context():
+        assert len(stream.read('crashed', 10, 0)) == 1  # leido y nunca confirmado
+
+        assert stream.read('w2', 10, 0) == []  # todavia no supero claim_idle_ms
+        stream.client.age_pending(1000)
+        assert [data['operation_id'] for _, data in stream.read('w2', 10, 0)] == ['op-1']
+
+        stream.client.age_pending(1000)
+        assert stream.read('w3', 10, 0) == []
+    assert len(stream.client.streams['email:test:dead']) == 1
+    assert stream.client.pending == {}
+
+def test_email_service_publishes_to_stream(app, stream):
+    from services.email_service import EmailService
+
+    with app.app_context():
+        assert EmailService.send_operation_confirmation(_operation(7)) is True
+    assert len(stream.client.streams['email:test']) == 1
@@ -0,0 +1,49 @@
+import threading
+import time
+
+from services.health import HealthMonitor
+
+def test_healthz(client):
+    response = client.get('/healthz')
+    assert response.status_code == 200
+    assert response.json == {'status': 'ok'}
+
+def test_readyz_reports_each_dependency(app, client):
+    response = client.get('/readyz')
+    body = response.json
+
+    assert body['checks']['database']['status'] == 'ok'
+    assert body['checks']['database']['critical'] is True
+    assert 'latency_ms' in body['checks']['database']
+    # Sin Redis en los tests: el stream de emails falla pero no es critico
+    assert body['checks']['redis']['status'] == 'error'
+    assert response.status_code == 200 and body['status'] == 'degraded'
+
+def test_critical_failure_takes_worker_out(app, client):
+    app.config['HEALTH_CRITICAL_CHECKS'] = 'database,redis'
+    app.extensions['health'] = HealthMonitor(app)
+
+    response = client.get('/readyz')
+    assert response.status_code == 503
+    assert response.json['status'] == 'fail'
+
+def test_probes_read_cached_results_and_never_wait_for_slow_checks(app):
+    app.config['HEALTH_CHECK_TIMEOUT'] = 0.1
+    app.config['HEALTH_CHECK_INTERVAL'] = 60
+    app.config['HEALTH_CRITICAL_CHECKS'] = 'slow'
+    monitor = HealthMonitor(app)
+    calls = []
+    release = threading.Event()
+    monitor.checks = {'slow': lambda: calls.append(1) or release.wait(5)}
+
+    try:
+        start = time.monotonic()
+        payload, status = monitor.readiness()
+        assert time.monotonic() - start < 1.5
+        assert status == 503 and payload['checks']['slow']['status'] == 'timeout'
+
+        for _ in range(5):
+            monitor.readiness()
+        assert len(calls) == 1
+    finally:
+        release.set()
@@ -0,0 +1,50 @@
+import gzip
+from werkzeug.datastructures import Accept
+from services.compression import compression_level, negotiate_encoding
+from tests.test_api import get_internal_token
+
+def create_operations(client, headers, count):
+    for i in range(count):
+        response = client.post('/api/operations/', json={'type': 'electricity', 'amount': 10.0 + i}, headers=headers)
+        assert response.status_code == 201
+
+def test_negotiate_encoding_prefers_highest_quality():
+    """Test q-values win over server order and unavailable algorithms are skipped"""
+    accept = Accept([('gzip', 1), ('zstd', 0.5), ('unknown', 1)])
+    assert negotiate_encoding(accept, ['unknown', 'zstd', 'gzip']) == 'gzip'
+    assert negotiate_encoding(Accept([('gzip', 0)]), ['gzip']) is None
+    assert compression_level('gzip', 1000) > compression_level('gzip', 10 * 1024 * 1024)
+
+def test_operations_listing_is_gzip_compressed(client):
+    """Test large listings are compressed when the client accepts gzip"""
+    headers = {'Authorization': f'Bearer {get_internal_token(client)}'}
+    create_operations(client, headers, 20)
+
+    plain = client.get('/api/operations/', headers=headers)
+    compressed = client.get('/api/operations/', headers={**headers, 'Accept-Encoding': 'gzip'})
+
+    assert 'Content-Encoding' not in plain.headers
+    assert compressed.headers['Content-Encoding'] == 'gzip'
+    assert 'Accept-Encoding' in compressed.headers['Vary']
+    assert len(compressed.data) < len(plain.data)
+    assert gzip.decompress(compressed.data) == plain.data
+    assert compressed.headers['ETag'] == plain.headers['ETag'][:-1] + '-gzip"'
+
+def test_operations_listing_conditional_get(client):
+    """Test unchanged polls get 304 and new operations change the ETag"""
+    headers = {'Authorization': f'Bearer {get_internal_token(client)}'}
+    create_operations(client, headers, 2)
+
+    first = client.get('/api/operations/', headers={**headers, 'Accept-Encoding': 'gzip'})
+    etag = first.headers['ETag']
+
+    again = client.get('/api/operations/', headers={**headers, 'Accept-Encoding': 'gzip', 'If-None-Match': etag})
+    assert again.status_code == 304
+    assert again.headers['ETag'] == etag
+    assert again.data == b''
+
+    create_operations(client, headers, 1)
+    changed = client.get('/api/operations/', headers={**headers, 'If-None-Match': etag})
+    assert changed.status_code == 200
+    assert len(changed.get_json()) == 3
+    assert changed.headers['ETag'] != etag
@@ -0,0 +1,79 @@
+import pytest
+from datetime import datetime, timedelta
+from app import db
+from models import IdempotencyKey, Operation
+from services.idempotency import purge_expired_keys
+from tests.test_api import get_internal_token, get_public_token
+
+@pytest.fixture
+def sent_emails(monkeypatch):
+    import routes.public_api
+
+    sent = []
+    monkeypatch.setattr(routes.public_api.email_service, 'send_operation_confirmation', sent.append)
+    return sent
+
+def _post_public(client, token, key, amount=10.0):
+    headers = {'Authorization': f'Bearer {token}', 'Idempotency-Key': key}
+    return client.post('/public/operations/', headers=headers,
+                       json={'type': 'electricity', 'amount': amount, 'user_email': 'test_user@test.com'})
+
+def test_retry_returns_original_response_without_side_effects(app, client, sent_emails):
+    """Test a retried POST replays the stored response: one row, one email"""
+    token = get_public_token(client)
+    first = _post_public(client, token, 'meter-1-reading-42')
+    retry = _post_public(client, token, 'meter-1-reading-42')
+
+    assert first.status_code == retry.status_code == 201
+    assert retry.json == first.json
+    assert retry.headers['Idempotent-Replayed'] == 'true'
+    assert 'Idempotent-Replayed' not in first.headers
+    assert len(sent_emails) == 1
+    with app.app_context():
+        assert Operation.query.count() == 1
+
+def test_same_key_with_different_body_is_rejected(client, sent_emails):
+    """Test reusing a key for another payload returns 422"""
+    token = get_public_token(client)
+    assert _post_public(client, token, 'key-a').status_code == 201
+
+    response = _post_public(client, token, 'key-a', amount=11.0)
+    assert response.status_code == 422
+
+def test_keys_are_scoped_by_endpoint(app, client, sent_emails):
+    """Test the same key on the internal and public endpoints creates two operations"""
+    _post_public(client, get_public_token(client), 'shared-key')
+    response = client.post('/api/operations/', json={'type': 'heating', 'amount': 5.0},
+                           headers={'Authorization': f'Bearer {get_internal_token(client)}',
+                                    'Idempotency-Key': 'shared-key'})
+
+    assert response.status_code == 201
+    with app.app_context():
+        assert Operation.query.count() == 2
+        assert IdempotencyKey.query.count() == 2
+
+def test_failed_request_releases_key(app, client, sent_emails):
+    """Test a rejected request does not keep the key, so the corrected retry is processed"""
+    token = get_public_token(client)
+    assert _post_public(client, token, 'key-b', amount=-1).status_code == 400
+    assert _post_public(client, token, 'key-b').status_code == 201
+
+    with app.app_context():
+        assert IdempotencyKey.query.count() == 1
+
+def test_expired_keys_are_replaced_and_purged(app, client, sent_emails):
+    """Test an expired key runs the request again and purge removes expired rows"""
+    token = get_public_token(client)
+    _post_public(client, token, 'key-c')
+    with app.app_context():
+        IdempotencyKey.query.update({'expires_at': datetime.utcnow() - timedelta(seconds=1)})
+        db.session.commit()
+
+    response = _post_public(client, token, 'key-c')
+    assert response.status_code == 201
+    assert 'Idempotent-Replayed' not in response.headers
+
+    with app.app_context():
+        assert Operation.query.count() == 2
+        assert purge_expired_keys(datetime.utcnow() + timedelta(days=2)) == 1
+        assert IdempotencyKey.query.count() == 0
@@ -0,0 +1,127 @@
+import pytest
+from flask_jwt_extended import create_access_token
+from models import Operation
+from services.ingestion import LocalLogQueue, process_batch, run_worker
+from services.carbon_calculator import CarbonCalculatorService
+from tests.test_api import get_public_token
+
+class RecordingEmailService:
+    def __init__(self):
+        self.sent = []
+
+    def send_operation_confirmation(self, operation_data):
+        self.sent.append(operation_data)
+        return True
+
+@pytest.fixture
+def async_app(app, tmp_path):
+    app.config['INGEST_MODE'] = 'async'
+    app.extensions['ingest_queue'] = LocalLogQueue(str(tmp_path))
+    return app
+
+def _post(client, token, amount=10.0, **headers):
+    return client.post('/public/operations/', headers={'Authorization': f'Bearer {token}', **headers},
+                       json={'type': 'electricity', 'amount': amount, 'user_email': 'test_user@test.com'})
+
+def test_async_mode_accepts_then_worker_inserts(async_app, client):
+    """Test 202 + queued status, then the worker inserts, scores and confirms"""
+    token = get_public_token(client)
+    response = _post(client, token)
+
+    assert response.status_code == 202
+    operation_id = response.json['operation_id']
+    assert response.headers['Location'].endswith(f'/public/operations/{operation_id}/status')
+    with async_app.app_context():
+        assert Operation.query.count() == 0
+
+    status = client.get(f'/public/operations/{operation_id}/status', headers={'Authorization': f'Bearer {token}'})
+    assert status.json['status'] == 'queued'
+
+    emails = RecordingEmailService()
+    totals = run_worker(async_app, batch_size=10, block_ms=0, drain=True, email_service=emails)
+    assert totals == {'received': 1, 'inserted': 1, 'failed': 0}
+    assert [email['operation_id'] for email in emails.sent] == [operation_id]
+
+    status = client.get(f'/public/operations/{operation_id}/status', headers={'Authorization': f'Bearer {token}'})
+    assert status.json['status'] == 'completed'
+    assert status.json['operation']['carbon_score'] == 5.0
+
+def test_redelivered_batch_does_not_duplicate(async_app, client):
+    """Test at-least-once delivery: the same batch processed twice inserts and emails once"""
+    token = get_public_token(client)
+    for amount in (1.0, 2.0, 3.0):
+        assert _post(client, token, amount).status_code == 202
+
+    emails = RecordingEmailService()
+    with async_app.app_context():
+        queue = async_app.extensions['ingest_queue']
+        batch = queue.read_batch('test', 10, 0)
+        assert process_batch(queue, batch, CarbonCalculatorService(), emails)['inserted'] == 3
+        assert process_batch(queue, batch, CarbonCalculatorService(), emails)['inserted'] == 0
+        assert Operation.query.count() == 3
+        assert queue.backlog() == 0
+    assert len(emails.sent) == 3
+
+def test_prefer_mode_is_opt_in_per_request(async_app, client, monkeypatch):
+    """Test INGEST_MODE=prefer only queues requests sending Prefer: respond-async"""
+    import routes.public_api
+    monkeypatch.setattr(routes.public_api.email_service, 'send_operation_confirmation', lambda data: True)
+    async_app.config['INGEST_MODE'] = 'prefer'
+    token = get_public_token(client)
+
+    assert _post(client, token).status_code == 201
+    assert _post(client, token, Prefer='respond-async').status_code == 202
+
+def test_unknown_operation_status_is_404(async_app, client):
+    token = get_public_token(client)
+    response = client.get('/public/operations/does-not-exist/status', headers={'Authorization': f'Bearer {token}'})
+    assert response.status_code == 404
+
+def test_operation_status_is_only_visible_to_its_submitter(async_app, client):
+    """Test that another public user gets 404 for a queued or completed operation"""
+    operation_id = _post(client, get_public_token(client)).json['operation_id']
+    with async_app.app_context():
+        other_token = create_access_token(identity='other_user@test.com', additional_claims={'is_internal': False})
+    url = f'/public/operations/{operation_id}/status'
+
+    assert client.get(url, headers={'Authorization': f'Bearer {other_token}'}).status_code == 404
+    run_worker(async_app, batch_size=10, block_ms=0, drain=True, email_service=RecordingEmailService())
+    assert client.get(url, headers={'Authorization': f'Bearer {other_token}'}).status_code == 404
+
+def test_idempotent_retry_of_a_queued_operation_keeps_location(async_app, client):
+    token = get_public_token(client)
+    first = _post(client, token, **{'Idempotency-Key': 'queued-1'})
+    retry = _post(client, token, **{'Idempotency-Key': 'queued-1'})
+
+    assert first.status_code == retry.status_code == 202
+    assert retry.headers['Idempotent-Replayed'] == 'true'
+    assert retry.headers['Location'] == first.headers['Location']
+    assert retry.json == first.json
+
+def test_status_is_completed_before_the_batch_is_acked(async_app, client):
+    """Test a worker dying between mark and ack leaves the status completed (the batch is redelivered)"""
+    token = get_public_token(client)
+    operation_id = _post(client, token).json['operation_id']
+
+    with async_app.app_context():
+        queue = async_app.extensions['ingest_queue']
+        batch = queue.read_batch('test', 10, 0)
+        queue.ack = lambda message_ids: (_ for _ in ()).throw(RuntimeError('worker died'))
+        with pytest.raises(RuntimeError):
+            process_batch(queue, batch, CarbonCalculatorService(), RecordingEmailService())
+        assert queue.backlog() == 1
+
+    status = client.get(f'/public/operations/{operation_id}/status', headers={'Authorization': f'Bearer {token}'})
+    assert status.json['status'] == 'completed'
+
+def test_local_queue_status_files_expire(tmp_path):
+    """Test status lookups read one file and expired ones are pruned on ack"""
+    queue = LocalLogQueue(str(tmp_path), status_ttl=-1)
+    queue.enqueue({'operation_id': '00000000-0000-4000-8000-000000000001', 'type': 'heating', 'amount': 1.0,
+                   'user_email': None, 'created_at': '2026-01-01T00:00:00', 'submitted_by': 'a@test.com'})
+    assert queue.status('00000000-0000-4000-8000-000000000001') == ('queued', None)
+    assert queue.submitter('00000000-0000-4000-8000-000000000001') == 'a@test.com'
+    assert queue.submitter('not-a-uuid') is None
+
+    queue.ack([offset for offset, _ in queue.read_batch('test', 10, 0)])
+    assert queue.status('00000000-0000-4000-8000-000000000001') is None
@@ -0,0 +1,107 @@
+import json
+import re
+
+import pytest
+from itsdangerous import URLSafeTimedSerializer
+
+from app import create_app, db
+from models import User
+from services.live_feed import Broadcaster, init_live_feed, open_stream
+from services.metrics import metrics
+from tests.test_api import get_internal_token
+
+def bo_login(client):
+    client.post('/bo/login', data={'email': 'test_admin@test.com', 'password': 'test123'})
+
+def stream_url(client):
+    page = client.get('/bo/operations/').get_data(as_text=True)
+    return json.loads(re.search(r'var streamUrl = (".*?");', page).group(1))
+
+def test_broadcaster_drops_for_slow_viewers():
+    metrics.reset()
+    broadcaster = Broadcaster(queue_size=1)
+    fast, slow = broadcaster.subscribe(), broadcaster.subscribe()
+    broadcaster.publish('a')
+    fast.get_nowait()
+    broadcaster.publish('b')
+
+    assert fast.get_nowait() == 'b'
+    assert slow.get_nowait() == 'a'
+    assert metrics.snapshot()['counters']['live_feed.dropped'] == 1
+
+def test_created_operations_reach_open_streams(sync_streams, app, client):
+    events = open_stream()
+    assert next(events).startswith('retry:')
+
+    token = get_internal_token(client)
+    created = client.post('/api/operations/', json={'type': 'heating', 'amount': 3.0},
+                          headers={'Authorization': f'Bearer {token}'}).json
+
+    event = next(events)
+    assert event.startswith('event: operations\n')
+    payload = json.loads(event.split('data: ', 1)[1])
+    assert payload == [created]
+    events.close()
+
+@pytest.fixture
+def sync_streams(app):
+    # El tope de streams se lee al iniciar el feed
+    app.config['LIVE_FEED_SYNC_STREAMS'] = 1
+    init_live_feed(app)
+
+def test_sync_workers_do_not_serve_streams_by_default(app, client):
+    bo_login(client)
+    assert 'streamUrl' not in client.get('/bo/operations/').get_data(as_text=True)
+    assert client.get('/bo/operations/stream-url').status_code == 404
+
+    token = URLSafeTimedSerializer(app.secret_key, salt='live-feed').dumps('test_admin@test.com')
+    assert client.get(f'/bo/operations/stream?token={token}').status_code == 503
+
+def test_list_page_uses_the_stream_service(monkeypatch, tmp_path):
+    monkeypatch.setenv('DATABASE_URL', f"sqlite:///{tmp_path / 'feed.db'}")
+    monkeypatch.setenv('RESPONSE_CACHE_GENERATION_FILE', str(tmp_path / 'operations.generation'))
+    monkeypatch.setenv('INGEST_LOG_DIR', str(tmp_path / 'ingest'))
+    monkeypatch.setenv('LIVE_FEED_URL', 'http://stream.test/bo/operations/stream')
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        user = User(email='test_admin@test.com', is_internal=True)
+        user.set_password('test123')
+        db.session.add(user)
+        db.session.commit()
+    client = app.test_client()
+    bo_login(client)
+    assert stream_url(client).startswith('http://stream.test/bo/operations/stream?token=')
+
+def test_stream_token_is_short_lived_and_reissued_while_logged_in(sync_streams, app, client):
+    bo_login(client)
+    url = stream_url(client)
+
+    response = client.get('/bo/operations/stream-url')
+    assert response.status_code == 200
+    assert response.headers['Cache-Control'] == 'no-store'
+    assert response.json['url'].startswith('/bo/operations/stream?token=')
+
+    app.config['LIVE_FEED_TOKEN_MAX_AGE'] = -1
+    assert client.get(url).status_code == 401
+
+    client.get('/bo/logout')
+    assert client.get('/bo/operations/stream-url').status_code == 302
+
+def test_stream_endpoint_requires_signed_token_and_caps_sync_streams(sync_streams, app, client):
+    bo_login(client)
+    url = stream_url(client)
+
+    response = client.get(url)
+    assert response.status_code == 200
+    assert response.mimetype == 'text/event-stream'
+    assert next(iter(response.response)).startswith(b'retry:')
+
+    # Worker sync: un stream por proceso (LIVE_FEED_SYNC_STREAMS)
+    assert client.get(url).status_code == 503
+    response.close()
+    second = client.get(url)
+    assert second.status_code == 200
+    second.close()
+
+    assert client.get('/bo/operations/stream?token=forged').status_code == 401
@@ -0,0 +1,53 @@
+from datetime import datetime
+
+import pytest
+
+from app import create_app, db
+from models import Operation
+from services import redis_client
+from services.metrics import metrics
+from services.prefork import after_fork, prepare_app
+
+OPERATION_ID = '00000000-0000-4000-8000-0000000000aa'
+
+@pytest.fixture
+def warm_app(monkeypatch, tmp_path):
+    monkeypatch.setenv('DATABASE_URL', f"sqlite:///{tmp_path / 'prefork.db'}")
+    monkeypatch.setenv('RESPONSE_CACHE_GENERATION_FILE', str(tmp_path / 'operations.generation'))
+    monkeypatch.setenv('INGEST_LOG_DIR', str(tmp_path / 'ingest'))
+    app = create_app()
+    app.config['TESTING'] = True
+    with app.app_context():
+        db.create_all()
+        db.session.add(Operation(operation_id=OPERATION_ID, type='heating', amount=1.0, carbon_score=1.8,
+                                 created_at=datetime(2026, 1, 1)))
+        db.session.commit()
+    return app
+
+def test_warmup_primes_caches_and_templates(warm_app):
+    metrics.increment('before.warmup')
+    prepare_app(warm_app)
+
+    assert warm_app.extensions['operation_cache'].local.get(OPERATION_ID) is not None
+    assert 'login.html' in {template.name for template in warm_app.jinja_env.cache.values()}
+    # Los requests del warmup no quedan en las metricas del worker
+    assert metrics.snapshot()['counters'] == {}
+
+def test_after_fork_drops_inherited_clients_without_closing_them(warm_app, monkeypatch):
+    class FakePool:
+        disconnected = False
+
+        def disconnect(self):
+            self.disconnected = True
+
+    class FakeClient:
+        connection_pool = FakePool()
+
+    inherited = FakeClient()
+    monkeypatch.setitem(redis_client._clients, 'redis://inherited', inherited)
+    warm_app.config['WARMUP_ENABLED'] = False
+
+    after_fork(warm_app)
+
+    assert 'redis://inherited' not in redis_client._clients
+    assert not inherited.connection_pool.disconnected
@@ -0,0 +1,133 @@
+import os
+import threading
+import time
+
+import pytest
+
+from app import create_app, db
+from models import User
+from services.profiler import SamplingProfiler
+from tests.test_api import get_internal_token
+
+@pytest.fixture
+def profiled_app(monkeypatch, tmp_path):
+    monkeypatch.setenv('DATABASE_URL', f"sqlite:///{tmp_path / 'profile.db'}")
+    monkeypatch.setenv('RESPONSE_CACHE_GENERATION_FILE', str(tmp_path / 'operations.generation'))
+    monkeypatch.setenv('INGEST_LOG_DIR', str(tmp_path / 'ingest'))
+    monkeypatch.setenv('PROFILER_ENABLED', 'True')
+    monkeypatch.setenv('PROFILER_INTERVAL_MS', '1')
+    monkeypatch.setenv('PROFILER_DIR', str(tmp_path / 'profiles'))
+    app = create_app()
+    app.config['TESTING'] = True
+
+    with app.app_context():
+        db.create_all()
+        user = User(email='test_admin@test.com', is_internal=True)
+        user.set_password('test123')
+        db.session.add(user)
+        db.session.commit()
+        yield app
+    app.extensions['profiler'].stop()
+
+def busy_loop(stop):
+    while not stop.is_set():
+        sum(range(1000))
+
+def test_sampling_profiler_sees_other_threads():
+    stop = threading.Event()
+    worker = threading.Thread(target=busy_loop, args=(stop,), name='busy')
+    worker.start()
+    try:
+        profiler = SamplingProfiler(0.001).run(0.05)
+    finally:
+        stop.set()
+        worker.join()
+
+    assert profiler.samples > 0
+    assert any(line.startswith('busy;') and 'busy_loop' in line for line in profiler.collapsed().splitlines())
+    speedscope = profiler.speedscope('test')
+    assert any(frame['name'] == 'busy_loop' for frame in speedscope['shared']['frames'])
+    busy = next(p for p in speedscope['profiles'] if p['name'] == 'test [busy]')
+    assert len(busy['samples']) == len(busy['weights'])
+
+def wait_for_profile(client, url, headers):
+    for _ in range(100):
+        response = client.get(url, headers=headers)
+        if response.status_code != 202:
+            return response
+        time.sleep(0.05)
+    raise AssertionError(f"{url} still pending")
+
+def test_profile_endpoint(profiled_app):
+    client = profiled_app.test_client()
+    headers = {'Authorization': f'Bearer {get_internal_token(client)}'}
+
+    response = client.get('/api/debug/profile', headers=headers)
+    assert response.status_code == 200
+    assert os.getpid() in [worker['pid'] for worker in response.json['workers']]
+
+    # El muestreo corre en el thread watcher del worker; el request vuelve enseguida
+    response = client.post(f'/api/debug/profile?pid={os.getpid()}&seconds=0.02', headers=headers)
+    assert response.status_code == 202
+    assert response.json['pid'] == os.getpid()
+    url = response.headers['Location']
+    assert url == response.json['result']
+
+    response = wait_for_profile(client, url, headers)
+    assert response.status_code == 200
+    assert response.mimetype == 'text/plain'
+    assert response.headers['Cache-Control'] == 'no-store'
+
+    response = client.get(f'{url}?format=speedscope', headers=headers)
+    assert response.status_code == 200
+    assert response.json['$schema'].startswith('https://www.speedscope.app')
+
+    assert client.post('/api/debug/profile?pid=999999&seconds=0.02', headers=headers).status_code == 404
+    assert client.post('/api/debug/profile?seconds=3600', headers=headers).status_code == 400
+    assert client.get('/api/debug/profile/999999-1', headers=headers).status_code == 404
+    assert client.get('/api/debug/profile/..%2Fprofile', headers=headers).status_code == 404
+
+def test_failed_profile_is_reported(profiled_app, monkeypatch):
+    client = profiled_app.test_client()
+    headers = {'Authorization': f'Bearer {get_internal_token(client)}'}
+
+    def full_disk(self, seconds):
+        raise OSError(28, 'No space left on device')
+    monkeypatch.setattr(SamplingProfiler, 'run', full_disk)
+
+    response = client.post(f'/api/debug/profile?pid={os.getpid()}&seconds=0.02', headers=headers)
+    assert response.status_code == 202
+    response = wait_for_profile(client, response.headers['Location'], headers)
+    assert response.status_code == 409
+    assert 'No space left on device' in response.get_data(as_text=True)
+
+def test_one_pending_profile_per_worker(profiled_app):
+    client = profiled_app.test_client()
+    headers = {'Authorization': f'Bearer {get_internal_token(client)}'}
+    # Heartbeat de un worker que no revisa sus pedidos: el pedido queda pendiente
+    requests = profiled_app.extensions['profiler']
+    requests.ensure_started()
+    with open(os.path.join(requests.workers_directory, '999998'), 'w') as f:
+        f.write('0')
+
+    response = client.post('/api/debug/profile?pid=999998&seconds=0.02', headers=headers)
+    assert response.status_code == 202
+    assert client.get(response.headers['Location'], headers=headers).status_code == 202
+    assert client.post('/api/debug/profile?pid=999998&seconds=0.02', headers=headers).status_code == 409
+
+def test_x_profile_header_returns_pstats(profiled_app):
+    client = profiled_app.test_client()
+    token = get_internal_token(client)
+
+    response = client.get('/api/operations/', headers={'Authorization': f'Bearer {token}', 'X-Profile': '1'})
+    assert response.status_code == 200
+    assert response.headers['X-Profiled-Status'] == '200'
+    assert 'cumulative' in response.get_data(as_text=True)
+
+    # Sin token interno el header se ignora
+    assert 'X-Profiled-Status' not in client.get('/api/operations/', headers={'X-Profile': '1'}).headers
+
+def test_profiler_disabled_by_default(client):
+    token = get_internal_token(client)
+    response = client.post('/api/debug/profile?seconds=0.01', headers={'Authorization': f'Bearer {token}'})
+    assert response.status_code == 404
@@ -0,0 +1,67 @@
+import logging
+
+import pytest
+from sqlalchemy import text
+
+from app import create_app, db
+from models import User
+from services.metrics import metrics
+from tests.test_api import get_internal_token
+
+@pytest.fixture
+def instrumented_app(monkeypatch, tmp_path):
+    monkeypatch.setenv('DATABASE_URL', f"sqlite:///{tmp_path / 'queries.db'}")
+    monkeypatch.setenv('RESPONSE_CACHE_GENERATION_FILE', str(tmp_path / 'operations.generation'))
+    monkeypatch.setenv('INGEST_LOG_DIR', str(tmp_path / 'ingest'))
+    monkeypatch.setenv('QUERY_LOG_ENABLED', 'True')
+    monkeypatch.setenv('QUERY_LOG_HEADERS', 'True')
+    monkeypatch.setenv('SLOW_QUERY_MS', '0')
+    monkeypatch.setenv('QUERY_N_PLUS_ONE_THRESHOLD', '3')
+    app = create_app()
+    app.config['TESTING'] = True
+
+    with app.app_context():
+        db.create_all()
+        user = User(email='test_admin@test.com', is_internal=True)
+        user.set_password('test123')
+        db.session.add(user)
+        db.session.commit()
+        yield app
+
+def test_responses_report_query_count(instrumented_app, caplog):
+    metrics.reset()
+    client = instrumented_app.test_client()
+    token = get_internal_token(client)
+
+    with caplog.at_level(logging.WARNING, logger='services.query_log'):
+        response = client.get('/api/operations/', headers={'Authorization': f'Bearer {token}'})
+
+    assert response.status_code == 200
+    assert int(response.headers['X-Query-Count']) >= 1
+    assert float(response.headers['X-Query-Time-Ms']) >= 0
+    assert 'Slow query' in caplog.text and 'internal_api.get_operations' in caplog.text
+    assert metrics.snapshot()['counters']['db.queries.internal_api.get_operations'] >= 1
+
+def test_repeated_statement_is_flagged_once(instrumented_app, caplog):
+    metrics.reset()
+    with instrumented_app.test_request_context('/loop'), caplog.at_level(logging.WARNING, logger='services.query_log'):
+        for user_id in range(5):
+            db.session.execute(text("SELECT email FROM users WHERE id = :id"), {'id': user_id})
+
+    assert metrics.snapshot()['counters']['db.n_plus_one'] == 1
+    assert caplog.text.count('Possible N+1') == 1
+
+def test_failed_statements_leave_nothing_on_the_connection(instrumented_app):
+    metrics.reset()
+    with db.engine.connect() as connection:
+        for _ in range(3):
+            with pytest.raises(Exception):
+                connection.execute(text("SELECT * FROM missing_table"))
+        connection.execute(text("SELECT 1"))
+        assert not any('query_log' in str(key) for key in connection.info)
+
+    assert metrics.snapshot()['timers']['db.query']['count'] == 1
+
+def test_disabled_by_default(client):
+    response = client.get('/api/operations/')
+    assert 'X-Query-Count' not in response.headers
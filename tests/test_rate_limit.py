@@ -0,0 +1,53 @@
+from services.rate_limit import LocalTokenBuckets
+from tests.test_api import get_internal_token, get_public_token
+
+def _create_public(client, token):
+    return client.post('/public/operations/', headers={'Authorization': f'Bearer {token}'},
+                       json={'type': 'heating', 'amount': 1.0, 'user_email': 'test_user@test.com'})
+
+def test_token_bucket_refills_at_rate():
+    """Test bursts are capped and tokens come back at `rate` per second"""
+    buckets = LocalTokenBuckets()
+
+    assert [buckets.acquire('k', 2, 3, now=100.0)[0] for _ in range(4)] == [True, True, True, False]
+    assert buckets.acquire('k', 2, 3, now=100.0) == (False, 0.5)
+    assert buckets.acquire('k', 2, 3, now=100.5)[0] is True
+    assert buckets.acquire('other', 2, 3, now=100.5)[0] is True
+
+def test_public_api_rate_limit_returns_429(app, client, monkeypatch):
+    """Test a client over its burst gets 429 with Retry-After, and internal users are unaffected"""
+    import routes.public_api
+    monkeypatch.setattr(routes.public_api.email_service, 'send_operation_confirmation', lambda data: True)
+    app.config.update(RATE_LIMIT_BURST=3, RATE_LIMIT_RATE=0.5)
+
+    token = get_public_token(client)  # el login consume del bucket de la IP, no del usuario
+    statuses = [_create_public(client, token).status_code for _ in range(4)]
+
+    assert statuses == [201, 201, 201, 429]
+    response = _create_public(client, token)
+    assert response.headers['Retry-After'] == '2'
+
+    internal = client.get('/api/operations/', headers={'Authorization': f'Bearer {get_internal_token(client)}'})
+    assert internal.status_code == 200
+
+def test_public_api_concurrency_cap_returns_503(app, client):
+    """Test requests beyond the per-worker concurrency cap are rejected before the view runs"""
+    token = get_public_token(client)
+    app.config['PUBLIC_API_MAX_CONCURRENCY'] = 1
+    semaphore = app.extensions['rate_limiter']['slots']['public_api']
+    assert semaphore.acquire(blocking=False)  # un request en curso ocupa el unico lugar
+    try:
+        response = _create_public(client, token)
+    finally:
+        semaphore.release()
+
+    assert response.status_code == 503
+    assert response.headers['Retry-After'] == '1'
+
+def test_redis_failure_falls_back_to_local_buckets(app, client):
+    """Test an unreachable Redis backend does not fail requests"""
+    app.extensions['rate_limiter']['redis_url'] = 'redis://127.0.0.1:1/0'
+    app.config['RATE_LIMIT_BURST'] = 1
+
+    assert client.post('/public/auth/login/', json={}).status_code == 400
+    assert client.post('/public/auth/login/', json={}).status_code == 429
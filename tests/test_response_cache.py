@@ -0,0 +1,69 @@
+import threading
+from services.metrics import metrics
+from services.response_cache import FileGenerationCounter, cached_body, operations_generation
+from tests.test_api import get_internal_token
+
+def test_file_generation_counter_is_shared(tmp_path):
+    """Test that counters on the same file see each other's bumps"""
+    path = str(tmp_path / 'operations.generation')
+    writer, reader = FileGenerationCounter(path), FileGenerationCounter(path)
+    before = reader.current()
+
+    writer.bump()
+    writer.bump()
+
+    after = reader.current()
+    assert after.token != before.token
+    assert after.token.split(':') == [before.token.split(':')[0], '2']
+    assert after.bumped_at > 0
+    assert FileGenerationCounter(str(tmp_path / 'other')).current().token.split(':')[0] != before.token.split(':')[0]
+
+def test_listing_served_from_cache_between_writes(client):
+    """Test that repeated listings hit the cache and a write invalidates it"""
+    headers = {'Authorization': f'Bearer {get_internal_token(client)}'}
+    client.post('/api/operations/', json={'type': 'electricity', 'amount': 10.0}, headers=headers)
+    metrics.reset()
+
+    first = client.get('/api/operations/', headers=headers)
+    second = client.get('/api/operations/', headers=headers)
+    counters = metrics.snapshot()['counters']
+    assert counters['response_cache.misses'] == 1
+    assert counters['response_cache.hits.local'] == 1
+    assert first.data == second.data
+
+    client.post('/api/operations/', json={'type': 'heating', 'amount': 5.0}, headers=headers)
+    third = client.get('/api/operations/', headers=headers)
+    assert len(third.get_json()) == 2
+    assert metrics.snapshot()['counters']['response_cache.misses'] == 2
+
+def test_concurrent_misses_load_once(app):
+    """Test that concurrent misses for the same key run the loader once"""
+    calls = []
+    started = threading.Event()
+    release = threading.Event()
+    results = []
+
+    def loader():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return b'[]'
+
+    with app.test_request_context('/api/operations/'):
+        generation = operations_generation()
+
+    def read():
+        with app.test_request_context('/api/operations/'):
+            results.append(cached_body(generation, loader))
+
+    threads = [threading.Thread(target=read) for _ in range(4)]
+    threads[0].start()
+    started.wait(5)
+    for thread in threads[1:]:
+        thread.start()
+    release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert len(calls) == 1
+    assert results == [b'[]'] * 4
@@ -0,0 +1,122 @@
+import pytest
+from datetime import datetime
+from flask.json.provider import DefaultJSONProvider
+from app import db
+from models import Operation
+from services.json_provider import OrjsonProvider
+from tests.test_api import get_internal_token
+
+def _list_operations(app, client):
+    with app.app_context():
+        db.session.add_all([
+            Operation(type='heating', amount=1.5, carbon_score=2.7, user_email='ñandú@example.com',
+                      created_at=datetime(2026, 1, 2, 3, 4, 5, 600000)),
+            Operation(type='electricity', amount=4.0, carbon_score=2.0, created_at=datetime(2026, 3, 1)),
+        ])
+        db.session.commit()
+        expected = [op.to_dict() for op in Operation.query.order_by(Operation.created_at.desc())]
+
+    token = get_internal_token(client)
+    response = client.get('/api/operations/', headers={'Authorization': f'Bearer {token}'})
+    assert response.status_code == 200
+    return response, expected
+
+def test_orjson_provider_is_installed(app):
+    """Test orjson is the default provider"""
+    assert isinstance(app.json, OrjsonProvider)
+    assert app.json.loads(app.json.dumps({'b': 1, 'a': datetime(2026, 1, 1)})) == {'a': '2026-01-01T00:00:00', 'b': 1}
+
+@pytest.mark.parametrize('provider', [OrjsonProvider, DefaultJSONProvider])
+def test_column_listing_matches_to_dict(app, client, provider):
+    """Test the column-tuple listing returns exactly what to_dict() would, with both providers"""
+    app.json = provider(app)
+    response, expected = _list_operations(app, client)
+
+    assert response.json == expected
+    assert response.json[1]['created_at'] == '2026-01-02T03:04:05.600000'
+
+def test_list_endpoints_do_not_hydrate_orm_instances(app, client):
+    """Test listing and export paths load column tuples, not Operation instances"""
+    from sqlalchemy import event
+
+    with app.app_context():
+        db.session.add_all([Operation(type='heating', amount=float(i), carbon_score=1.8 * i) for i in range(1, 4)])
+        db.session.commit()
+
+    loaded = []
+    listener = lambda target, context: loaded.append(target)
+    event.listen(Operation, 'load', listener)
+    try:
+        token = get_internal_token(client)
+        headers = {'Authorization': f'Bearer {token}'}
+        assert len(client.get('/api/operations/', headers=headers).json) == 3
+        assert len(client.get('/api/operations/export?include_archived=false', headers=headers)
+                   .get_data(as_text=True).splitlines()) == 3
+
+        client.post('/bo/login', data={'email': 'test_admin@test.com', 'password': 'test123'})
+        response = client.get('/bo/operations/')
+        assert response.status_code == 200
+        assert response.get_data(as_text=True).count('/bo/operations/') >= 3
+    finally:
+        event.remove(Operation, 'load', listener)
+
+    assert loaded == []
+
+def test_compact_columns_keep_the_json_contract(app, client):
+    """Test binary UUIDs and fixed-point amounts round-trip to the same JSON values"""
+    token = get_internal_token(client)
+    headers = {'Authorization': f'Bearer {token}'}
+    amounts = [0.01, 1.5, 10.1, 33.333333, 123456.78, 999999999.99]
+    created = [client.post('/api/operations/', json={'type': 'heating', 'amount': amount}, headers=headers).json
+               for amount in amounts]
+
+    assert [op['amount'] for op in created] == amounts
+    listed = {op['operation_id']: op for op in client.get('/api/operations/', headers=headers).json}
+    for op in created:
+        assert listed[op['operation_id']] == op
+        receipt = client.get(f"/operations/{op['operation_id']}/receipt/", headers=headers)
+        assert receipt.status_code == 200
+
+    with app.app_context():
+        raw = db.session.execute(db.text("SELECT operation_id, amount, carbon_score FROM operations")).first()
+    assert isinstance(raw.operation_id, bytes) and len(raw.operation_id) == 16
+    assert isinstance(raw.amount, int) and isinstance(raw.carbon_score, int)
+
+def test_amounts_beyond_the_column_scale_are_rejected(app, client):
+    """Test amounts with more than 6 decimals (or that would store as 0) get 400 instead of being rounded"""
+    headers = {'Authorization': f'Bearer {get_internal_token(client)}'}
+    for amount in (1.23456789, 1e-7, 0.0000004):
+        response = client.post('/api/operations/', json={'type': 'heating', 'amount': amount}, headers=headers)
+        assert response.status_code == 400
+        assert response.json['error'] == 'Amount must have at most 6 decimals'
+
+    assert Operation.amount.type.has_scale(33.333333)
+    assert not Operation.amount.type.has_scale(33.3333333)
+    assert not Operation.amount.type.has_scale(float('nan'))
+
+def test_idempotent_replay_returns_the_stored_values(app, client):
+    """Test a retry with the same Idempotency-Key gets the body of the first response (persisted values)"""
+    token = get_internal_token(client)
+    for amount in (5, 33.333333):
+        headers = {'Authorization': f'Bearer {token}', 'Idempotency-Key': f'replay-{amount}'}
+        first = client.post('/api/operations/', json={'type': 'heating', 'amount': amount}, headers=headers)
+        retry = client.post('/api/operations/', json={'type': 'heating', 'amount': amount}, headers=headers)
+        assert first.status_code == retry.status_code == 201
+        assert retry.headers['Idempotent-Replayed'] == 'true'
+        assert retry.get_data().rstrip() == first.get_data().rstrip()  # mismo JSON, byte a byte (5.0, no 5)
+        listed = client.get('/api/operations/', headers={'Authorization': f'Bearer {token}'}).json
+        assert next(op for op in listed if op['operation_id'] == first.json['operation_id']) == first.json
+
+def test_out_of_range_amounts_are_rejected(app, client):
+    """Test amounts whose scaled integer would overflow BIGINT get 400 instead of a failed insert"""
+    token = get_internal_token(client)
+    headers = {'Authorization': f'Bearer {token}'}
+    response = client.post('/api/operations/', json={'type': 'heating', 'amount': 1e14}, headers=headers)
+    assert response.status_code == 400
+    assert response.json['error'] == 'Amount is out of range'
+
+    assert Operation.amount.type.fits(9.2e12)
+    assert Operation.carbon_score.type.fits(9.2e14)
+    assert not Operation.carbon_score.type.fits(1e15)
+    assert not Operation.carbon_score.type.fits(float('nan'))
+    assert not Operation.amount.type.fits(float('inf'))
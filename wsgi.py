@@ -1,6 +1,8 @@
 from app import create_app
+from services.prefork import prepare_app
 
 app = create_app()
+prepare_app(app)  # warmup; en modo preload tambien el reset de conexiones post-fork
 
 if __name__ == '__main__':
     app.run(debug=True)